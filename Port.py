@@ -1,53 +1,32 @@
-import pandas as pd
-import yfinance as yf
 import datetime
-import time
-
-# Définir la période d'analyse (5 ans)
-date_fin = datetime.datetime.now().strftime('%Y-%m-%d')
-date_debut = (datetime.datetime.now() - datetime.timedelta(days=5*365)).strftime('%Y-%m-%d')
-
-print(f"Période d'analyse: du {date_debut} au {date_fin}")
-
-# Définition des actions par secteur
-secteurs = {
-    "Communication Services": ["PUBLICIS GROUPE"],
-    "Consumer Discretionary": ["INDUSTRIA DE DISENO TEXTIL", "MICHELIN (CGDE)"],
-    "Consumer Staples": ["BEIERSDORF AG", "HENKEL AG & CO KGAA VOR-PREF"],
-    "Financials": ["LEGAL & GENERAL GROUP PLC", "LONDON STOCK EXCHANGE GROUP", "AVIVA PLC", "ADYEN NV"],
-    "Health Care": ["STRAUMANN HOLDING AG-REG", "SANOFI"],
-    "Industrials": ["KONE OYJ-B", "SIEMENS ENERGY AG", "AIRBUS SE", "RHEINMETALL AG"],
-    "Information Technology": ["ASML HOLDING NV"],
-    "Materials": ["RIO TINTO PLC"],
-    "Utilities": ["RWE AG"]
-}
 
-# Mapping des noms complets aux symboles boursiers
-symbole_mapping = {
-    "PUBLICIS GROUPE": "PUB.PA",
-    "INDUSTRIA DE DISENO TEXTIL": "ITX.MC",
-    "MICHELIN (CGDE)": "ML.PA",
-    "BEIERSDORF AG": "BEI.DE",
-    "HENKEL AG & CO KGAA VOR-PREF": "HEN3.DE",
-    "LEGAL & GENERAL GROUP PLC": "LGEN.L",
-    "LONDON STOCK EXCHANGE GROUP": "LSEG.L",
-    "AVIVA PLC": "AV.L",
-    "ADYEN NV": "ADYEN.AS",
-    "STRAUMANN HOLDING AG-REG": "STMN.SW",
-    "SANOFI": "SAN.PA",
-    "KONE OYJ-B": "KNEBV.HE",
-    "SIEMENS ENERGY AG": "ENR.DE",
-    "AIRBUS SE": "AIR.PA",
-    "RHEINMETALL AG": "RHM.DE",
-    "ASML HOLDING NV": "ASML.AS",
-    "RIO TINTO PLC": "RIO.L",
-    "RWE AG": "RWE.DE"
-}
+import pandas as pd
+
+from telechargement import TelechargeurConcurrent, FournisseurYahoo, FournisseurLimite, LimiteurDebit
+from stockage_prix import StockagePrix, FournisseurIncremental
+from panel_binaire import sauvegarder_jeu_donnees, PanelCompact, DOSSIER_DONNEES, TYPE_VALEURS
+from conversion_devises import ConvertisseurDevises, FICHIER_TAUX
+from export_rapports import exporter_feuilles
+from referentiel import referentiel
+from instrumentation import instrumentation, configurer_depuis_ligne_de_commande
+
+# Durée d'analyse par défaut (5 ans)
+ANNEES_ANALYSE = 5
+
+# Fichier du stockage local des prix
+FICHIER_STOCKAGE = 'prix_historiques.sqlite'
 
-# Créer une liste de symboles à partir du mapping
-symboles = list(symbole_mapping.values())
+# Symbole de l'indice STOXX 600 et indice alternatif (STOXX 50)
+INDICE_REFERENCE = "^STOXX"  # Symbole correct pour Yahoo Finance
+INDICE_ALTERNATIF = "SX5E.PA"
 
-# Dictionnaire de taux de change fixes
+
+# Erreur levée lorsqu'aucun indice de référence (réel ou synthétique) ne peut être construit
+class IndiceIndisponible(RuntimeError):
+    pass
+
+
+# Taux de change fixes, utilisés seulement si l'historique d'une devise est indisponible
 taux_fixes = {
     'GBP': 1.15,  # 1 GBP = 1.15 EUR
     'CHF': 0.95,  # 1 CHF = 0.95 EUR
@@ -58,161 +37,197 @@ taux_fixes = {
     'EUR': 1.0,   # déjà en euros
 }
 
-# Dictionnaire de correspondance pour les devises selon la bourse
-devises_par_bourse = {
-    '.L': 'GBP',    # Londres - Livre sterling
-    '.SW': 'CHF',   # Suisse - Franc suisse
-    '.BR': 'EUR',   # Bruxelles - Euro
-    '.PA': 'EUR',   # Paris - Euro
-    '.AS': 'EUR',   # Amsterdam - Euro
-    '.DE': 'EUR',   # Allemagne - Euro
-    '.MC': 'EUR',   # Madrid - Euro
-    '.ST': 'SEK',   # Stockholm - Couronne suédoise
-    '.MI': 'EUR',   # Milan - Euro
-    '.CO': 'DKK',   # Copenhague - Couronne danoise
-    '.OL': 'NOK',   # Oslo - Couronne norvégienne
-    '.VI': 'EUR',   # Vienne - Euro
-    '.LS': 'EUR',   # Lisbonne - Euro
-    '.HE': 'EUR',   # Helsinki - Euro
-    '.I': 'EUR',    # Irlande - Euro
-}
-
-# Fonction pour déterminer la devise d'un symbole
+# Fonction pour déterminer la devise de cotation d'un symbole (référentiel des titres, sinon place de cotation)
 def obtenir_devise(symbole):
-    for extension, devise in devises_par_bourse.items():
-        if symbole.endswith(extension):
-            return devise
-    return 'EUR'  # Par défaut, utiliser l'Euro
+    return referentiel.devise(symbole)
+
+
+# Fonction pour définir la période d'analyse (dates au format AAAA-MM-JJ)
+def definir_periode(annees=ANNEES_ANALYSE):
+    maintenant = datetime.datetime.now()
+    date_fin = maintenant.strftime('%Y-%m-%d')
+    date_debut = (maintenant - datetime.timedelta(days=annees*365)).strftime('%Y-%m-%d')
+    return date_debut, date_fin
+
+
+# Fonction pour créer le téléchargeur : stockage local (seules les dates manquantes sont demandées
+# à Yahoo Finance), requêtes concurrentes, débit limité et sans doublon sur l'exécution
+def creer_telechargeur(fichier_stockage=FICHIER_STOCKAGE, fournisseur=None, requetes_par_seconde=4, nb_threads=8):
+    stockage_prix = StockagePrix(fichier_stockage)
+    # Le limiteur s'applique à chaque requête envoyée au fournisseur, sous le stockage incrémental
+    fournisseur = FournisseurLimite(fournisseur or FournisseurYahoo(), LimiteurDebit(requetes_par_seconde))
+    telechargeur = TelechargeurConcurrent(FournisseurIncremental(fournisseur, stockage_prix), limiteur=False,
+                                          nb_threads=nb_threads)
+    return telechargeur, stockage_prix
+
 
 # Fonction pour récupérer les données historiques avec gestion des erreurs
-def obtenir_donnees_historiques(symbole, date_debut, date_fin, tentatives_max=3, delai=1):
-    for tentative in range(tentatives_max):
-        try:
-            stock = yf.Ticker(symbole)
-            historique = stock.history(start=date_debut, end=date_fin)
-            if not historique.empty:
-                # Supprimer les informations de fuseau horaire
-                historique.index = historique.index.tz_localize(None)
-                return historique
-            time.sleep(delai)
-        except Exception as e:
-            print(f"Erreur pour {symbole} (tentative {tentative+1}): {e}")
-            time.sleep(delai)
-
-    # Si toutes les tentatives échouent, retourner un DataFrame vide
-    print(f"Impossible de récupérer les données pour {symbole} après {tentatives_max} tentatives")
-    return pd.DataFrame()
-
-# Définir le symbole pour l'indice STOXX 600
-indice_eurostoxx = "^STOXX"  # Symbole correct pour Yahoo Finance
-
-# Récupérer d'abord les données de l'indice STOXX 600
-print(f"Récupération des données pour l'indice {indice_eurostoxx}...")
-historique_indice = obtenir_donnees_historiques(indice_eurostoxx, date_debut, date_fin)
-
-if historique_indice.empty:
+def obtenir_donnees_historiques(telechargeur, symbole, date_debut, date_fin):
+    return telechargeur.obtenir(symbole, date_debut, date_fin)
+
+
+# Fonction pour récupérer l'indice de référence (avec indice alternatif ou synthétique en secours)
+def recuperer_indice(telechargeur, symboles, date_debut, date_fin):
+    indice_eurostoxx = INDICE_REFERENCE
+
+    # Lancer en parallèle le téléchargement de l'indice STOXX 600 et de toutes les actions
+    print(f"Récupération des données pour l'indice {indice_eurostoxx} et {len(symboles)} actions...")
+    for symbole in [indice_eurostoxx] + list(symboles):
+        telechargeur.soumettre(symbole, date_debut, date_fin)
+    historique_indice = obtenir_donnees_historiques(telechargeur, indice_eurostoxx, date_debut, date_fin)
+
+    if not historique_indice.empty:
+        print(f"Données récupérées avec succès pour {indice_eurostoxx}")
+        return indice_eurostoxx, historique_indice['Close']
+
     print(f"Impossible de récupérer les données pour {indice_eurostoxx}. Utilisation d'un indice alternatif.")
     # Essayer avec un autre symbole
-    indice_eurostoxx = "SX5E.PA"  # Autre tentative avec le STOXX50E
-    historique_indice = obtenir_donnees_historiques(indice_eurostoxx, date_debut, date_fin)
-
-    if historique_indice.empty:
-        print(f"Impossible de récupérer les données pour {indice_eurostoxx}. Création d'un indice synthétique.")
-        # Créer un indice synthétique à partir des actions
-        prix_actions = pd.DataFrame()
-
-        for i, symbole in enumerate(symboles[:10]):  # On prend les 10 premières actions pour l'indice synthétique
-            print(f"Récupération des données pour l'indice synthétique - {symbole}... ({i+1}/10)")
-            historique = obtenir_donnees_historiques(symbole, date_debut, date_fin)
-
-            if not historique.empty:
-                if prix_actions.empty:
-                    prix_actions = pd.DataFrame(index=historique.index)
-                prix_actions[symbole] = historique['Close']
-
-        if not prix_actions.empty:
-            # Normaliser chaque série à 100 à la première date
-            prix_actions = prix_actions.dropna(axis=1, thresh=len(prix_actions)*0.7)
-            normalise = prix_actions.div(prix_actions.iloc[0]).mul(100)
-
-            # Créer l'indice synthétique
-            historique_indice = pd.DataFrame(index=normalise.index)
-            historique_indice['Close'] = normalise.mean(axis=1)
-            indice_eurostoxx = "INDICE_SYNTHETIQUE"
-            print("Indice synthétique créé avec succès")
-        else:
-            print("Impossible de créer un indice synthétique. Arrêt du programme.")
-            exit()
-else:
-    print(f"Données récupérées avec succès pour {indice_eurostoxx}")
-
-# Créer un dictionnaire pour stocker toutes les données de prix
-donnees_prix = {}
-
-# Ajouter l'indice
-donnees_prix[indice_eurostoxx] = historique_indice['Close']
-
-# Récupérer les données pour les actions sélectionnées et les convertir en euros
-for i, symbole in enumerate(symboles):
-    print(f"Récupération des données pour {symbole}... ({i+1}/{len(symboles)})")
-
-    # Récupération des données historiques
-    historique = obtenir_donnees_historiques(symbole, date_debut, date_fin)
-
-    if not historique.empty:
-        # Déterminer la devise
-        devise = obtenir_devise(symbole)
-
-        # Utiliser un taux de change fixe pour la conversion
-        if devise != 'EUR':
-            print(f"  Conversion de {devise} vers EUR pour {symbole} (taux fixe)")
-            taux = taux_fixes.get(devise, 1.0)
-            donnees_prix[symbole] = historique['Close'] * taux
-        else:
-            # Si déjà en euros, ajouter directement
-            donnees_prix[symbole] = historique['Close']
-
-    # Pause pour éviter les limitations d'API
-    time.sleep(0.25)
-
-# Créer le DataFrame des prix de clôture à partir du dictionnaire (évite la fragmentation)
-print("\nCréation du DataFrame des prix de clôture...")
-prix_cloture = pd.DataFrame(donnees_prix)
-
-# Remplir les valeurs manquantes avec la valeur précédente
-prix_cloture.fillna(method='ffill', inplace=True)
-
-# Calculer les rendements journaliers en une seule opération
-print("Calcul des rendements journaliers...")
-rendements_journaliers = prix_cloture.pct_change(fill_method=None)  # Évite le FutureWarning
-
-# Nettoyage et tri des données
-prix_cloture = prix_cloture.sort_index()
-rendements_journaliers = rendements_journaliers.sort_index()
-
-# Suppression des lignes sans données
-prix_cloture = prix_cloture.dropna(how='all')
-rendements_journaliers = rendements_journaliers.dropna(how='all')
-
-# Création d'une copie avec les dates au format jj/mm/aaaa
-prix_cloture_date_format = prix_cloture.copy()
-prix_cloture_date_format.index = prix_cloture_date_format.index.strftime('%d/%m/%Y')
-rendements_journaliers_date_format = rendements_journaliers.copy()
-rendements_journaliers_date_format.index = rendements_journaliers_date_format.index.strftime('%d/%m/%Y')
-
-# Exporter les résultats
-try:
-    # Exporter en Excel
-    with pd.ExcelWriter('resultats_actions_5ans.xlsx') as writer:
-        prix_cloture_date_format.to_excel(writer, sheet_name='Prix Quotidiens')
-        rendements_journaliers_date_format.to_excel(writer, sheet_name='Rendements Journaliers')
-    print("\nDonnées exportées avec succès au format Excel!")
-except ImportError:
-    # Exporter en CSV si openpyxl n'est pas disponible
-    prix_cloture_date_format.to_csv('prix_quotidiens_5ans.csv')
-    rendements_journaliers_date_format.to_csv('rendements_journaliers_5ans.csv')
-    print("\nDonnées exportées avec succès au format CSV!")
-    print("Pour sauvegarder en Excel, installez openpyxl: pip install openpyxl")
-
-print(f"Données extraites sur 5 ans pour {len(symboles)} actions et 1 indice.")
-print("Traitement des données terminé!")
+    indice_eurostoxx = INDICE_ALTERNATIF  # Autre tentative avec le STOXX50E
+    historique_indice = obtenir_donnees_historiques(telechargeur, indice_eurostoxx, date_debut, date_fin)
+    if not historique_indice.empty:
+        return indice_eurostoxx, historique_indice['Close']
+
+    print(f"Impossible de récupérer les données pour {indice_eurostoxx}. Création d'un indice synthétique.")
+    # Créer un indice synthétique à partir des actions
+    prix_actions = pd.DataFrame()
+
+    for i, symbole in enumerate(symboles[:10]):  # On prend les 10 premières actions pour l'indice synthétique
+        print(f"Récupération des données pour l'indice synthétique - {symbole}... ({i+1}/10)")
+        historique = obtenir_donnees_historiques(telechargeur, symbole, date_debut, date_fin)  # Déjà téléchargé
+
+        if not historique.empty:
+            if prix_actions.empty:
+                prix_actions = pd.DataFrame(index=historique.index)
+            prix_actions[symbole] = historique['Close']
+
+    if prix_actions.empty:
+        raise IndiceIndisponible("Impossible de créer un indice synthétique")
+
+    # Normaliser chaque série à 100 à la première date
+    prix_actions = prix_actions.dropna(axis=1, thresh=len(prix_actions)*0.7)
+    normalise = prix_actions.div(prix_actions.iloc[0]).mul(100)
+
+    # Créer l'indice synthétique
+    print("Indice synthétique créé avec succès")
+    return "INDICE_SYNTHETIQUE", normalise.mean(axis=1)
+
+
+# Fonction pour récupérer les prix de clôture des actions (dans leur devise de cotation). Seules les clôtures
+# sont conservées : les historiques OHLCV complets sont libérés du téléchargeur au fur et à mesure.
+def recuperer_prix_actions(telechargeur, symboles, date_debut, date_fin):
+    donnees_prix = {}
+    clotures = telechargeur.telecharger(symboles, date_debut, date_fin, colonne='Close', liberer=True)
+
+    for i, symbole in enumerate(symboles):
+        print(f"Traitement des données pour {symbole}... ({i+1}/{len(symboles)})")
+        cloture = clotures[symbole]
+
+        if not cloture.empty:
+            donnees_prix[symbole] = cloture
+
+    return donnees_prix
+
+
+# Fonction pour convertir en euros (en place) le panel compact des prix avec les taux de change historiques
+def convertir_en_euros(prix_cloture, convertisseur):
+    convertisseur.convertir_matrice(prix_cloture.valeurs, pd.DatetimeIndex(prix_cloture.dates), prix_cloture.symboles,
+                                    {s: obtenir_devise(s) for s in prix_cloture.symboles})
+    return prix_cloture
+
+
+# Fonction pour construire les panels compacts de prix de clôture et de rendements journaliers
+# (une matrice pour les prix, une pour les rendements, sans copie intermédiaire)
+def construire_panels(prix_cloture):
+    if not isinstance(prix_cloture, PanelCompact):
+        print("\nCréation du panel des prix de clôture...")
+        prix_cloture = PanelCompact.depuis_series(prix_cloture)
+
+    # Remplir les valeurs manquantes avec la valeur précédente (en place ; dates déjà triées)
+    prix_cloture.remplir_vers_l_avant()
+
+    # Calculer les rendements journaliers en une seule opération par bloc de symboles
+    print("Calcul des rendements journaliers...")
+    rendements_journaliers = prix_cloture.rendements()
+
+    # Suppression des lignes sans données
+    return prix_cloture.lignes_non_vides(), rendements_journaliers.lignes_non_vides()
+
+
+# Fonction pour télécharger et préparer les données : indice de référence en première colonne puis actions
+def recuperer_donnees(symboles=None, annees=ANNEES_ANALYSE, telechargeur=None, fichier_stockage=FICHIER_STOCKAGE,
+                      fichier_taux=FICHIER_TAUX, precision=TYPE_VALEURS):
+    symboles = list(symboles if symboles is not None else referentiel.symboles)
+    date_debut, date_fin = definir_periode(annees)
+    print(f"Période d'analyse: du {date_debut} au {date_fin}")
+
+    stockage_prix = None
+    if telechargeur is None:
+        telechargeur, stockage_prix = creer_telechargeur(fichier_stockage)
+    try:
+        # Taux de change historiques : fichier utilisateur, sinon téléchargés avec les prix
+        convertisseur = ConvertisseurDevises(telechargeur, date_debut, date_fin, fichier_taux, taux_fixes)
+        convertisseur.precharger({obtenir_devise(s) for s in symboles})
+
+        with instrumentation.etape('telechargement_indice'):
+            indice_eurostoxx, prix_indice = recuperer_indice(telechargeur, symboles, date_debut, date_fin)
+
+        # Créer un dictionnaire pour stocker toutes les données de prix, en commençant par l'indice
+        donnees_prix = {indice_eurostoxx: prix_indice}
+        with instrumentation.etape('telechargement_actions'):
+            donnees_prix.update(recuperer_prix_actions(telechargeur, symboles, date_debut, date_fin))
+
+        with instrumentation.etape('conversion_devises'):
+            prix_cloture = convertir_en_euros(PanelCompact.depuis_series(donnees_prix, precision), convertisseur)
+    finally:
+        if stockage_prix is not None:
+            telechargeur.fermer(annuler=True)
+            stockage_prix.fermer()
+
+    with instrumentation.etape('rendements'):
+        return construire_panels(prix_cloture)
+
+
+# Fonction pour exporter les données : jeu binaire lu par TO.py, rapport des panels optionnel
+# (classeur Excel standard ou en flux, ou fichiers CSV/Parquet écrits en parallèle)
+def exporter_donnees(prix_cloture, rendements_journaliers, dossier=DOSSIER_DONNEES, rapport_excel=True,
+                     format_export='excel'):
+    # Exporter le jeu de données binaire lu par TO.py (colonnes mappables en mémoire, dates natives)
+    sauvegarder_jeu_donnees(prix_cloture, rendements_journaliers, dossier)
+    print(f"\nJeu de données binaire exporté dans '{dossier}'")
+
+    if not rapport_excel:
+        return
+
+    # Exporter les résultats (vues DataFrame sur les panels, dates formatées à l'écriture)
+    feuilles = [('Prix Quotidiens', prix_cloture.vers_dataframe(), True, 'prix_quotidiens_5ans'),
+                ('Rendements Journaliers', rendements_journaliers.vers_dataframe(), True, 'rendements_journaliers_5ans')]
+    format_utilise = exporter_feuilles('resultats_actions_5ans.xlsx', feuilles, format_export)
+    if format_utilise == 'excel':
+        print("\nDonnées exportées avec succès au format Excel!")
+    else:
+        print(f"\nDonnées exportées avec succès au format {format_utilise.upper()}!")
+        if format_export in ('excel', 'flux'):
+            print("Pour sauvegarder en Excel, installez openpyxl: pip install openpyxl")
+
+
+def main(annees=ANNEES_ANALYSE, rapport_excel=True, fichier_stockage=FICHIER_STOCKAGE, format_export='excel',
+         precision=TYPE_VALEURS):
+    try:
+        prix_cloture, rendements_journaliers = recuperer_donnees(annees=annees, fichier_stockage=fichier_stockage,
+                                                                 precision=precision)
+    except IndiceIndisponible as e:
+        print(f"{e}. Arrêt du programme.")
+        return 1
+
+    with instrumentation.etape('export'):
+        exporter_donnees(prix_cloture, rendements_journaliers, rapport_excel=rapport_excel, format_export=format_export)
+
+    print(f"Données extraites sur {annees} ans pour {prix_cloture.shape[1] - 1} actions et 1 indice.")
+    print("Traitement des données terminé!")
+    return 0
+
+
+if __name__ == "__main__":
+    # Instrumentation optionnelle : --rapport, --fichier-rapport fichier.json et --profil {cprofile,echantillonnage}
+    configurer_depuis_ligne_de_commande()
+    raise SystemExit(main())
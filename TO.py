@@ -1,81 +1,69 @@
 import pandas as pd
 import numpy as np
-import statsmodels.api as sm
 from math import sqrt
 import os
 
-# Constantes pour l'annualisation
-JOURS_TRADING_ANNEE = 252
-
-# Définition des actions par secteur
-secteurs = {
-    "Communication Services": ["PUBLICIS GROUPE"],
-    "Consumer Discretionary": ["INDUSTRIA DE DISENO TEXTIL", "MICHELIN (CGDE)"],
-    "Consumer Staples": ["BEIERSDORF AG", "HENKEL AG & CO KGAA VOR-PREF"],
-    "Financials": ["LEGAL & GENERAL GROUP PLC", "LONDON STOCK EXCHANGE GROUP", "AVIVA PLC", "ADYEN NV"],
-    "Health Care": ["STRAUMANN HOLDING AG-REG", "SANOFI"],
-    "Industrials": ["KONE OYJ-B", "SIEMENS ENERGY AG", "AIRBUS SE", "RHEINMETALL AG"],
-    "Information Technology": ["ASML HOLDING NV"],
-    "Materials": ["RIO TINTO PLC"],
-    "Utilities": ["RWE AG"]
-}
-
-# Mapping des noms complets aux symboles boursiers
-symbole_mapping = {
-    "PUBLICIS GROUPE": "PUB.PA",
-    "INDUSTRIA DE DISENO TEXTIL": "ITX.MC",
-    "MICHELIN (CGDE)": "ML.PA",
-    "BEIERSDORF AG": "BEI.DE",
-    "HENKEL AG & CO KGAA VOR-PREF": "HEN3.DE",
-    "LEGAL & GENERAL GROUP PLC": "LGEN.L",
-    "LONDON STOCK EXCHANGE GROUP": "LSEG.L",
-    "AVIVA PLC": "AV.L",
-    "ADYEN NV": "ADYEN.AS",
-    "STRAUMANN HOLDING AG-REG": "STMN.SW",
-    "SANOFI": "SAN.PA",
-    "KONE OYJ-B": "KNEBV.HE",
-    "SIEMENS ENERGY AG": "ENR.DE",
-    "AIRBUS SE": "AIR.PA",
-    "RHEINMETALL AG": "RHM.DE",
-    "ASML HOLDING NV": "ASML.AS",
-    "RIO TINTO PLC": "RIO.L",
-    "RWE AG": "RWE.DE"
-}
-
-# Mapping inverse pour retrouver les noms d'entreprise à partir des symboles
-nom_mapping = {v: k for k, v in symbole_mapping.items()}
-
-
-# Fonction pour charger les données Excel
-def charger_donnees(fichier_excel):
+from panel_binaire import charger_jeu_donnees, jeu_donnees_disponible, DOSSIER_DONNEES, TAILLE_BLOC
+from annualisation import JOURS_TRADING_ANNEE, rendement_geometrique_annualise
+from metriques_glissantes import calculer_toutes_fenetres, exporter_metriques_glissantes, FORMAT_EXPORT_GLISSANT
+from instrumentation import instrumentation, configurer_depuis_ligne_de_commande
+from export_rapports import exporter_feuilles
+from referentiel import referentiel
+from metriques_risque import calculer_metriques_risque, METRIQUES_RISQUE
+from cache_resultats import CacheResultats, FICHIER_CACHE
+from correlations_croisees import correlations_croisees, exporter_correlations
+from regression_multifacteurs import (regression_multifacteurs, construire_indices_sectoriels, charger_facteurs,
+                                      exporter_regression_multifacteurs)
+
+# Ajouter les indices sectoriels équipondérés aux facteurs de la régression multi-facteurs
+# (désactivé par défaut : un secteur à une seule action reproduirait l'action elle-même)
+INDICES_SECTORIELS_COMME_FACTEURS = False
+
+# Colonnes des tableaux de résultats
+COLONNES_RESULTATS = ['Secteur', 'Entreprise', 'Symbole', 'Alpha', 'Beta', 'R-squared',
+                      'Correlation', 'Rendement_Geo_Annualisé', 'Volatilité_Totale',
+                      'Volatilité_Systématique', 'Volatilité_Résiduelle'] + METRIQUES_RISQUE
+COLONNES_NUMERIQUES = ['Alpha', 'Beta', 'R-squared', 'Correlation', 'Rendement_Geo_Annualisé',
+                       'Volatilité_Totale', 'Volatilité_Systématique', 'Volatilité_Résiduelle'] + METRIQUES_RISQUE
+
+# Version des calculs de métriques : à incrémenter à chaque changement de calcul pour invalider le cache des résultats
+VERSION_METRIQUES = 1
+
+
+# Fonction pour convertir l'index jj/mm/aaaa des exports Excel/CSV en dates
+def _convertir_dates(panel):
+    panel.index = pd.to_datetime(panel.index, format='%d/%m/%Y')
+    panel.index.name = 'Date'
+    return panel
+
+
+# Fonction pour charger les données (jeu binaire de Port.py en priorité, sinon Excel puis CSV)
+def charger_donnees(fichier_excel, dossier_binaire=DOSSIER_DONNEES):
+    if jeu_donnees_disponible(dossier_binaire):
+        return charger_jeu_donnees(dossier_binaire)
+
     try:
         # Charger les prix de clôture et rendements
         prix_quotidiens = pd.read_excel(fichier_excel, sheet_name='Prix Quotidiens', index_col=0)
         rendements_journaliers = pd.read_excel(fichier_excel, sheet_name='Rendements Journaliers', index_col=0)
 
-        return prix_quotidiens, rendements_journaliers
+        return _convertir_dates(prix_quotidiens), _convertir_dates(rendements_journaliers)
     except Exception as e:
         print(f"Erreur lors du chargement des données: {e}")
-        # Vérifier si des fichiers CSV existent (alternative)
+        # Vérifier si des fichiers CSV ou Parquet existent (alternative)
         if os.path.exists('prix_quotidiens_5ans.csv') and os.path.exists('rendements_journaliers_5ans.csv'):
             prix_quotidiens = pd.read_csv('prix_quotidiens_5ans.csv', index_col=0)
             rendements_journaliers = pd.read_csv('rendements_journaliers_5ans.csv', index_col=0)
-            return prix_quotidiens, rendements_journaliers
+            return _convertir_dates(prix_quotidiens), _convertir_dates(rendements_journaliers)
+        elif os.path.exists('prix_quotidiens_5ans.parquet') and os.path.exists('rendements_journaliers_5ans.parquet'):
+            return pd.read_parquet('prix_quotidiens_5ans.parquet'), pd.read_parquet('rendements_journaliers_5ans.parquet')
         else:
             raise e
 
 
-# Fonction pour trouver le secteur d'un symbole
+# Fonction pour trouver le secteur d'un symbole (accès direct au référentiel des titres)
 def trouver_secteur(symbole):
-    nom_entreprise = nom_mapping.get(symbole)
-    if not nom_entreprise:
-        return "Autre"
-
-    for secteur, entreprises in secteurs.items():
-        if nom_entreprise in entreprises:
-            return secteur
-
-    return "Autre"
+    return referentiel.secteur(symbole)
 
 
 # Fonction pour calculer le rendement géométrique
@@ -113,7 +101,8 @@ def calculer_metriques_avancees(rendements_action, rendements_indice, prix_actio
     vol_indice = x.std() * sqrt(JOURS_TRADING_ANNEE)  # Volatilité annualisée de l'indice
     correlation = y.corr(x)  # Corrélation avec l'indice
 
-    # Régression
+    # Régression (statsmodels n'est importé qu'ici : le reste du module n'en dépend pas)
+    import statsmodels.api as sm
     X = sm.add_constant(x)
     model = sm.OLS(y, X).fit()
 
@@ -145,163 +134,302 @@ def calculer_metriques_avancees(rendements_action, rendements_indice, prix_actio
     }
 
 
-def main():
+# Fonction pour calculer les métriques de régression et de volatilité de toutes les actions en une seule passe
+# (forme fermée de l'OLS simple, équivalente à calculer_metriques_avancees colonne par colonne)
+def calculer_metriques_panel(rendements_actions, rendements_indice, prix_actions=None, min_observations=30):
+    y = rendements_actions.to_numpy(dtype=float)
+    x = rendements_indice.reindex(rendements_actions.index).to_numpy(dtype=float)[:, None]
+
+    # Masque par colonne : observations où l'action et l'indice sont disponibles (équivalent au dropna par paire)
+    masque = ~np.isnan(y) & ~np.isnan(x)
+    n = masque.sum(axis=0)
+    valides = n >= min_observations
+    n_sur = np.where(valides, n, np.nan)
+
+    # Moyennes puis moments centrés (deux passes pour la stabilité numérique)
+    y0 = np.where(masque, y, 0.0)
+    x0 = np.where(masque, x, 0.0)
+    moyenne_y = y0.sum(axis=0) / n_sur
+    moyenne_x = x0.sum(axis=0) / n_sur
+    dy = np.where(masque, y0 - moyenne_y, 0.0)
+    dx = np.where(masque, x0 - moyenne_x, 0.0)
+    sxx = (dx * dx).sum(axis=0)
+    syy = (dy * dy).sum(axis=0)
+    sxy = (dx * dy).sum(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vol_totale = np.sqrt(syy / (n_sur - 1) * JOURS_TRADING_ANNEE)
+        vol_indice = np.sqrt(sxx / (n_sur - 1) * JOURS_TRADING_ANNEE)
+        correlation = sxy / np.sqrt(sxx * syy)
+        beta = sxy / sxx
+        alpha = (moyenne_y - beta * moyenne_x) * JOURS_TRADING_ANNEE
+        r_squared = correlation ** 2  # En régression simple avec constante, R² = corrélation²
+
+    # Calcul des volatilités décomposées
+    vol_systematique = beta * vol_indice
+    vol_residuelle = np.sqrt(np.maximum(0, vol_totale ** 2 - vol_systematique ** 2))
+
+    # Rendement géométrique annualisé à partir du premier et du dernier prix disponibles
+    rendement_geo = np.full(y.shape[1], np.nan)
+    if prix_actions is not None:
+        prix = prix_actions.reindex(columns=rendements_actions.columns).to_numpy(dtype=float)
+        rendement_geo = rendement_geometrique_annualise(prix)
+
+    metriques = pd.DataFrame({
+        'Alpha': alpha,
+        'Beta': beta,
+        'R-squared': r_squared,
+        'Correlation': correlation,
+        'Rendement_Geo_Annualisé': rendement_geo,
+        'Volatilité_Totale': vol_totale,
+        'Volatilité_Systématique': vol_systematique,
+        'Volatilité_Résiduelle': vol_residuelle
+    }, index=rendements_actions.columns)
+
+    # Comme calculer_metriques_avancees, ignorer les actions avec moins de min_observations points communs
+    return metriques[valides]
+
+
+# Fonction pour calculer les métriques (régression, volatilités et risque extrême) par blocs de symboles :
+# seules les colonnes d'un bloc sont copiées et converties à la fois (mémoire temporaire bornée sur les grands
+# univers, panels mappés en mémoire)
+def calculer_metriques_par_blocs(rendements_journaliers, rendements_indice, prix_quotidiens, symboles_actions,
+                                 taille_bloc=TAILLE_BLOC):
+    blocs = []
+    for debut in range(0, max(len(symboles_actions), 1), taille_bloc):
+        colonnes = symboles_actions[debut:debut + taille_bloc]
+        rendements_bloc = rendements_journaliers[colonnes]
+        prix_bloc = prix_quotidiens.reindex(columns=colonnes)
+        metriques = calculer_metriques_panel(rendements_bloc, rendements_indice, prix_bloc)
+        risque = calculer_metriques_risque(rendements_bloc, rendements_indice, prix_bloc)
+        blocs.append(metriques.join(risque))
+    return pd.concat(blocs)
+
+
+# Fonction pour calculer les métriques en réutilisant le cache des résultats : seuls les symboles dont les données
+# (ou celles de l'indice) ont changé depuis le dernier calcul sont recalculés, puis fusionnés avec les résultats en cache
+def calculer_metriques_avec_cache(rendements_journaliers, rendements_indice, prix_quotidiens, symboles_actions, cache):
+    cles = cache.empreintes(rendements_journaliers, rendements_indice, prix_quotidiens, symboles_actions)
+    en_cache = cache.lire(cles.values())
+    a_calculer = [s for s in symboles_actions if cles[s] not in en_cache]
+    print(f"  {len(symboles_actions) - len(a_calculer)} symbole(s) en cache, {len(a_calculer)} à calculer")
+
+    parties = []
+    if a_calculer:
+        calculees = calculer_metriques_par_blocs(rendements_journaliers, rendements_indice, prix_quotidiens,
+                                                 a_calculer)[COLONNES_NUMERIQUES]
+        cache.ecrire({cles[s]: calculees.loc[s].to_numpy() if s in calculees.index else None for s in a_calculer})
+        if not calculees.empty:
+            parties.append(calculees)
+
+    lignes = {s: en_cache[cles[s]] for s in symboles_actions if en_cache.get(cles[s]) is not None}
+    if lignes:
+        parties.append(pd.DataFrame.from_dict(lignes, orient='index', columns=COLONNES_NUMERIQUES))
+    if not parties:
+        return pd.DataFrame(columns=COLONNES_NUMERIQUES, dtype=float)
+    metriques = pd.concat(parties)
+    return metriques.reindex([s for s in symboles_actions if s in metriques.index])
+
+
+# Fonction pour calculer les moyennes par secteur et assembler les tableaux de résultats
+def agreger_par_secteur(resultats):
+    # Calculer également les moyennes par secteur
+    print("\nCalcul des moyennes par secteur...")
+    moyennes_secteur = resultats[resultats['Secteur'] != "Indice"].groupby('Secteur', observed=True)[
+        COLONNES_NUMERIQUES].mean().round(4)
+    moyennes_secteur['Entreprise'] = 'MOYENNE'
+    moyennes_secteur['Symbole'] = '-'
+    moyennes_secteur = moyennes_secteur.reset_index()
+
+    # Réorganiser les colonnes des moyennes pour qu'elles correspondent aux résultats
+    moyennes_secteur = moyennes_secteur[COLONNES_RESULTATS]
+
+    # Ajouter les moyennes aux résultats
+    resultats_complets = pd.concat([resultats, moyennes_secteur], ignore_index=True)
+
+    # Réordonner pour que l'indice soit en premier
+    resultats_complets = pd.concat([
+        resultats_complets[resultats_complets['Secteur'] == "Indice"],
+        resultats_complets[resultats_complets['Secteur'] != "Indice"]
+    ]).reset_index(drop=True)
+
+    # Créer également un tableau de métriques basiques (pour le code 2)
+    metriques_basiques = resultats_complets[['Symbole', 'Alpha', 'Beta', 'R-squared',
+                                             'Rendement_Geo_Annualisé', 'Volatilité_Totale']]
+    metriques_basiques = metriques_basiques.set_index('Symbole')
+
+    return moyennes_secteur, resultats_complets, metriques_basiques
+
+
+# Fonction pour exporter l'analyse sectorielle et les métriques basiques
+def exporter_analyse(resultats_complets, moyennes_secteur, metriques_basiques, format_export='excel'):
+    # Tous les résultats sur une feuille (aussi écrite en fichier plat pour les formats CSV/Parquet)
+    feuilles = [('Analyse Complète', resultats_complets, False, 'analyse_sectorielle_5ans')]
+
+    # Détails par secteur sur des feuilles séparées, en une seule passe de regroupement
+    # (Excel limite les noms de feuilles à 31 caractères)
+    indice = None
+    for secteur, secteur_df in resultats_complets.groupby('Secteur', sort=False, observed=True):
+        if secteur == "Indice":
+            indice = secteur_df
+        else:
+            feuilles.append((secteur[:31], secteur_df, False, None))
+
+    # Moyennes par secteur puis l'indice séparément
+    feuilles.append(('Moyennes par Secteur', moyennes_secteur, False, None))
+    if indice is not None:
+        feuilles.append(('Indice', indice, False, None))
+
+    # Exporter l'analyse sectorielle complète puis les métriques basiques (résultat du code 2)
+    format_utilise = exporter_feuilles('analyse_sectorielle_5ans.xlsx', feuilles, format_export)
+    exporter_feuilles('metriques_performance_5ans.xlsx',
+                      [('Métriques Performance', metriques_basiques, True, 'metriques_performance_5ans')], format_export)
+
+    if format_utilise == 'excel':
+        print("\nAnalyse sectorielle exportée avec succès dans 'analyse_sectorielle_5ans.xlsx'!")
+        print("Métriques basiques exportées dans 'metriques_performance_5ans.xlsx'!")
+    else:
+        print(f"\nRésultats exportés avec succès au format {format_utilise.upper()}!")
+        if format_export in ('excel', 'flux'):
+            print("Pour sauvegarder en Excel, installez openpyxl: pip install openpyxl")
+
+
+# Fonction pour analyser l'indice de référence (première colonne) et les actions sélectionnées
+# (avec un fichier de cache, seules les actions dont les données ont changé sont recalculées)
+def analyser(prix_quotidiens, rendements_journaliers, symboles=None, fichier_cache=None):
+    # Identifier l'indice de référence (première colonne normalement)
+    indice_ref = prix_quotidiens.columns[0]
+    print(f"Indice de référence: {indice_ref}")
+
+    # Filtrer les colonnes pour n'inclure que les symboles sélectionnés
+    symboles_selectionnés = list(symboles if symboles is not None else referentiel.symboles)
+    symboles_actions = [s for s in symboles_selectionnés if s in rendements_journaliers.columns and s != indice_ref]
+
+    # Liste des blocs de résultats (indice puis actions), assemblés en une seule fois
+    lignes_resultats = []
+
+    # Analyser l'indice d'abord
+    print(f"\nAnalyse de l'indice: {indice_ref}")
+
+    rendements_indice = rendements_journaliers[indice_ref]
+    metriques_indice = calculer_metriques_par_blocs(rendements_journaliers, rendements_indice, prix_quotidiens,
+                                                    [indice_ref])
+
+    if not metriques_indice.empty:
+        metriques_indice = metriques_indice.iloc[0]
+        # Ajouter les résultats pour l'indice
+        lignes_resultats.append(pd.DataFrame([{
+            'Secteur': "Indice",
+            'Entreprise': "Eurostoxx",
+            'Symbole': indice_ref,
+            'Alpha': 0,  # Par définition, l'alpha de l'indice par rapport à lui-même est 0
+            'Beta': 1,  # Par définition, le bêta de l'indice par rapport à lui-même est 1
+            'R-squared': 1,  # Par définition, le R² de l'indice par rapport à lui-même est 1
+            'Correlation': 1,  # Par définition, la corrélation de l'indice avec lui-même est 1
+            'Rendement_Geo_Annualisé': metriques_indice['Rendement_Geo_Annualisé'],
+            'Volatilité_Totale': metriques_indice['Volatilité_Totale'],
+            'Volatilité_Systématique': metriques_indice['Volatilité_Totale'],
+            # Toute la volatilité est systématique
+            'Volatilité_Résiduelle': 0,  # Pas de volatilité résiduelle
+            **metriques_indice[METRIQUES_RISQUE].to_dict()  # Risque extrême de l'indice lui-même
+        }]))
+
+    # Analyser toutes les actions, par blocs vectorisés de symboles
+    print(f"Analyse de {len(symboles_actions)} actions...")
+    with instrumentation.etape('metriques'):
+        if fichier_cache:
+            cache = CacheResultats(fichier_cache, COLONNES_NUMERIQUES, VERSION_METRIQUES)
+            try:
+                metriques = calculer_metriques_avec_cache(rendements_journaliers, rendements_indice,
+                                                          prix_quotidiens, symboles_actions, cache)
+            finally:
+                cache.fermer()
+        else:
+            metriques = calculer_metriques_par_blocs(rendements_journaliers, rendements_indice, prix_quotidiens,
+                                                     symboles_actions)
+
+    for symbole in symboles_actions:
+        if symbole not in metriques.index:
+            print(f"  Impossible de calculer les métriques pour {referentiel.entreprise(symbole)}")
+
+    # Ajouter les secteurs (colonne catégorielle) et noms d'entreprise depuis le référentiel
+    metriques.insert(0, 'Symbole', metriques.index)
+    metriques.insert(0, 'Entreprise', referentiel.entreprises_de(metriques.index))
+    metriques.insert(0, 'Secteur', referentiel.secteurs_de(metriques.index))
+    lignes_resultats.append(metriques.reset_index(drop=True))
+
+    resultats = pd.concat(lignes_resultats, ignore_index=True)[COLONNES_RESULTATS]
+    resultats['Secteur'] = resultats['Secteur'].astype('category')
+
+    # Arrondir les résultats numériques à 4 décimales
+    resultats[COLONNES_NUMERIQUES] = resultats[COLONNES_NUMERIQUES].round(4)
+    return resultats
+
+
+# Fonction pour les analyses complémentaires : métriques glissantes, régression multi-facteurs et corrélations croisées.
+# Le rapport glissant a son propre format (CSV par défaut, aucun rapport si format_glissant=None).
+def analyses_complementaires(prix_quotidiens, rendements_journaliers, symboles_actions, format_export='excel',
+                             format_glissant=FORMAT_EXPORT_GLISSANT):
+    indice_ref = prix_quotidiens.columns[0]
+    rendements_indice = rendements_journaliers[indice_ref]
+
+    # Métriques glissantes (60/126/252 jours) pour suivre la dérive du risque
+    if format_glissant is not None:
+        print("\nCalcul des métriques glissantes...")
+        with instrumentation.etape('metriques_glissantes'):
+            metriques_glissantes = calculer_toutes_fenetres(rendements_journaliers[symboles_actions], rendements_indice)
+            exporter_metriques_glissantes(metriques_glissantes, format_export=format_glissant)
+
+    # Régression multi-facteurs : indice de référence, facteurs utilisateur et éventuellement indices sectoriels
+    facteurs = rendements_indice.rename(indice_ref).to_frame().join(charger_facteurs(), how='outer')
+    if INDICES_SECTORIELS_COMME_FACTEURS:
+        facteurs = facteurs.join(construire_indices_sectoriels(rendements_journaliers[symboles_actions],
+                                                               trouver_secteur))
+    print(f"\nRégression multi-facteurs sur {facteurs.shape[1]} facteur(s)...")
+    with instrumentation.etape('multifacteurs'):
+        multifacteurs = regression_multifacteurs(rendements_journaliers[symboles_actions], facteurs)
+        exporter_regression_multifacteurs(multifacteurs, format_export=format_export)
+
+    # Corrélations croisées des actions : pairs les plus proches, corrélations intra / inter-secteurs, classification
+    print(f"\nCorrélations croisées de {len(symboles_actions)} actions...")
+    with instrumentation.etape('correlations'):
+        correlations = correlations_croisees(rendements_journaliers[symboles_actions])
+        exporter_correlations(*correlations, format_export=format_export)
+
+
+def main(fichier_excel='resultats_actions_5ans.xlsx', complementaires=True, format_export='excel',
+         fichier_cache=FICHIER_CACHE, format_glissant=FORMAT_EXPORT_GLISSANT):
     try:
         # Charger les données
-        fichier_excel = 'resultats_actions_5ans.xlsx'
-        print(f"Chargement des données depuis {fichier_excel}...")
-        prix_quotidiens, rendements_journaliers = charger_donnees(fichier_excel)
-
-        # Identifier l'indice de référence (première colonne normalement)
-        indice_ref = prix_quotidiens.columns[0]
-        print(f"Indice de référence: {indice_ref}")
-
-        # Filtrer les colonnes pour n'inclure que les symboles sélectionnés
-        symboles_selectionnés = list(symbole_mapping.values())
-        symboles_a_analyser = [indice_ref] + [s for s in symboles_selectionnés if s in rendements_journaliers.columns]
-
-        # Créer un DataFrame pour stocker les résultats par secteur
-        colonnes_resultats = ['Secteur', 'Entreprise', 'Symbole', 'Alpha', 'Beta', 'R-squared',
-                              'Correlation', 'Rendement_Geo_Annualisé', 'Volatilité_Totale',
-                              'Volatilité_Systématique', 'Volatilité_Résiduelle']
-        resultats = pd.DataFrame(columns=colonnes_resultats)
-
-        # Analyser l'indice d'abord
-        print(f"\nAnalyse de l'indice: {indice_ref}")
-
-        rendements_indice = rendements_journaliers[indice_ref].dropna()
-        prix_indice = prix_quotidiens[indice_ref].dropna()
-        metriques_indice = calculer_metriques_avancees(rendements_indice, rendements_indice, prix_indice)
-
-        if metriques_indice:
-            # Ajouter les résultats pour l'indice
-            nouvelle_ligne = pd.DataFrame([{
-                'Secteur': "Indice",
-                'Entreprise': "Eurostoxx",
-                'Symbole': indice_ref,
-                'Alpha': 0,  # Par définition, l'alpha de l'indice par rapport à lui-même est 0
-                'Beta': 1,  # Par définition, le bêta de l'indice par rapport à lui-même est 1
-                'R-squared': 1,  # Par définition, le R² de l'indice par rapport à lui-même est 1
-                'Correlation': 1,  # Par définition, la corrélation de l'indice avec lui-même est 1
-                'Rendement_Geo_Annualisé': metriques_indice['Rendement_Geo_Annualisé'],
-                'Volatilité_Totale': metriques_indice['Volatilité_Totale'],
-                'Volatilité_Systématique': metriques_indice['Volatilité_Totale'],
-                # Toute la volatilité est systématique
-                'Volatilité_Résiduelle': 0  # Pas de volatilité résiduelle
-            }])
-
-            resultats = pd.concat([resultats, nouvelle_ligne], ignore_index=True)
-
-        # Analyser chaque action par secteur
-        for symbole in symboles_a_analyser:
-            if symbole == indice_ref:
-                continue  # Déjà traité
-
-            # Trouver le secteur et le nom de l'entreprise
-            secteur = trouver_secteur(symbole)
-            entreprise = nom_mapping.get(symbole, symbole)
-
-            print(f"Analyse de {entreprise} ({symbole}) - Secteur: {secteur}")
-
-            # Extraire les rendements et les prix
-            rendements_action = rendements_journaliers[symbole].dropna()
-            rendements_indice_filtres = rendements_journaliers[indice_ref].loc[rendements_action.index]
-            prix_action = prix_quotidiens[symbole].dropna()
-
-            # Calculer les métriques
-            metriques = calculer_metriques_avancees(rendements_action, rendements_indice_filtres, prix_action)
-
-            if metriques:
-                # Ajouter les résultats
-                nouvelle_ligne = pd.DataFrame([{
-                    'Secteur': secteur,
-                    'Entreprise': entreprise,
-                    'Symbole': symbole,
-                    'Alpha': metriques['Alpha'],
-                    'Beta': metriques['Beta'],
-                    'R-squared': metriques['R-squared'],
-                    'Correlation': metriques['Correlation'],
-                    'Rendement_Geo_Annualisé': metriques['Rendement_Geo_Annualisé'],
-                    'Volatilité_Totale': metriques['Volatilité_Totale'],
-                    'Volatilité_Systématique': metriques['Volatilité_Systématique'],
-                    'Volatilité_Résiduelle': metriques['Volatilité_Résiduelle']
-                }])
-
-                resultats = pd.concat([resultats, nouvelle_ligne], ignore_index=True)
-            else:
-                print(f"  Impossible de calculer les métriques pour {entreprise}")
-
-        # Arrondir les résultats numériques à 4 décimales
-        colonnes_numeriques = ['Alpha', 'Beta', 'R-squared', 'Correlation', 'Rendement_Geo_Annualisé',
-                               'Volatilité_Totale', 'Volatilité_Systématique', 'Volatilité_Résiduelle']
-        resultats[colonnes_numeriques] = resultats[colonnes_numeriques].round(4)
-
-        # Calculer également les moyennes par secteur
-        print("\nCalcul des moyennes par secteur...")
-        moyennes_secteur = resultats[resultats['Secteur'] != "Indice"].groupby('Secteur')[
-            colonnes_numeriques].mean().round(4)
-        moyennes_secteur['Entreprise'] = 'MOYENNE'
-        moyennes_secteur['Symbole'] = '-'
-        moyennes_secteur = moyennes_secteur.reset_index()
-
-        # Réorganiser les colonnes des moyennes pour qu'elles correspondent aux résultats
-        moyennes_secteur = moyennes_secteur[colonnes_resultats]
-
-        # Ajouter les moyennes aux résultats
-        resultats_complets = pd.concat([resultats, moyennes_secteur], ignore_index=True)
-
-        # Réordonner pour que l'indice soit en premier
-        resultats_complets = pd.concat([
-            resultats_complets[resultats_complets['Secteur'] == "Indice"],
-            resultats_complets[resultats_complets['Secteur'] != "Indice"]
-        ]).reset_index(drop=True)
-
-        # Créer également un tableau de métriques basiques (pour le code 2)
-        metriques_basiques = resultats_complets[['Symbole', 'Alpha', 'Beta', 'R-squared',
-                                                 'Rendement_Geo_Annualisé', 'Volatilité_Totale']]
-        metriques_basiques = metriques_basiques.set_index('Symbole')
+        source = DOSSIER_DONNEES if jeu_donnees_disponible() else fichier_excel
+        print(f"Chargement des données depuis {source}...")
+        with instrumentation.etape('chargement'):
+            prix_quotidiens, rendements_journaliers = charger_donnees(fichier_excel)
+
+        resultats = analyser(prix_quotidiens, rendements_journaliers, fichier_cache=fichier_cache)
+
+        with instrumentation.etape('agregation_secteurs'):
+            moyennes_secteur, resultats_complets, metriques_basiques = agreger_par_secteur(resultats)
 
         # Exporter les résultats
-        try:
-            # Exporter l'analyse sectorielle complète
-            with pd.ExcelWriter('analyse_sectorielle_5ans.xlsx') as writer:
-                # Exporter tous les résultats sur une feuille
-                resultats_complets.to_excel(writer, sheet_name='Analyse Complète', index=False)
-
-                # Exporter les détails par secteur sur des feuilles séparées
-                secteurs_uniques = [s for s in resultats_complets['Secteur'].unique() if s != "Indice"]
-                for secteur in secteurs_uniques:
-                    secteur_df = resultats_complets[resultats_complets['Secteur'] == secteur]
-                    if not secteur_df.empty:
-                        secteur_df.to_excel(writer, sheet_name=secteur[:31],
-                                            index=False)  # Excel limite les noms de feuilles à 31 caractères
-
-                # Exporter les moyennes par secteur
-                moyennes_secteur.to_excel(writer, sheet_name='Moyennes par Secteur', index=False)
-
-                # Exporter l'indice séparément
-                resultats_complets[resultats_complets['Secteur'] == "Indice"].to_excel(writer, sheet_name='Indice',
-                                                                                       index=False)
-
-            # Exporter également les métriques basiques (résultat du code 2)
-            with pd.ExcelWriter('metriques_performance_5ans.xlsx') as writer:
-                metriques_basiques.to_excel(writer, sheet_name='Métriques Performance')
-
-            print("\nAnalyse sectorielle exportée avec succès dans 'analyse_sectorielle_5ans.xlsx'!")
-            print("Métriques basiques exportées dans 'metriques_performance_5ans.xlsx'!")
-
-        except ImportError:
-            resultats_complets.to_csv('analyse_sectorielle_5ans.csv', index=False)
-            metriques_basiques.to_csv('metriques_performance_5ans.csv')
-            print("\nRésultats exportés avec succès au format CSV!")
-            print("Pour sauvegarder en Excel, installez openpyxl: pip install openpyxl")
+        with instrumentation.etape('export'):
+            exporter_analyse(resultats_complets, moyennes_secteur, metriques_basiques, format_export)
+
+        if complementaires:
+            symboles_actions = list(resultats.loc[resultats['Secteur'] != "Indice", 'Symbole'])
+            analyses_complementaires(prix_quotidiens, rendements_journaliers, symboles_actions, format_export,
+                                     format_glissant)
 
         print("\nAnalyse complète sur 5 ans terminée avec succès!")
         print(f"Nombre d'actions analysées: {len(resultats) - 1}")  # -1 pour l'indice
+        return 0
 
     except Exception as e:
         print(f"Erreur lors de l'exécution de l'analyse: {e}")
+        return 1
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Instrumentation optionnelle : --rapport, --fichier-rapport fichier.json et --profil {cprofile,echantillonnage}
+    configurer_depuis_ligne_de_commande()
+    raise SystemExit(main())
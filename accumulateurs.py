@@ -0,0 +1,229 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from annualisation import JOURS_TRADING_ANNEE
+
+# Fichier d'état par défaut, conservé entre deux exécutions
+FICHIER_ETAT = 'etat_accumulateurs.npz'
+
+# Tableaux d'état par symbole (tous de longueur N)
+CHAMPS_ETAT = ['nb', 'poids', 'poids2', 'moyenne_x', 'moyenne_y', 'm2x', 'm2y', 'cxy',
+               'premier_prix', 'dernier_prix', 'nb_prix']
+
+# Écart relatif toléré entre les prix mémorisés et ceux du panel avant de considérer un historique comme retraité
+TOLERANCE_RETRAITEMENT = 1e-6
+
+
+# État incrémental des métriques de chaque couple (action, indice de référence) :
+# moments de Welford pondérés (décroissance exponentielle optionnelle) et premier/dernier prix.
+# Chaque nouvelle observation met à jour toutes les actions en O(1) par action.
+# L'état est cumulatif (fenêtre croissante) : une date intégrée y reste quand elle sort de la fenêtre glissante
+# du panel écrit par Port.py, seule la décroissance réduit le poids des observations anciennes. Les métriques
+# couvrent donc toute la période depuis la création de l'état, et non les 5 dernières années du rapport de TO.
+class EtatAccumulateurs:
+    def __init__(self, symboles, indice_ref, decroissance=1.0, min_observations=30):
+        self.symboles = list(symboles)
+        self.indice_ref = indice_ref
+        self.decroissance = float(decroissance)
+        self.min_observations = min_observations
+        self.derniere_date = None
+        n = len(self.symboles)
+        for champ in CHAMPS_ETAT:
+            setattr(self, champ, np.zeros(n))
+        self.premier_prix[:] = np.nan
+        self.dernier_prix[:] = np.nan
+
+    # Ajouter de nouveaux symboles (état vide) sans toucher aux existants ; retourne les symboles ajoutés
+    def ajouter_symboles(self, symboles):
+        connus = set(self.symboles)
+        nouveaux = [s for s in dict.fromkeys(symboles) if s not in connus]
+        if not nouveaux:
+            return []
+        self.symboles.extend(nouveaux)
+        for champ in CHAMPS_ETAT:
+            valeur_initiale = np.nan if champ in ('premier_prix', 'dernier_prix') else 0.0
+            setattr(self, champ, np.concatenate([getattr(self, champ), np.full(len(nouveaux), valeur_initiale)]))
+        return nouveaux
+
+    # Intégrer une journée : rendements des actions (N), rendement de l'indice, prix des actions (N)
+    def mettre_a_jour(self, rendements_actions, rendement_indice, prix_actions=None):
+        y = np.asarray(rendements_actions, dtype=float)
+        x = float(rendement_indice)
+
+        masque = ~np.isnan(y) & ~np.isnan(x)
+        if masque.any():
+            # Décroissance exponentielle des observations passées (sans effet si decroissance = 1)
+            if self.decroissance < 1:
+                lam = np.where(masque, self.decroissance, 1.0)
+                self.poids *= lam
+                self.poids2 *= lam * lam
+                self.m2x *= lam
+                self.m2y *= lam
+                self.cxy *= lam
+
+            self.nb += masque
+            self.poids += masque
+            self.poids2 += masque
+            with np.errstate(invalid='ignore', divide='ignore'):
+                dx = np.where(masque, x - self.moyenne_x, 0.0)
+                dy = np.where(masque, y - self.moyenne_y, 0.0)
+                facteur = np.where(masque, 1 / self.poids, 0.0)
+            self.moyenne_x += dx * facteur
+            self.moyenne_y += dy * facteur
+            dx_apres = np.where(masque, x - self.moyenne_x, 0.0)
+            self.m2x += dx * dx_apres
+            self.m2y += dy * np.where(masque, y - self.moyenne_y, 0.0)
+            self.cxy += dy * dx_apres
+
+        if prix_actions is not None:
+            prix = np.asarray(prix_actions, dtype=float)
+            presents = ~np.isnan(prix)
+            self.premier_prix = np.where(presents & np.isnan(self.premier_prix), prix, self.premier_prix)
+            self.dernier_prix = np.where(presents, prix, self.dernier_prix)
+            self.nb_prix += presents
+
+    # Intégrer les dates d'un panel (toutes les actions de l'état)
+    def _integrer(self, rendements_journaliers, prix_quotidiens, dates):
+        rendements = rendements_journaliers.reindex(index=dates, columns=self.symboles).to_numpy(dtype=float)
+        rendements_indice = rendements_journaliers[self.indice_ref].reindex(dates).to_numpy(dtype=float)
+        prix = prix_quotidiens.reindex(index=dates, columns=self.symboles).to_numpy(dtype=float)
+        for i in range(len(dates)):
+            self.mettre_a_jour(rendements[i], rendements_indice[i], prix[i])
+
+    # Symboles dont l'historique a été retraité (splits, dividendes, stockage des prix corrigé) : le dernier prix
+    # intégré diffère du prix du panel à la même date, ou le panel a des prix antérieurs à derniere_date pour un
+    # symbole sans prix dans l'état. Seules les dates couvertes par l'état et par le panel sont comparées : le
+    # début du panel qui avance avec la fenêtre glissante n'est pas un retraitement.
+    def symboles_retraites(self, prix_quotidiens):
+        if self.derniere_date is None:
+            return []
+        historique = prix_quotidiens.loc[:self.derniere_date].reindex(columns=self.symboles).to_numpy(dtype=float)
+        if len(historique) == 0:
+            return []
+        presents = ~np.isnan(historique)
+        vides = ~presents.any(axis=0)
+        derniers = historique[len(historique) - 1 - presents[::-1].argmax(axis=0), np.arange(len(self.symboles))]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ecarts = np.abs(derniers / self.dernier_prix - 1)
+        retraites = ~vides & ((ecarts > TOLERANCE_RETRAITEMENT) | np.isnan(self.dernier_prix))
+        return [s for s, retraite in zip(self.symboles, retraites) if retraite]
+
+    # Recalculer l'état de quelques symboles en rejouant leur historique du panel jusqu'à la dernière date
+    # intégrée (symboles ajoutés après la création de l'état ou historiques retraités). Les dates antérieures
+    # au début du panel ne sont plus disponibles : ces symboles repartent de la fenêtre du panel.
+    def reconstruire_symboles(self, symboles, rendements_journaliers, prix_quotidiens):
+        if not symboles or self.derniere_date is None:
+            return
+        partiel = EtatAccumulateurs(symboles, self.indice_ref, self.decroissance, self.min_observations)
+        dates = prix_quotidiens.index[prix_quotidiens.index <= self.derniere_date]
+        partiel._integrer(rendements_journaliers, prix_quotidiens, dates)
+        positions = pd.Index(self.symboles).get_indexer(symboles)
+        for champ in CHAMPS_ETAT:
+            getattr(self, champ)[positions] = getattr(partiel, champ)
+
+    # Reconstruire tout l'état à partir du panel (après un retraitement général du stockage des prix) ; l'état
+    # repart de la fenêtre du panel
+    def reconstruire(self, rendements_journaliers, prix_quotidiens):
+        self.__init__(self.symboles, self.indice_ref, self.decroissance, self.min_observations)
+        return self.mettre_a_jour_panel(rendements_journaliers, prix_quotidiens)
+
+    # Intégrer les dates d'un panel postérieures à la dernière date déjà intégrée. Les symboles nouveaux et ceux
+    # dont l'historique a été retraité sont d'abord recalculés sur toutes les dates déjà intégrées.
+    def mettre_a_jour_panel(self, rendements_journaliers, prix_quotidiens):
+        retraites = self.symboles_retraites(prix_quotidiens)
+        if retraites:
+            print(f"Historique retraité pour {len(retraites)} symbole(s), état recalculé pour ces symboles")
+        nouveaux = self.ajouter_symboles([s for s in prix_quotidiens.columns if s != self.indice_ref])
+        self.reconstruire_symboles(retraites + nouveaux, rendements_journaliers, prix_quotidiens)
+
+        dates = prix_quotidiens.index
+        if self.derniere_date is not None:
+            dates = dates[dates > self.derniere_date]
+        if len(dates) == 0:
+            return 0
+
+        self._integrer(rendements_journaliers, prix_quotidiens, dates)
+        self.derniere_date = pd.Timestamp(dates[-1])
+        return len(dates)
+
+    # Métriques courantes, avec les mêmes colonnes que calculer_metriques_avancees
+    def metriques(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Variance pondérée sans biais (se réduit à M2 / (n - 1) sans décroissance)
+            denominateur = self.poids - self.poids2 / self.poids
+            vol_totale = np.sqrt(self.m2y / denominateur * JOURS_TRADING_ANNEE)
+            vol_indice = np.sqrt(self.m2x / denominateur * JOURS_TRADING_ANNEE)
+            correlation = self.cxy / np.sqrt(self.m2x * self.m2y)
+            beta = self.cxy / self.m2x
+            alpha = (self.moyenne_y - beta * self.moyenne_x) * JOURS_TRADING_ANNEE
+            vol_systematique = beta * vol_indice
+            vol_residuelle = np.sqrt(np.maximum(0, vol_totale ** 2 - vol_systematique ** 2))
+            rendement_geo = np.where(self.nb_prix > 1,
+                                     (self.dernier_prix / self.premier_prix) ** (JOURS_TRADING_ANNEE / self.nb_prix) - 1,
+                                     np.nan)
+
+        metriques = pd.DataFrame({
+            'Alpha': alpha,
+            'Beta': beta,
+            'R-squared': correlation ** 2,
+            'Correlation': correlation,
+            'Rendement_Geo_Annualisé': rendement_geo,
+            'Volatilité_Totale': vol_totale,
+            'Volatilité_Systématique': vol_systematique,
+            'Volatilité_Résiduelle': vol_residuelle
+        }, index=pd.Index(self.symboles, name='Symbole'))
+        return metriques[self.nb >= self.min_observations]
+
+    def sauvegarder(self, chemin=FICHIER_ETAT):
+        meta = {
+            'symboles': self.symboles,
+            'indice_ref': self.indice_ref,
+            'decroissance': self.decroissance,
+            'min_observations': self.min_observations,
+            'derniere_date': None if self.derniere_date is None else self.derniere_date.isoformat(),
+        }
+        with open(chemin, 'wb') as fichier:
+            np.savez(fichier, meta=np.array(json.dumps(meta, ensure_ascii=False)),
+                     **{champ: getattr(self, champ) for champ in CHAMPS_ETAT})
+
+    @classmethod
+    def charger(cls, chemin=FICHIER_ETAT):
+        with np.load(chemin) as donnees:
+            meta = json.loads(str(donnees['meta']))
+            etat = cls(meta['symboles'], meta['indice_ref'], meta['decroissance'], meta['min_observations'])
+            for champ in CHAMPS_ETAT:
+                setattr(etat, champ, donnees[champ].copy())
+        if meta['derniere_date'] is not None:
+            etat.derniere_date = pd.Timestamp(meta['derniere_date'])
+        return etat
+
+
+# Charger l'état (ou le créer), intégrer les nouvelles dates, le sauvegarder et retourner les métriques.
+# reconstruire=True recalcule tout l'état depuis le panel (après un retraitement du stockage des prix).
+def actualiser_metriques(rendements_journaliers, prix_quotidiens, indice_ref, chemin=FICHIER_ETAT, decroissance=1.0,
+                         reconstruire=False):
+    try:
+        etat = EtatAccumulateurs.charger(chemin)
+        if etat.indice_ref != indice_ref or etat.decroissance != decroissance:
+            print("Paramètres de l'état modifiés, reconstruction complète")
+            raise FileNotFoundError(chemin)
+    except FileNotFoundError:
+        etat = EtatAccumulateurs([], indice_ref, decroissance)
+
+    if reconstruire:
+        nb_dates = etat.reconstruire(rendements_journaliers, prix_quotidiens)
+        print(f"État incrémental reconstruit sur {nb_dates} date(s)")
+    else:
+        nb_nouvelles = etat.mettre_a_jour_panel(rendements_journaliers, prix_quotidiens)
+        print(f"{nb_nouvelles} nouvelle(s) date(s) intégrée(s) dans l'état incrémental")
+    etat.sauvegarder(chemin)
+    return etat.metriques()
+
+
+if __name__ == "__main__":
+    from TO import charger_donnees
+
+    prix_quotidiens, rendements_journaliers = charger_donnees('resultats_actions_5ans.xlsx')
+    print(actualiser_metriques(rendements_journaliers, prix_quotidiens, prix_quotidiens.columns[0]).round(4))
@@ -0,0 +1,16 @@
+import numpy as np
+
+# Nombre de jours de bourse par an (annualisation des rendements, alphas et volatilités de tous les modules)
+JOURS_TRADING_ANNEE = 252
+
+
+# Rendement géométrique annualisé de chaque colonne d'un panel de prix (tableau dates x actifs) à partir du premier
+# et du dernier prix disponibles, annualisé sur le nombre de prix présents (NaN avec moins de deux prix)
+def rendement_geometrique_annualise(prix):
+    presents = ~np.isnan(prix)
+    nb_prix = presents.sum(axis=0)
+    colonnes = np.arange(prix.shape[1])
+    premier = prix[presents.argmax(axis=0), colonnes]
+    dernier = prix[len(prix) - 1 - presents[::-1].argmax(axis=0), colonnes]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(nb_prix > 1, (dernier / premier) ** (JOURS_TRADING_ANNEE / nb_prix) - 1, np.nan)
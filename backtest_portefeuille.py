@@ -0,0 +1,228 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from TO import calculer_metriques_par_blocs, COLONNES_NUMERIQUES
+from export_rapports import exporter_feuilles
+from referentiel import referentiel
+from annualisation import JOURS_TRADING_ANNEE
+
+# Frais de transaction par défaut : fraction du montant échangé (10 points de base)
+COUT_TRANSACTION = 0.001
+
+# Niveaux de frais du balayage par défaut (0, 5, 10 et 25 points de base)
+COUTS_BALAYAGE = [0.0, 0.0005, 0.001, 0.0025]
+
+COLONNES_BACKTEST = ['Valeur_Finale', 'Rotation_Annuelle', 'Frais_Annuels'] + COLONNES_NUMERIQUES
+
+
+# Positions des dates de rebalancement dans le calendrier : première séance de chaque période pandas
+# ('W', 'M', 'Q', 'Y'), toutes les n séances (entier), dates explicites, ou None (achat puis conservation)
+def positions_rebalancement(dates, frequence='M', debut=0):
+    if frequence is None:
+        positions = np.array([debut])
+    elif isinstance(frequence, (int, np.integer)):
+        positions = np.arange(debut, len(dates), frequence)
+    elif isinstance(frequence, str):
+        periodes = dates.to_period(frequence).asi8
+        positions = np.concatenate([[debut], np.flatnonzero(np.diff(periodes) != 0) + 1])
+    else:
+        positions = np.concatenate([[debut], dates.searchsorted(pd.DatetimeIndex(frequence))])
+    positions = positions[(positions >= debut) & (positions < len(dates))]
+    return np.unique(positions)
+
+
+# Poids équipondérés sur une liste de symboles
+def poids_equipondere(symboles):
+    return pd.Series(1.0 / len(symboles), index=list(symboles))
+
+
+# Poids sectoriels : chaque secteur du référentiel reçoit sa pondération (égale par défaut),
+# répartie également entre ses actions
+def poids_sectoriels(symboles, ponderations_secteur=None):
+    secteurs = pd.Series(referentiel.secteurs_de(symboles), index=list(symboles)).astype(str)
+    effectifs = secteurs.map(secteurs.value_counts())
+    if ponderations_secteur is None:
+        return 1.0 / (secteurs.nunique() * effectifs)
+    poids = secteurs.map(ponderations_secteur).astype(float).fillna(0.0) / effectifs
+    return poids / poids.sum()
+
+
+# Couverture bêta-neutre : vente de l'indice de référence à hauteur de l'exposition du portefeuille.
+# Avec des bêtas glissants (DataFrame dates x symboles), retourne un calendrier de poids (dates x symboles).
+# Un bêta inconnu est pris égal à 1 (exposition de marché).
+def neutraliser_beta(poids, betas, indice_ref):
+    actions = poids.drop(indice_ref, errors='ignore')
+    if isinstance(betas, pd.DataFrame):
+        expositions = betas.reindex(columns=actions.index).fillna(1.0) * actions
+        calendrier = pd.DataFrame(np.broadcast_to(actions.to_numpy(), expositions.shape),
+                                  index=betas.index, columns=actions.index)
+        calendrier[indice_ref] = -expositions.sum(axis=1)
+        return calendrier
+    couverture = -(actions * betas.reindex(actions.index).fillna(1.0)).sum()
+    return pd.concat([actions, pd.Series({indice_ref: couverture})])
+
+
+# Grille de variantes : chaque jeu de poids combiné à chaque niveau de frais.
+# Retourne (poids par variante, frais par variante) à passer directement à backtester.
+def grille_variantes(poids, couts):
+    variantes, frais = {}, {}
+    for nom, poids_variante in poids.items():
+        for cout in couts:
+            nom_variante = f"{nom} | {cout * 1e4:g}pb"
+            variantes[nom_variante] = poids_variante
+            frais[nom_variante] = cout
+    return variantes, pd.Series(frais)
+
+
+# Poids cibles de toutes les variantes aux dates de rebalancement : tableau (R, V, N), ou (1, V, N) si toutes
+# les variantes ont des poids fixes. Un calendrier (DataFrame dates x symboles) est lu à la dernière date connue.
+def _cibles(poids, symboles, dates_rebalancement):
+    if all(isinstance(p, pd.Series) for p in poids.values()):
+        fixes = pd.DataFrame(list(poids.values())).reindex(columns=symboles).fillna(0.0)
+        return fixes.to_numpy(dtype=float)[None]
+
+    cibles = np.empty((len(dates_rebalancement), len(poids), len(symboles)))
+    for v, poids_variante in enumerate(poids.values()):
+        if isinstance(poids_variante, pd.Series):
+            cibles[:, v] = poids_variante.reindex(symboles).fillna(0.0).to_numpy(dtype=float)
+        else:
+            calendrier = poids_variante.reindex(columns=symboles).fillna(0.0).sort_index()
+            cibles[:, v] = calendrier.reindex(dates_rebalancement, method='ffill').fillna(0.0).to_numpy(dtype=float)
+    return cibles
+
+
+# Reporter les poids des actifs sans cotation sur les actifs cotés, jambe acheteuse et jambe vendeuse séparément
+# (une jambe entièrement indisponible reste en liquidités)
+def _renormaliser(cible, cotes):
+    retenue = np.zeros_like(cible)
+    for signe in (1.0, -1.0):
+        jambe = np.clip(signe * cible, 0.0, None)
+        total = jambe.sum(axis=1)
+        jambe *= cotes
+        total_cote = jambe.sum(axis=1)
+        facteur = np.divide(total, total_cote, out=np.zeros_like(total), where=total_cote > 0)
+        retenue += signe * jambe * facteur[:, None]
+    return retenue
+
+
+# Backtest vectorisé de plusieurs variantes de poids en un seul appel.
+# `poids` : DataFrame variantes x symboles, Series (une variante), ou dict {nom: Series ou calendrier DataFrame}.
+# Entre deux rebalancements les positions dérivent avec les prix : la valeur de chaque variante est le produit de la
+# matrice des prix relatifs (dates x actifs) par ses poids, une multiplication matricielle par période pour toutes
+# les variantes. Les poids peuvent être négatifs ; 1 - somme(poids) est en liquidités (rendement nul). Les frais
+# (`cout_transaction` : scalaire ou Series par variante) s'appliquent au montant échangé, achat initial compris.
+# Retourne la valeur liquidative (base 1), la rotation (somme des |écarts de poids|) et les frais payés (fraction
+# de la valeur) à chaque rebalancement.
+def backtester(prix, poids, frequence='M', cout_transaction=COUT_TRANSACTION, renormaliser=True):
+    if isinstance(poids, pd.Series):
+        poids = {poids.name or 'Portefeuille': poids}
+    elif isinstance(poids, pd.DataFrame):
+        poids = {nom: ligne for nom, ligne in poids.iterrows()}
+    noms = list(poids)
+    symboles = list(dict.fromkeys(s for p in poids.values() for s in (p.index if isinstance(p, pd.Series)
+                                                                       else p.columns)))
+    manquants = [s for s in symboles if s not in prix.columns]
+    if manquants:
+        raise ValueError(f"Symboles absents du panel de prix: {', '.join(map(str, manquants))}")
+
+    if isinstance(cout_transaction, pd.Series):
+        couts = cout_transaction.reindex(noms).fillna(0.0).to_numpy(dtype=float)
+    else:
+        couts = np.broadcast_to(np.asarray(cout_transaction, dtype=float), (len(noms),))
+
+    # Prix complétés vers l'avant (comme Port.py) : un actif coté à un rebalancement le reste jusqu'au suivant
+    valeurs = prix[symboles].ffill().to_numpy(dtype=float)
+    cotes = np.isfinite(valeurs) & (valeurs > 0)
+    if not cotes.any():
+        raise ValueError("Aucun prix disponible pour les symboles des portefeuilles")
+    dates = prix.index
+    positions = positions_rebalancement(dates, frequence, int(cotes.any(axis=1).argmax()))
+    cibles = _cibles(poids, symboles, dates[positions])
+
+    nav = np.full((len(dates), len(noms)), np.nan)
+    rotations = np.zeros((len(positions), len(noms)))
+    frais = np.zeros((len(positions), len(noms)))
+    valeur = np.ones(len(noms))
+    derives = np.zeros((len(noms), len(symboles)))  # poids juste avant le rebalancement (départ en liquidités)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for k, debut in enumerate(positions):
+            fin = positions[k + 1] if k + 1 < len(positions) else len(dates) - 1
+            disponibles = cotes[debut]
+            cible = cibles[min(k, len(cibles) - 1)]
+            cible = _renormaliser(cible, disponibles) if renormaliser else cible * disponibles
+
+            # Rotation et frais au rebalancement
+            rotations[k] = np.abs(cible - derives).sum(axis=1)
+            frais[k] = couts * rotations[k]
+            valeur = valeur * (1 - frais[k])
+
+            # Dérive jusqu'au rebalancement suivant : prix relatifs x poids, liquidités constantes
+            relatifs = valeurs[debut:fin + 1, disponibles] / valeurs[debut, disponibles]
+            croissance = relatifs @ cible[:, disponibles].T + (1 - cible.sum(axis=1))
+            nav[debut:fin + 1] = valeur * croissance
+
+            valeur = valeur * croissance[-1]
+            derives = np.zeros_like(derives)
+            derives[:, disponibles] = cible[:, disponibles] * relatifs[-1] / croissance[-1][:, None]
+
+    dates_rebalancement = dates[positions]
+    return (pd.DataFrame(nav, index=dates, columns=noms).iloc[positions[0]:],
+            pd.DataFrame(rotations, index=dates_rebalancement, columns=noms),
+            pd.DataFrame(frais, index=dates_rebalancement, columns=noms))
+
+
+# Synthèse par variante : valeur finale, rotation et frais annualisés (hors achat initial pour la rotation),
+# puis les mêmes métriques que TO.py (régression sur l'indice, volatilités, risque extrême)
+def synthese_backtest(nav, rotations, frais, rendements_indice):
+    nb_annees = max(len(nav) - 1, 1) / JOURS_TRADING_ANNEE
+    rendements = nav.pct_change(fill_method=None)
+    metriques = calculer_metriques_par_blocs(rendements, rendements_indice, nav, list(nav.columns))
+
+    synthese = metriques.reindex(nav.columns)
+    synthese.insert(0, 'Frais_Annuels', frais.sum() / nb_annees)
+    synthese.insert(0, 'Rotation_Annuelle', rotations.iloc[1:].sum() / nb_annees)
+    synthese.insert(0, 'Valeur_Finale', nav.ffill().iloc[-1])
+    synthese.index.name = 'Variante'
+    return synthese[COLONNES_BACKTEST]
+
+
+# Exporter la synthèse, les valeurs liquidatives et les rotations (CSV si openpyxl n'est pas disponible)
+def exporter_backtest(nav, rotations, synthese, fichier_excel='backtest_portefeuilles_5ans.xlsx',
+                      format_export='excel'):
+    feuilles = [('Synthèse', synthese.round(4), True, 'backtest_synthese_5ans'),
+                ('Valeur Liquidative', nav.round(6), True, 'backtest_valeur_liquidative_5ans'),
+                ('Rotation', rotations.round(4), True, 'backtest_rotation_5ans')]
+    format_utilise = exporter_feuilles(fichier_excel, feuilles, format_export)
+    if format_utilise == 'excel':
+        print(f"Backtest exporté dans '{fichier_excel}'!")
+    else:
+        print(f"Backtest exporté au format {format_utilise.upper()}!")
+
+
+# Balayage : mélanges équipondéré / sectoriel (`nb_melanges` parts de l'équipondéré entre 0 et 100 %), avec ou sans
+# couverture bêta-neutre (bêtas glissants 1 an), pour chaque niveau de frais. Retourne (variantes, frais) à passer
+# à backtester.
+def variantes_balayage(prix_quotidiens, rendements_journaliers, nb_melanges=26, couts=COUTS_BALAYAGE):
+    from metriques_glissantes import calculer_metriques_glissantes
+
+    indice_ref = prix_quotidiens.columns[0]
+    actions = [s for s in referentiel.symboles if s in prix_quotidiens.columns and s != indice_ref]
+    betas = calculer_metriques_glissantes(rendements_journaliers[actions], rendements_journaliers[indice_ref],
+                                          JOURS_TRADING_ANNEE)['Beta']
+    equipondere, sectoriel = poids_equipondere(actions), poids_sectoriels(actions)
+    poids = {}
+    for part in np.linspace(0, 1, nb_melanges):
+        melange = part * equipondere + (1 - part) * sectoriel
+        poids[f"EW {part:.0%}"] = melange
+        poids[f"EW {part:.0%} bêta-neutre"] = neutraliser_beta(melange, betas, indice_ref)
+    return grille_variantes(poids, couts)
+
+
+if __name__ == "__main__":
+    # Équivalent de : python cli.py backtest [options]
+    import cli
+
+    raise SystemExit(cli.main(['backtest'] + sys.argv[1:]))
@@ -0,0 +1,270 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import TO
+from panel_binaire import sauvegarder_jeu_donnees, charger_jeu_donnees, PanelCompact
+from conversion_devises import ConvertisseurDevises, devise_de_base
+from export_rapports import exporter_feuilles
+from referentiel import referentiel
+from backtest_portefeuille import backtester
+from cache_resultats import CacheResultats
+from correlations_croisees import correlations_croisees
+
+# Tailles d'univers mesurées par défaut (nombre d'actions)
+TAILLES_DEFAUT = [20, 500, 5000]
+
+# Fichier de référence des mesures
+FICHIER_BENCHMARK = 'benchmark_resultats.json'
+
+# Au-delà de ces tailles d'univers, la boucle statsmodels de référence et les étapes Excel (écritures et relecture
+# du classeur) sont ignorées par défaut : leur durée croît bien plus vite que celle du chemin vectorisé mesuré
+TAILLE_MAX_BOUCLE = 1000
+TAILLE_MAX_EXCEL = 1000
+
+# Places boursières synthétiques : unité de cotation et taux moyen vers l'euro (mêmes ordres de grandeur que Port.py)
+PLACES_SYNTHETIQUES = {
+    '.PA': ('EUR', 1.0), '.DE': ('EUR', 1.0), '.AS': ('EUR', 1.0), '.MC': ('EUR', 1.0),
+    '.L': ('GBp', 1.15), '.SW': ('CHF', 0.95), '.ST': ('SEK', 0.086), '.CO': ('DKK', 0.134),
+}
+
+
+# Générer un univers synthétique : N actions x T jours de rendements corrélés (marché + secteur + idiosyncratique),
+# prix en devise locale (pence pour Londres) avec des taux de change historiques synthétiques, introductions en
+# bourse tardives et trous de cotation. Retourne (prix locaux avec l'indice en euros en première colonne,
+# unité de cotation par symbole, taux de change dates x devises en EUR pour 1 unité, secteur par symbole).
+def generer_univers(nb_actions, nb_jours=1260, graine=0, taux_trous=0.01):
+    rng = np.random.default_rng(graine)
+    dates = pd.bdate_range(end='2024-12-31', periods=nb_jours, name='Date')
+    noms_secteurs = referentiel.noms_secteurs()
+
+    marche = rng.normal(0.0003, 0.011, nb_jours)
+    facteurs_secteur = rng.normal(0, 0.007, (nb_jours, len(noms_secteurs)))
+    codes_secteur = rng.integers(len(noms_secteurs), size=nb_actions)
+    betas = rng.normal(1.0, 0.3, nb_actions)
+    rendements = (marche[:, None] * betas + facteurs_secteur[:, codes_secteur]
+                  + rng.normal(0, 0.015, (nb_jours, nb_actions)))
+
+    places = list(PLACES_SYNTHETIQUES)
+    suffixes = rng.choice(places, size=nb_actions)
+    unites = [PLACES_SYNTHETIQUES[s][0] for s in suffixes]
+    facteurs = np.array([devise_de_base(unite)[1] for unite in unites])
+    prix = 50 * np.exp(np.cumsum(np.log1p(rendements), axis=0)) / facteurs
+
+    # Taux de change : marche aléatoire autour du taux moyen de chaque devise
+    taux_moyens = {devise_de_base(unite)[0]: taux for unite, taux in PLACES_SYNTHETIQUES.values() if unite != 'EUR'}
+    taux_change = pd.DataFrame({devise: taux * np.exp(np.cumsum(rng.normal(0, 0.004, nb_jours)))
+                                for devise, taux in taux_moyens.items()}, index=dates)
+
+    # Introductions tardives (10 % des actions) et trous de cotation isolés
+    tardives = rng.random(nb_actions) < 0.10
+    debuts = np.where(tardives, rng.integers(0, nb_jours // 2, size=nb_actions), 0)
+    prix[np.arange(nb_jours)[:, None] < debuts] = np.nan
+    prix[rng.random(prix.shape) < taux_trous] = np.nan
+
+    symboles = [f'SYN{i:05d}{suffixe}' for i, suffixe in enumerate(suffixes)]
+    indice = pd.Series(100 * np.cumprod(1 + marche), index=dates, name='^STOXX')
+    prix_locaux = pd.concat([indice, pd.DataFrame(prix, index=dates, columns=symboles)], axis=1)
+    unite_par_symbole = dict(zip(symboles, unites))
+    secteur_par_symbole = {s: noms_secteurs[c] for s, c in zip(symboles, codes_secteur)}
+    return prix_locaux, unite_par_symbole, taux_change, secteur_par_symbole
+
+
+# Conversion en euros comme Port.recuperer_donnees : panel compact converti en place, une multiplication par bloc
+# d'unité de cotation, avec les taux historiques lus dans `fichier_taux`
+def convertir_univers(prix_locaux, unite_par_symbole, fichier_taux):
+    panel = PanelCompact.depuis_dataframe(prix_locaux, dtype=np.float64)
+    convertisseur = ConvertisseurDevises(fichier_taux=fichier_taux)
+    convertisseur.convertir_matrice(panel.valeurs, pd.DatetimeIndex(panel.dates), panel.symboles, unite_par_symbole)
+    return panel.vers_dataframe()
+
+
+# Chronométrer une étape ; la valeur retournée par la fonction est conservée
+def _chronometrer(mesures, etape, fonction, *args, **kwargs):
+    debut = time.perf_counter()
+    resultat = fonction(*args, **kwargs)
+    mesures[etape] = round(time.perf_counter() - debut, 6)
+    print(f"  {etape:<28} {mesures[etape]:>10.3f} s")
+    return resultat
+
+
+# Métriques action par action avec calculer_metriques_avancees (référence historique de TO.main)
+def _metriques_boucle(rendements_journaliers, prix_quotidiens, indice_ref):
+    lignes = {}
+    for symbole in rendements_journaliers.columns.drop(indice_ref):
+        rendements_action = rendements_journaliers[symbole].dropna()
+        rendements_indice = rendements_journaliers[indice_ref].loc[rendements_action.index]
+        metriques = TO.calculer_metriques_avancees(rendements_action, rendements_indice,
+                                                   prix_quotidiens[symbole].dropna())
+        if metriques:
+            lignes[symbole] = metriques
+    return pd.DataFrame.from_dict(lignes, orient='index')
+
+
+# Mesurer toutes les étapes du traitement pour une taille d'univers
+def mesurer_taille(nb_actions, nb_jours, avec_excel=True, avec_boucle=True):
+    print(f"\nUnivers synthétique: {nb_actions} actions x {nb_jours} jours")
+    mesures = {}
+    prix_locaux, unite_par_symbole, taux_change, secteur_par_symbole = _chronometrer(
+        mesures, 'generation', generer_univers, nb_actions, nb_jours)
+
+    repertoire_initial = os.getcwd()
+    with tempfile.TemporaryDirectory() as dossier:
+        os.chdir(dossier)
+        try:
+            # Conversion en euros (taux historiques lus dans un fichier, comme un fichier de taux utilisateur)
+            taux_change.to_csv('taux_change.csv', date_format='%d/%m/%Y')
+            prix_quotidiens = _chronometrer(mesures, 'conversion_devises', convertir_univers, prix_locaux,
+                                            unite_par_symbole, 'taux_change.csv')
+            rendements_journaliers = prix_quotidiens.pct_change(fill_method=None).dropna(how='all')
+            indice_ref = prix_quotidiens.columns[0]
+            actions = list(rendements_journaliers.columns.drop(indice_ref))
+
+            # Chargement : jeu binaire, puis classeur Excel écrit comme le fait Port.py
+            _chronometrer(mesures, 'export_jeu_binaire', sauvegarder_jeu_donnees,
+                          prix_quotidiens, rendements_journaliers, 'donnees')
+            _chronometrer(mesures, 'charger_donnees_binaire', charger_jeu_donnees, 'donnees')
+            if avec_excel:
+                feuilles = [('Prix Quotidiens', prix_quotidiens, True, 'prix_quotidiens_5ans'),
+                            ('Rendements Journaliers', rendements_journaliers, True, 'rendements_journaliers_5ans')]
+                _chronometrer(mesures, 'export_donnees_excel', exporter_feuilles, 'resultats_actions_5ans.xlsx',
+                              feuilles)
+                _chronometrer(mesures, 'export_donnees_flux', exporter_feuilles, 'resultats_actions_5ans.xlsx',
+                              feuilles, 'flux')
+                _chronometrer(mesures, 'charger_donnees', TO.charger_donnees, 'resultats_actions_5ans.xlsx',
+                              dossier_binaire='absent')
+
+            # Métriques sur tout l'univers
+            if avec_boucle:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    _chronometrer(mesures, 'metriques_boucle', _metriques_boucle,
+                                  rendements_journaliers, prix_quotidiens, indice_ref)
+            metriques = _chronometrer(mesures, 'metriques_panel', TO.calculer_metriques_panel,
+                                      rendements_journaliers[actions], rendements_journaliers[indice_ref],
+                                      prix_quotidiens[actions])
+            metriques_risque = _chronometrer(mesures, 'metriques_risque', TO.calculer_metriques_risque,
+                                             rendements_journaliers[actions], rendements_journaliers[indice_ref],
+                                             prix_quotidiens[actions])
+            metriques = metriques.join(metriques_risque)
+
+            # Corrélations croisées par blocs (matrice, pairs, secteurs et classification)
+            _chronometrer(mesures, 'correlations_croisees', correlations_croisees, rendements_journaliers[actions],
+                          [secteur_par_symbole[s] for s in actions])
+
+            # Cache des résultats : premier calcul (toutes les actions) puis relance sans changement
+            cache = CacheResultats('cache_resultats.sqlite', TO.COLONNES_NUMERIQUES, TO.VERSION_METRIQUES)
+            try:
+                for etape in ('metriques_cache_froid', 'metriques_cache_chaud'):
+                    _chronometrer(mesures, etape, TO.calculer_metriques_avec_cache, rendements_journaliers,
+                                  rendements_journaliers[indice_ref], prix_quotidiens, actions, cache)
+            finally:
+                cache.fermer()
+
+            # Backtest d'un balayage de 100 variantes (équipondéré perturbé, rebalancement mensuel)
+            rng = np.random.default_rng(1)
+            variantes = pd.DataFrame(np.abs(1 + 0.2 * rng.standard_normal((100, len(actions)))) / len(actions),
+                                     columns=actions)
+            _chronometrer(mesures, 'backtest_100_variantes', backtester, prix_quotidiens, variantes, 'M')
+
+            # Agrégation sectorielle et exports
+            metriques.insert(0, 'Symbole', metriques.index)
+            metriques.insert(0, 'Entreprise', metriques.index)
+            metriques.insert(0, 'Secteur', [secteur_par_symbole[s] for s in metriques.index])
+            resultats = metriques.reset_index(drop=True)[TO.COLONNES_RESULTATS]
+            tableaux = _chronometrer(mesures, 'agregation_secteurs', TO.agreger_par_secteur, resultats)
+            moyennes_secteur, resultats_complets, metriques_basiques = tableaux
+            if avec_excel:
+                _chronometrer(mesures, 'export_excel', TO.exporter_analyse,
+                              resultats_complets, moyennes_secteur, metriques_basiques)
+                _chronometrer(mesures, 'export_excel_flux', TO.exporter_analyse,
+                              resultats_complets, moyennes_secteur, metriques_basiques, 'flux')
+            _chronometrer(mesures, 'export_csv', resultats_complets.to_csv, 'analyse_sectorielle_5ans.csv',
+                          index=False)
+        finally:
+            os.chdir(repertoire_initial)
+    return mesures
+
+
+# Comparer des mesures à une référence ; retourne la liste des régressions (ratio > seuil)
+def comparer(mesures, reference, seuil=1.5, plancher=0.05):
+    regressions = []
+    for taille, etapes in mesures.items():
+        for etape, duree in etapes.items():
+            ancienne = reference.get(taille, {}).get(etape)
+            if ancienne is None:
+                continue
+            ratio = duree / ancienne if ancienne > 0 else float('inf')
+            marque = ''
+            if ratio > seuil and duree - ancienne > plancher:
+                regressions.append((taille, etape, ancienne, duree))
+                marque = '  <-- RÉGRESSION'
+            print(f"  {taille:>6} {etape:<28} {ancienne:>9.3f} s -> {duree:>9.3f} s (x{ratio:.2f}){marque}")
+    return regressions
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmark des étapes de Port.py/TO.py sur un univers synthétique")
+    parser.add_argument('--tailles', type=int, nargs='+', default=TAILLES_DEFAUT, help="Nombres d'actions")
+    parser.add_argument('--jours', type=int, default=1260, help="Nombre de jours de bourse")
+    parser.add_argument('--sortie', default=FICHIER_BENCHMARK, help="Fichier JSON des mesures")
+    parser.add_argument('--comparer', help="Fichier JSON de référence à comparer")
+    parser.add_argument('--seuil', type=float, default=1.5, help="Ratio de ralentissement signalé comme régression")
+    parser.add_argument('--sans-excel', action='store_true', help="Ignorer les étapes Excel")
+    parser.add_argument('--sans-boucle', action='store_true', help="Ignorer la boucle statsmodels de référence")
+    parser.add_argument('--taille-max-excel', type=int, default=TAILLE_MAX_EXCEL,
+                        help="Ignorer les étapes Excel au-delà de ce nombre d'actions")
+    parser.add_argument('--taille-max-boucle', type=int, default=TAILLE_MAX_BOUCLE,
+                        help="Ignorer la boucle statsmodels au-delà de ce nombre d'actions")
+    args = parser.parse_args(arguments)
+
+    mesures = {}
+    for taille in args.tailles:
+        avec_excel = not args.sans_excel and taille <= args.taille_max_excel
+        avec_boucle = not args.sans_boucle and taille <= args.taille_max_boucle
+        if taille > args.taille_max_excel or taille > args.taille_max_boucle:
+            print(f"\n{taille} actions : étapes ignorées au-delà des tailles maximales :"
+                  + (" Excel" if taille > args.taille_max_excel else "")
+                  + (" boucle statsmodels" if taille > args.taille_max_boucle else ""))
+        mesures[str(taille)] = mesurer_taille(taille, args.jours, avec_excel, avec_boucle)
+    rapport = {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'processeurs': os.cpu_count(),
+            'jours': args.jours,
+            'taille_max_excel': None if args.sans_excel else args.taille_max_excel,
+            'taille_max_boucle': None if args.sans_boucle else args.taille_max_boucle,
+        },
+        'resultats': mesures,
+    }
+    with open(args.sortie, 'w', encoding='utf-8') as fichier:
+        json.dump(rapport, fichier, indent=2, ensure_ascii=False)
+    print(f"\nMesures enregistrées dans '{args.sortie}'")
+
+    if args.comparer:
+        with open(args.comparer, encoding='utf-8') as fichier:
+            reference = json.load(fichier)['resultats']
+        print(f"\nComparaison avec '{args.comparer}':")
+        regressions = comparer(mesures, reference, args.seuil)
+        if regressions:
+            print(f"{len(regressions)} régression(s) de performance détectée(s)")
+            return 1
+        print("Aucune régression de performance")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
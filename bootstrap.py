@@ -0,0 +1,148 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from annualisation import JOURS_TRADING_ANNEE
+from export_rapports import exporter_feuilles
+from TO import calculer_metriques_panel
+
+METRIQUES_BOOTSTRAP = ['Alpha', 'Beta', 'Volatilité_Totale', 'Rendement_Geo_Annualisé']
+
+# Nombre maximal d'éléments (tirages x dates x actions) évalués simultanément, pour borner la mémoire
+ELEMENTS_PAR_BLOC = 4_000_000
+
+# Données partagées par les processus de travail (initialisées une seule fois par processus)
+_donnees_processus = {}
+
+
+# Indices du bootstrap stationnaire (Politis-Romano) : blocs de longueur géométrique de moyenne `longueur_bloc`
+def indices_stationnaires(nb_dates, nb_tirages, longueur_bloc, rng):
+    debuts = rng.integers(0, nb_dates, size=(nb_tirages, nb_dates))
+    sauts = rng.random((nb_tirages, nb_dates)) < 1.0 / longueur_bloc
+    sauts[:, 0] = True
+
+    # Position du dernier saut pour chaque date, puis décalage depuis ce saut
+    positions = np.arange(nb_dates)
+    dernier_saut = np.maximum.accumulate(np.where(sauts, positions, 0), axis=1)
+    depart = np.take_along_axis(debuts, dernier_saut, axis=1)
+    return (depart + positions - dernier_saut) % nb_dates
+
+
+# Indices du bootstrap par blocs mobiles : blocs consécutifs de longueur fixe, tronqués à nb_dates
+def indices_blocs_mobiles(nb_dates, nb_tirages, longueur_bloc, rng):
+    nb_blocs = -(-nb_dates // longueur_bloc)
+    debuts = rng.integers(0, nb_dates - longueur_bloc + 1, size=(nb_tirages, nb_blocs))
+    indices = (debuts[:, :, None] + np.arange(longueur_bloc)).reshape(nb_tirages, -1)
+    return indices[:, :nb_dates]
+
+
+GENERATEURS_INDICES = {'stationnaire': indices_stationnaires, 'blocs_mobiles': indices_blocs_mobiles}
+
+
+# Métriques de toutes les actions pour un lot de tirages (indices : tirages x dates), résultat tirages x actions
+# en simple précision (seulement pour les tirages ; les estimations ponctuelles viennent de TO)
+def evaluer_tirages(y, x, indices, min_observations=30):
+    yb = y[indices]
+    xb = x[indices][:, :, None]
+    masque = ~np.isnan(yb) & ~np.isnan(xb)
+    y0 = np.where(masque, yb, 0.0)
+    x0 = np.where(masque, xb, 0.0)
+
+    n = masque.sum(axis=1).astype(float)
+    n[n < min_observations] = np.nan
+    sx = x0.sum(axis=1)
+    sy = y0.sum(axis=1)
+    sxx = (x0 * x0).sum(axis=1)
+    syy = (y0 * y0).sum(axis=1)
+    sxy = (x0 * y0).sum(axis=1)
+    log_croissance = np.log1p(y0).sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cxx = sxx - sx * sx / n
+        cyy = syy - sy * sy / n
+        beta = (sxy - sx * sy / n) / cxx
+        alpha = (sy - beta * sx) / n * JOURS_TRADING_ANNEE
+        vol_totale = np.sqrt(np.maximum(cyy, 0) / (n - 1) * JOURS_TRADING_ANNEE)
+        rendement_geo = np.expm1(log_croissance * JOURS_TRADING_ANNEE / n)
+
+    return np.stack([alpha, beta, vol_totale, rendement_geo]).astype(np.float32)
+
+
+def _initialiser_processus(y, x):
+    _donnees_processus['y'] = y
+    _donnees_processus['x'] = x
+
+
+# Tâche d'un processus : générer et évaluer `nb_tirages` tirages avec sa propre graine
+def _evaluer_lot(graine, nb_tirages, longueur_bloc, methode, min_observations):
+    y, x = _donnees_processus['y'], _donnees_processus['x']
+    rng = np.random.default_rng(graine)
+    indices = GENERATEURS_INDICES[methode](len(y), nb_tirages, longueur_bloc, rng)
+
+    # Sous-lots pour borner la mémoire des tableaux tirages x dates x actions
+    taille = max(1, ELEMENTS_PAR_BLOC // (y.shape[0] * y.shape[1]))
+    return np.concatenate([evaluer_tirages(y, x, indices[i:i + taille], min_observations)
+                           for i in range(0, nb_tirages, taille)], axis=1)
+
+
+# Intervalles de confiance bootstrap pour Alpha, Beta, Volatilité_Totale et Rendement_Geo_Annualisé.
+# Chaque lot de tirages reçoit une graine dérivée de `graine` : les résultats ne dépendent pas du nombre de processus.
+# Les estimations ponctuelles sont celles de TO.calculer_metriques_panel (Rendement_Geo_Annualisé calculé sur
+# prix_actions, comme dans le rapport sectoriel).
+def intervalles_bootstrap(rendements_actions, rendements_indice, prix_actions=None, nb_tirages=1000, longueur_bloc=20,
+                          methode='stationnaire', niveau=0.95, graine=0, nb_processus=None,
+                          tirages_par_lot=250, min_observations=30):
+    if methode not in GENERATEURS_INDICES:
+        raise ValueError(f"Méthode de bootstrap inconnue: {methode}")
+
+    y = rendements_actions.to_numpy(dtype=float)
+    x = rendements_indice.reindex(rendements_actions.index).to_numpy(dtype=float)
+    tailles = [min(tirages_par_lot, nb_tirages - i) for i in range(0, nb_tirages, tirages_par_lot)]
+    graines = np.random.SeedSequence(graine).spawn(len(tailles))
+
+    nb_processus = nb_processus or os.cpu_count() or 1
+    if nb_processus == 1:
+        _initialiser_processus(y, x)
+        lots = [_evaluer_lot(g, t, longueur_bloc, methode, min_observations) for g, t in zip(graines, tailles)]
+    else:
+        with ProcessPoolExecutor(max_workers=nb_processus, initializer=_initialiser_processus,
+                                 initargs=(y, x)) as executeur:
+            lots = list(executeur.map(_evaluer_lot, graines, tailles, [longueur_bloc] * len(tailles),
+                                      [methode] * len(tailles), [min_observations] * len(tailles)))
+    tirages = np.concatenate(lots, axis=1)  # métriques x tirages x actions
+
+    # Estimations ponctuelles sur l'échantillon d'origine (double précision) et quantiles des tirages
+    estimations = calculer_metriques_panel(rendements_actions, rendements_indice, prix_actions,
+                                           min_observations).reindex(rendements_actions.columns)
+    risque = (1 - niveau) / 2
+    with np.errstate(invalid='ignore'):
+        bornes = np.nanquantile(tirages, [risque, 1 - risque], axis=1)
+
+    colonnes = {}
+    for i, metrique in enumerate(METRIQUES_BOOTSTRAP):
+        colonnes[metrique] = estimations[metrique].to_numpy()
+        colonnes[f'{metrique}_IC_Bas'] = bornes[0, i]
+        colonnes[f'{metrique}_IC_Haut'] = bornes[1, i]
+    return pd.DataFrame(colonnes, index=rendements_actions.columns)
+
+
+# Exporter les intervalles de confiance (Excel, ou CSV/Parquet via exporter_feuilles)
+def exporter_intervalles(intervalles, fichier_excel='intervalles_confiance_5ans.xlsx', format_export='excel'):
+    feuilles = [('Intervalles Bootstrap', intervalles.round(4).rename_axis('Symbole'), True,
+                 'intervalles_confiance_5ans')]
+
+    format_utilise = exporter_feuilles(fichier_excel, feuilles, format_export)
+    if format_utilise == 'excel':
+        print(f"Intervalles de confiance exportés dans '{fichier_excel}'!")
+    else:
+        print(f"Intervalles de confiance exportés au format {format_utilise.upper()}!")
+
+
+if __name__ == "__main__":
+    # Équivalent de : python cli.py bootstrap [options]
+    import cli
+
+    raise SystemExit(cli.main(['bootstrap'] + sys.argv[1:]))
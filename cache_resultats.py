@@ -0,0 +1,142 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# Base SQLite par défaut du cache des résultats par symbole
+FICHIER_CACHE = 'cache_resultats.sqlite'
+
+# Taille maximale du cache (octets de résultats stockés) ; au-delà, les entrées les moins récemment utilisées
+# sont supprimées jusqu'à revenir à FRACTION_APRES_EVICTION de cette taille
+TAILLE_MAX_CACHE = 64 * 1024 ** 2
+FRACTION_APRES_EVICTION = 0.9
+
+# Nombre de clés par requête SQL (limite du nombre de paramètres de SQLite)
+CLES_PAR_REQUETE = 500
+
+
+# Plages contiguës [premier, dernier] des valeurs présentes de chaque colonne (hors de sa plage, une colonne
+# n'intervient dans aucune métrique)
+def _plages(valeurs):
+    presents = ~np.isnan(valeurs)
+    debuts = presents.argmax(axis=0)
+    fins = len(valeurs) - presents[::-1].argmax(axis=0)
+    vides = ~presents.any(axis=0)
+    return np.where(vides, 0, debuts), np.where(vides, 0, fins)
+
+
+# Colonnes d'un panel en matrice d'ordre colonne (chaque colonne contiguë, sans copie si c'est déjà le cas)
+def _colonnes(panel, symboles):
+    return np.asfortranarray(panel.reindex(columns=symboles).to_numpy(dtype=float))
+
+
+# Résumé des dates de la plage de chaque colonne : première et dernière date, nombre de dates et somme de contrôle
+# (sommes cumulées calculées une fois pour tout le calendrier, au lieu de hacher les dates de chaque symbole)
+def _dates_plages(dates, debuts, fins):
+    cumul = np.concatenate([[0], np.cumsum(dates)])
+    vides = fins <= debuts
+    resume = np.stack([dates[np.minimum(debuts, len(dates) - 1)], dates[np.maximum(fins - 1, 0)], fins - debuts,
+                       cumul[fins] - cumul[debuts]], axis=1) if len(dates) else np.zeros((len(debuts), 4))
+    resume[vides] = 0
+    return resume.astype(np.int64)
+
+
+# Empreinte du contenu des données de chaque symbole : valeurs de ses rendements et de ses prix sur leur plage
+# présente et dates de ces plages, rendements de l'indice sur les mêmes dates, configuration des métriques
+# (version, colonnes). Deux symboles aux données identiques partagent la même empreinte ; ajouter des dates sans
+# valeur pour un symbole ne change pas la sienne.
+def empreintes(rendements_journaliers, rendements_indice, prix_quotidiens, symboles, configuration=''):
+    indice = np.ascontiguousarray(rendements_indice.reindex(rendements_journaliers.index), dtype=float)
+    rendements = _colonnes(rendements_journaliers, symboles)
+    prix = _colonnes(prix_quotidiens, symboles)
+    debuts_r, fins_r = _plages(rendements)
+    debuts_p, fins_p = _plages(prix)
+    dates_r = _dates_plages(rendements_journaliers.index.asi8, debuts_r, fins_r)
+    dates_p = _dates_plages(prix_quotidiens.index.asi8, debuts_p, fins_p)
+    prefixe = hashlib.sha256(configuration.encode())
+
+    cles = {}
+    for j, symbole in enumerate(symboles):
+        empreinte = prefixe.copy()
+        empreinte.update(dates_r[j])
+        empreinte.update(rendements[debuts_r[j]:fins_r[j], j])
+        empreinte.update(indice[debuts_r[j]:fins_r[j]])
+        empreinte.update(dates_p[j])
+        empreinte.update(prix[debuts_p[j]:fins_p[j], j])
+        cles[symbole] = empreinte.hexdigest()[:32]
+    return cles
+
+
+# Cache disque (SQLite) des métriques par symbole, adressé par l'empreinte du contenu des données.
+# Une entrée vide mémorise qu'aucune métrique n'est calculable (trop peu d'observations).
+class CacheResultats:
+    def __init__(self, chemin=FICHIER_CACHE, colonnes=(), version=1, taille_max=TAILLE_MAX_CACHE):
+        self.chemin = chemin
+        self.colonnes = list(colonnes)
+        self.configuration = f"{version}|{'|'.join(self.colonnes)}"
+        self.taille_max = taille_max
+        self._connexion = sqlite3.connect(chemin, check_same_thread=False)
+        self._verrou = threading.Lock()
+        with self._verrou, self._connexion:
+            self._connexion.execute("""
+                CREATE TABLE IF NOT EXISTS resultats (
+                    cle TEXT PRIMARY KEY, valeurs BLOB NOT NULL, taille INTEGER NOT NULL, acces REAL NOT NULL
+                ) WITHOUT ROWID""")
+
+    def empreintes(self, rendements_journaliers, rendements_indice, prix_quotidiens, symboles):
+        return empreintes(rendements_journaliers, rendements_indice, prix_quotidiens, symboles, self.configuration)
+
+    # Lire les entrées présentes : {clé: tableau des métriques, ou None si aucune métrique n'est calculable}.
+    # Leur date d'accès est mise à jour (éviction des moins récemment utilisées).
+    def lire(self, cles):
+        cles = list(dict.fromkeys(cles))
+        trouvees = {}
+        with self._verrou, self._connexion:
+            for debut in range(0, len(cles), CLES_PAR_REQUETE):
+                lot = cles[debut:debut + CLES_PAR_REQUETE]
+                requete = f"SELECT cle, valeurs FROM resultats WHERE cle IN ({', '.join('?' * len(lot))})"
+                for cle, valeurs in self._connexion.execute(requete, lot):
+                    trouvees[cle] = np.frombuffer(valeurs, dtype=np.float64) if valeurs else None
+            maintenant = time.time()
+            self._connexion.executemany("UPDATE resultats SET acces = ? WHERE cle = ?",
+                                        [(maintenant, cle) for cle in trouvees])
+        return trouvees
+
+    # Écrire des entrées {clé: tableau des métriques ou None}, puis appliquer la limite de taille
+    def ecrire(self, entrees):
+        maintenant = time.time()
+        lignes = []
+        for cle, valeurs in entrees.items():
+            blob = b'' if valeurs is None else np.asarray(valeurs, dtype=np.float64).tobytes()
+            lignes.append((cle, blob, len(cle) + len(blob), maintenant))
+        with self._verrou, self._connexion:
+            self._connexion.executemany("INSERT OR REPLACE INTO resultats VALUES (?, ?, ?, ?)", lignes)
+            self._evincer()
+
+    # Supprimer les entrées les moins récemment utilisées si la taille totale dépasse la limite
+    def _evincer(self):
+        taille = self._connexion.execute("SELECT COALESCE(SUM(taille), 0) FROM resultats").fetchone()[0]
+        if taille <= self.taille_max:
+            return
+        self._connexion.execute("""
+            DELETE FROM resultats WHERE cle IN (
+                SELECT cle FROM (SELECT cle, SUM(taille) OVER (ORDER BY acces DESC, cle) AS cumul FROM resultats)
+                WHERE cumul > ?)""", (int(self.taille_max * FRACTION_APRES_EVICTION),))
+
+    def taille(self):
+        with self._verrou:
+            return self._connexion.execute("SELECT COALESCE(SUM(taille), 0) FROM resultats").fetchone()[0]
+
+    def __len__(self):
+        with self._verrou:
+            return self._connexion.execute("SELECT COUNT(*) FROM resultats").fetchone()[0]
+
+    def vider(self):
+        with self._verrou, self._connexion:
+            self._connexion.execute("DELETE FROM resultats")
+
+    def fermer(self):
+        with self._verrou:
+            self._connexion.close()
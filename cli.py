@@ -0,0 +1,238 @@
+import argparse
+import sys
+
+from instrumentation import ajouter_options, configurer, fichier_rapport_demande
+from export_rapports import FORMATS_EXPORT
+from metriques_glissantes import FORMAT_EXPORT_GLISSANT
+from cache_resultats import FICHIER_CACHE
+from accumulateurs import FICHIER_ETAT
+
+# Point d'entrée unique en ligne de commande (options communes : --referentiel, --rapport [--fichier-rapport F],
+# --profil) :
+#   python cli.py fetch    [--annees N] [--sans-excel] [--float32] [--format-export F] [--stockage FICHIER]
+#                          [--invalider SYMBOLE [--depuis DATE]]
+#   python cli.py analyse  [--sortie FICHIER.csv] [--symboles ...] [--cache FICHIER | --sans-cache]
+#                          [--incremental [--etat FICHIER] [--decroissance D] [--reconstruire]]
+#   python cli.py export   [--sans-complementaires] [--format-export {excel,flux,csv,parquet}]
+#                          [--format-glissant {excel,flux,csv,parquet,aucun}] [--cache FICHIER | --sans-cache]
+#   python cli.py optimise [--poids-max P] [--max-secteur P] [--points N] [--format-export F]
+#   python cli.py bootstrap [--tirages N] [--longueur-bloc L] [--methode M] [--niveau N] [--processus P]
+#                           [--format-export F]
+#   python cli.py backtest [--frequence {W,M,Q,Y}] [--couts C ...] [--melanges N] [--format-export F]
+# Les modules lourds (Port, TO, statsmodels, yfinance) ne sont importés que par la commande qui les utilise.
+
+
+# Commande fetch : télécharger les prix (stockage incrémental) et écrire le jeu de données
+def commande_fetch(args):
+    import Port
+
+    if args.invalider:
+        from stockage_prix import StockagePrix
+
+        stockage_prix = StockagePrix(args.stockage)
+        try:
+            for symbole in args.invalider:
+                stockage_prix.invalider(symbole, depuis=args.depuis)
+                print(f"Historique local de {symbole} invalidé" + (f" depuis {args.depuis}" if args.depuis else ""))
+        finally:
+            stockage_prix.fermer()
+
+    return Port.main(annees=args.annees, rapport_excel=not args.sans_excel, fichier_stockage=args.stockage,
+                     format_export=args.format_export, precision='float32' if args.float32 else Port.TYPE_VALEURS)
+
+
+# Commande analyse : métriques du panel sur le jeu de données existant, sans rapport Excel
+def commande_analyse(args):
+    import TO
+
+    prix_quotidiens, rendements_journaliers = TO.charger_donnees(args.fichier)
+    if args.incremental:
+        resultats = analyse_incrementale(args, prix_quotidiens, rendements_journaliers)
+    else:
+        resultats = TO.analyser(prix_quotidiens, rendements_journaliers, symboles=args.symboles,
+                                fichier_cache=None if args.sans_cache else args.cache)
+    if args.sortie:
+        resultats.to_csv(args.sortie, index=False)
+        print(f"Résultats exportés dans '{args.sortie}'")
+    else:
+        with TO.pd.option_context('display.max_rows', None, 'display.width', 200):
+            print(resultats.to_string(index=False))
+    return 0
+
+
+# Analyse incrémentale : seules les dates postérieures à l'état sauvegardé sont intégrées
+def analyse_incrementale(args, prix_quotidiens, rendements_journaliers):
+    from accumulateurs import actualiser_metriques
+    from referentiel import referentiel
+
+    metriques = actualiser_metriques(rendements_journaliers, prix_quotidiens, prix_quotidiens.columns[0],
+                                     chemin=args.etat, decroissance=args.decroissance, reconstruire=args.reconstruire)
+    if args.symboles:
+        metriques = metriques[metriques.index.isin(args.symboles)]
+    resultats = metriques.round(4).reset_index()
+    resultats.insert(0, 'Entreprise', referentiel.entreprises_de(resultats['Symbole']))
+    resultats.insert(0, 'Secteur', referentiel.secteurs_de(resultats['Symbole']))
+    return resultats
+
+
+# Commande export : analyse complète et rapports (sectoriel, glissant, multi-facteurs)
+def commande_export(args):
+    import TO
+
+    return TO.main(args.fichier, complementaires=not args.sans_complementaires, format_export=args.format_export,
+                   fichier_cache=None if args.sans_cache else args.cache,
+                   format_glissant=None if args.format_glissant == 'aucun' else args.format_glissant)
+
+
+# Commande optimise : portefeuilles variance minimale et Sharpe maximal, frontière efficiente (Ledoit-Wolf)
+def commande_optimise(args):
+    import TO
+    from optimisation_portefeuille import optimiser_portefeuilles, exporter_portefeuilles
+
+    prix_quotidiens, rendements_journaliers = TO.charger_donnees(args.fichier)
+    rendements_actions = rendements_journaliers.drop(columns=prix_quotidiens.columns[0])
+    resultats = optimiser_portefeuilles(rendements_actions, TO.trouver_secteur, poids_max=args.poids_max,
+                                        max_secteur=args.max_secteur, nb_points=args.points)
+    print(resultats[1].round(4))
+    exporter_portefeuilles(*resultats, format_export=args.format_export)
+    return 0
+
+
+# Commande bootstrap : intervalles de confiance des métriques par bootstrap par blocs
+def commande_bootstrap(args):
+    import TO
+    from bootstrap import intervalles_bootstrap, exporter_intervalles
+
+    prix_quotidiens, rendements_journaliers = TO.charger_donnees(args.fichier)
+    indice_ref = prix_quotidiens.columns[0]
+    intervalles = intervalles_bootstrap(rendements_journaliers.drop(columns=indice_ref),
+                                        rendements_journaliers[indice_ref], prix_quotidiens.drop(columns=indice_ref),
+                                        nb_tirages=args.tirages, longueur_bloc=args.longueur_bloc,
+                                        methode=args.methode, niveau=args.niveau, graine=args.graine,
+                                        nb_processus=args.processus)
+    print(intervalles.round(4))
+    exporter_intervalles(intervalles, format_export=args.format_export)
+    return 0
+
+
+# Commande backtest : balayage des mélanges équipondéré / sectoriel (bêta-neutres ou non) et des niveaux de frais
+def commande_backtest(args):
+    import TO
+    from backtest_portefeuille import (variantes_balayage, backtester, synthese_backtest, exporter_backtest,
+                                      COUTS_BALAYAGE)
+
+    prix_quotidiens, rendements_journaliers = TO.charger_donnees(args.fichier)
+    variantes, couts = variantes_balayage(prix_quotidiens, rendements_journaliers, args.melanges,
+                                          args.couts or COUTS_BALAYAGE)
+    print(f"Backtest de {len(variantes)} variantes...")
+    nav, rotations, frais = backtester(prix_quotidiens, variantes, args.frequence, couts)
+    synthese = synthese_backtest(nav, rotations, frais, rendements_journaliers[prix_quotidiens.columns[0]])
+    print(synthese.sort_values('Rendement_Geo_Annualisé', ascending=False).head(10).round(4))
+    exporter_backtest(nav, rotations, synthese, format_export=args.format_export)
+    return 0
+
+
+# Option commune du format des rapports
+def ajouter_option_format(parser):
+    parser.add_argument('--format-export', choices=FORMATS_EXPORT, default='excel',
+                        help="Rapports: excel (standard), flux (Excel en mémoire constante), csv ou parquet (parallèle)")
+
+
+# Options communes du cache des métriques par symbole
+def ajouter_options_cache(parser):
+    parser.add_argument('--cache', default=FICHIER_CACHE,
+                        help="Base SQLite du cache des métriques (seuls les symboles modifiés sont recalculés)")
+    parser.add_argument('--sans-cache', action='store_true', help="Recalculer toutes les métriques sans cache")
+
+
+def construire_parser():
+    parser = argparse.ArgumentParser(description="Analyse multi-actifs : téléchargement, métriques et rapports")
+    ajouter_options(parser)
+    parser.add_argument('--referentiel', help="Fichier du référentiel des titres (CSV ou Excel)")
+    commandes = parser.add_subparsers(dest='commande', required=True)
+
+    fetch = commandes.add_parser('fetch', help="Télécharger les prix et écrire le jeu de données")
+    fetch.add_argument('--annees', type=int, default=5, help="Profondeur d'historique en années")
+    fetch.add_argument('--sans-excel', action='store_true', help="Ne pas écrire le classeur Excel des prix")
+    fetch.add_argument('--stockage', default='prix_historiques.sqlite', help="Base SQLite des prix téléchargés")
+    fetch.add_argument('--invalider', nargs='+', metavar='SYMBOLE',
+                       help="Supprimer l'historique local de ces symboles avant le téléchargement")
+    fetch.add_argument('--depuis', metavar='AAAA-MM-JJ', help="Avec --invalider : ne supprimer qu'à partir de cette date")
+    fetch.add_argument('--float32', action='store_true',
+                       help="Stocker les panels en simple précision (mémoire et disque divisés par deux)")
+    ajouter_option_format(fetch)
+    fetch.set_defaults(fonction=commande_fetch)
+
+    analyse = commandes.add_parser('analyse', help="Calculer les métriques sans générer de rapport Excel")
+    analyse.add_argument('--fichier', default='resultats_actions_5ans.xlsx',
+                         help="Classeur utilisé si le jeu de données binaire est absent")
+    analyse.add_argument('--symboles', nargs='+', help="Limiter l'analyse à ces symboles")
+    analyse.add_argument('--sortie', help="Écrire les résultats dans ce fichier CSV au lieu de les afficher")
+    ajouter_options_cache(analyse)
+    analyse.add_argument('--incremental', action='store_true',
+                         help="Métriques incrémentales : n'intégrer que les nouvelles dates à l'état sauvegardé")
+    analyse.add_argument('--etat', default=FICHIER_ETAT, help="Avec --incremental : fichier de l'état incrémental")
+    analyse.add_argument('--decroissance', type=float, default=1.0,
+                         help="Avec --incremental : facteur de décroissance exponentielle des observations (1 = aucune)")
+    analyse.add_argument('--reconstruire', action='store_true',
+                         help="Avec --incremental : recalculer tout l'état (après un retraitement des prix)")
+    analyse.set_defaults(fonction=commande_analyse)
+
+    export = commandes.add_parser('export', help="Analyse complète et rapports")
+    export.add_argument('--fichier', default='resultats_actions_5ans.xlsx',
+                        help="Classeur utilisé si le jeu de données binaire est absent")
+    export.add_argument('--sans-complementaires', action='store_true',
+                        help="Ne pas calculer les métriques glissantes ni la régression multi-facteurs")
+    ajouter_option_format(export)
+    export.add_argument('--format-glissant', choices=FORMATS_EXPORT + ['aucun'], default=FORMAT_EXPORT_GLISSANT,
+                        help="Rapport des métriques glissantes (un panel par métrique et fenêtre) : format ou aucun")
+    ajouter_options_cache(export)
+    export.set_defaults(fonction=commande_export)
+
+    optimise = commandes.add_parser('optimise', help="Optimiser les portefeuilles (variance minimale, Sharpe maximal)")
+    optimise.add_argument('--fichier', default='resultats_actions_5ans.xlsx',
+                          help="Classeur utilisé si le jeu de données binaire est absent")
+    optimise.add_argument('--poids-max', type=float, default=0.10, help="Poids maximal par action")
+    optimise.add_argument('--max-secteur', type=float, default=0.30, help="Poids maximal par secteur")
+    optimise.add_argument('--points', type=int, default=25, help="Nombre de points de la frontière efficiente")
+    ajouter_option_format(optimise)
+    optimise.set_defaults(fonction=commande_optimise)
+
+    bootstrap = commandes.add_parser('bootstrap', help="Intervalles de confiance bootstrap des métriques")
+    bootstrap.add_argument('--fichier', default='resultats_actions_5ans.xlsx',
+                           help="Classeur utilisé si le jeu de données binaire est absent")
+    bootstrap.add_argument('--tirages', type=int, default=1000, help="Nombre de tirages bootstrap")
+    bootstrap.add_argument('--longueur-bloc', type=int, default=20, help="Longueur (moyenne) des blocs en jours")
+    bootstrap.add_argument('--methode', choices=['stationnaire', 'blocs_mobiles'], default='stationnaire',
+                           help="Bootstrap stationnaire (blocs géométriques) ou par blocs mobiles")
+    bootstrap.add_argument('--niveau', type=float, default=0.95, help="Niveau de confiance des intervalles")
+    bootstrap.add_argument('--graine', type=int, default=0, help="Graine des tirages (résultats reproductibles)")
+    bootstrap.add_argument('--processus', type=int, help="Nombre de processus (par défaut : nombre de cœurs)")
+    ajouter_option_format(bootstrap)
+    bootstrap.set_defaults(fonction=commande_bootstrap)
+
+    backtest = commandes.add_parser('backtest', help="Backtester les mélanges de portefeuilles et niveaux de frais")
+    backtest.add_argument('--fichier', default='resultats_actions_5ans.xlsx',
+                          help="Classeur utilisé si le jeu de données binaire est absent")
+    backtest.add_argument('--frequence', choices=['W', 'M', 'Q', 'Y'], default='M', help="Fréquence de rebalancement")
+    backtest.add_argument('--couts', type=float, nargs='+',
+                          help="Niveaux de frais de transaction, en fraction du montant échangé (défaut : 0, 5, 10 et 25 pb)")
+    backtest.add_argument('--melanges', type=int, default=26,
+                          help="Nombre de mélanges équipondéré / sectoriel (de 0 à 100 %% d'équipondéré)")
+    ajouter_option_format(backtest)
+    backtest.set_defaults(fonction=commande_backtest)
+    return parser
+
+
+def main(arguments=None):
+    args = construire_parser().parse_args(arguments)
+    configurer(fichier_rapport_demande(args), args.profil)
+    if args.referentiel:
+        from referentiel import referentiel
+
+        referentiel.recharger(args.referentiel)
+    return args.fonction(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
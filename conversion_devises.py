@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Fichier optionnel de taux de change historiques (dates en index, une colonne par devise, en EUR pour 1 unité)
+FICHIER_TAUX = 'taux_change_5ans.csv'
+
+# Symbole Yahoo Finance du cours de change d'une devise contre l'euro (clôture = EUR pour 1 unité)
+FORMAT_SYMBOLE_CHANGE = '{devise}EUR=X'
+
+# Unités de cotation en centièmes de devise : (devise, facteur vers la devise)
+UNITES_COTATION = {
+    'GBp': ('GBP', 0.01),  # Londres - pence sterling
+    'GBX': ('GBP', 0.01),
+    'ZAc': ('ZAR', 0.01),
+    'ILA': ('ILS', 0.01),
+}
+
+
+# Devise et facteur d'échelle d'une unité de cotation ('GBp' -> ('GBP', 0.01), 'CHF' -> ('CHF', 1.0))
+def devise_de_base(unite):
+    return UNITES_COTATION.get(unite, (unite, 1.0))
+
+
+# Charger les taux de change fournis par l'utilisateur
+def charger_taux(fichier=FICHIER_TAUX):
+    if fichier is None or not os.path.exists(fichier):
+        return pd.DataFrame()
+    taux = pd.read_csv(fichier, index_col=0)
+    taux.index = pd.to_datetime(taux.index, dayfirst=True)
+    return taux.astype(float).sort_index()
+
+
+# Aligner une série de taux sur un calendrier de prix : dernier taux connu à chaque date
+# (le premier taux disponible couvre les dates antérieures au début de la série)
+def aligner_taux(serie, index):
+    serie = serie.dropna()
+    serie = serie[~serie.index.duplicated(keep='last')]
+    return serie.reindex(serie.index.union(index)).ffill().bfill().reindex(index)
+
+
+# Conversion des panels de prix en euros avec des taux de change historiques.
+# Les séries de taux viennent du fichier utilisateur, sinon du téléchargeur (et donc du stockage local des prix),
+# sinon d'un taux fixe de secours. Séries et panels alignés sont gardés en cache pour toute l'exécution.
+class ConvertisseurDevises:
+    def __init__(self, telechargeur=None, date_debut=None, date_fin=None, fichier_taux=FICHIER_TAUX,
+                 taux_secours=None):
+        self.telechargeur = telechargeur
+        self.date_debut = date_debut
+        self.date_fin = date_fin
+        self.taux_secours = taux_secours or {}
+        self._taux_fichier = charger_taux(fichier_taux)
+        self._series = {}
+        self._panels = {}
+
+    # Lancer en avance le téléchargement des taux absents du fichier (requêtes concurrentes des prix)
+    def precharger(self, unites):
+        if self.telechargeur is None or self.date_debut is None:
+            return
+        for devise in self._devises_a_convertir(unites):
+            if devise not in self._taux_fichier.columns:
+                self.telechargeur.soumettre(FORMAT_SYMBOLE_CHANGE.format(devise=devise), self.date_debut,
+                                            self.date_fin)
+
+    def _devises_a_convertir(self, unites):
+        return sorted({devise_de_base(unite)[0] for unite in unites} - {'EUR'})
+
+    # Série historique des taux (EUR pour 1 unité) d'une devise
+    def serie_taux(self, devise, index):
+        if devise in self._series:
+            return self._series[devise]
+
+        serie = None
+        if devise in self._taux_fichier.columns:
+            serie = self._taux_fichier[devise].dropna()
+        elif self.telechargeur is not None:
+            date_debut = self.date_debut or index[0].strftime('%Y-%m-%d')
+            date_fin = self.date_fin or (index[-1] + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+            historique = self.telechargeur.obtenir(FORMAT_SYMBOLE_CHANGE.format(devise=devise), date_debut, date_fin)
+            if not historique.empty:
+                serie = historique['Close'].dropna()
+
+        if serie is None or serie.empty:
+            taux = self.taux_secours.get(devise, 1.0)
+            print(f"  Historique de change {devise}/EUR indisponible, utilisation du taux fixe {taux}")
+            serie = pd.Series(taux, index=index[:1])
+
+        self._series[devise] = serie
+        return serie
+
+    # Panel des taux de plusieurs devises aligné sur un calendrier (dates x devises)
+    def panel_taux(self, devises, index):
+        cle = (tuple(devises), len(index), index[0], index[-1]) if len(index) else (tuple(devises), 0)
+        if cle not in self._panels:
+            self._panels[cle] = pd.DataFrame({devise: aligner_taux(self.serie_taux(devise, index), index)
+                                              for devise in devises}, index=index)
+        return self._panels[cle]
+
+    # Convertir en euros, en place, une matrice de prix (dates x symboles) : une multiplication par bloc
+    # d'unité de cotation
+    def convertir_matrice(self, valeurs, index, symboles, unite_par_symbole):
+        blocs = {}
+        for position, symbole in enumerate(symboles):
+            blocs.setdefault(unite_par_symbole.get(symbole, 'EUR'), []).append(position)
+        if len(index) == 0:
+            return valeurs
+        taux = self.panel_taux(self._devises_a_convertir(blocs), index)
+
+        for unite, positions in blocs.items():
+            devise, facteur = devise_de_base(unite)
+            if devise == 'EUR' and facteur == 1.0:
+                continue
+            print(f"  Conversion de {unite} vers EUR pour {len(positions)} symbole(s)")
+            multiplicateur = facteur if devise == 'EUR' else taux[devise].to_numpy() * facteur
+            valeurs[:, positions] *= np.reshape(multiplicateur, (-1, 1))
+        return valeurs
+
+    # Convertir un panel de prix (DataFrame dates x symboles) en euros, sans modifier l'original
+    def convertir(self, prix, unite_par_symbole):
+        valeurs = self.convertir_matrice(prix.to_numpy(dtype=float, copy=True), prix.index, prix.columns,
+                                         unite_par_symbole)
+        return pd.DataFrame(valeurs, index=prix.index, columns=prix.columns)
@@ -0,0 +1,269 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from panel_binaire import TAILLE_BLOC
+from export_rapports import exporter_feuilles
+from referentiel import referentiel
+
+# Nombre de pairs les plus corrélés retenus par action
+NB_PAIRS = 5
+
+# Au-delà de ce nombre d'actions, la matrice complète n'est pas écrite dans les rapports (taille du classeur)
+LIMITE_MATRICE_EXPORT = 500
+
+
+# Rendements centrés (valeurs manquantes à 0), masque de présence et carrés centrés, en ordre colonne :
+# les sommes par paire d'actions sur leurs dates communes deviennent des produits matriciels
+def _preparer(rendements, dtype):
+    y = rendements.to_numpy(dtype=float)
+    masque = ~np.isnan(y)
+    y0 = np.where(masque, y, 0.0)
+    moyennes = y0.sum(axis=0) / np.maximum(masque.sum(axis=0), 1)
+    x0 = np.where(masque, y0 - moyennes, 0.0)
+    return (np.asfortranarray(x0, dtype=dtype), np.asfortranarray(masque, dtype=dtype),
+            np.asfortranarray(x0 * x0, dtype=dtype))
+
+
+# Corrélations d'un bloc de colonnes I contre un bloc J sur les dates communes à chaque paire (comme
+# DataFrame.corr) : nombre d'observations, sommes, sommes des carrés et des produits par paire en trois produits
+# matriciels
+def _bloc_correlation(preparees, lignes, colonnes, min_observations):
+    x0, masque, carres = preparees
+    nb_i = lignes.stop - lignes.start
+    gauche = np.concatenate([x0[:, lignes], masque[:, lignes]], axis=1)
+    droite = np.concatenate([x0[:, colonnes], masque[:, colonnes]], axis=1)
+    produits = (gauche.T @ droite).astype(float)
+    nb_j = colonnes.stop - colonnes.start
+    sxy, sx = produits[:nb_i, :nb_j], produits[:nb_i, nb_j:]
+    sy, n = produits[nb_i:, :nb_j], produits[nb_i:, nb_j:]
+    sxx = (carres[:, lignes].T @ masque[:, colonnes]).astype(float)
+    syy = (masque[:, lignes].T @ carres[:, colonnes]).astype(float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = sxy - sx * sy / n
+        variances = np.maximum(sxx - sx * sx / n, 0) * np.maximum(syy - sy * sy / n, 0)
+        correlation = np.clip(covariance / np.sqrt(variances), -1.0, 1.0)
+    correlation[n < max(min_observations, 2)] = np.nan
+    return correlation
+
+
+# Blocs de la matrice de corrélation (triangle supérieur, diagonale comprise) : (lignes, colonnes, bloc).
+# Seuls nb_threads blocs sont calculés à la fois (mémoire temporaire bornée) et ils sont produits dans l'ordre.
+def blocs_correlation(rendements, taille_bloc=TAILLE_BLOC, min_observations=30, nb_threads=1, dtype=np.float64):
+    preparees = _preparer(rendements, dtype)
+    nb_colonnes = rendements.shape[1]
+    tranches = [slice(debut, min(debut + taille_bloc, nb_colonnes)) for debut in range(0, nb_colonnes, taille_bloc)]
+    paires = [(i, j) for a, i in enumerate(tranches) for j in tranches[a:]]
+
+    def calculer(paire):
+        return paire[0], paire[1], _bloc_correlation(preparees, paire[0], paire[1], min_observations)
+
+    nb_threads = nb_threads or os.cpu_count() or 1
+    if nb_threads == 1:
+        yield from map(calculer, paires)
+        return
+    with ThreadPoolExecutor(max_workers=nb_threads) as executeur:
+        for debut in range(0, len(paires), nb_threads):
+            yield from executeur.map(calculer, paires[debut:debut + nb_threads])
+
+
+# Pairs les plus corrélés de chaque action, mis à jour bloc par bloc (k meilleurs candidats conservés par ligne)
+class PairsProches:
+    def __init__(self, nb_symboles, k=NB_PAIRS):
+        self.k = min(k, max(nb_symboles - 1, 0))
+        self.valeurs = np.full((nb_symboles, self.k), -np.inf)
+        self.positions = np.full((nb_symboles, self.k), -1)
+
+    def _fusionner(self, lignes, colonnes, bloc):
+        if self.k == 0:
+            return
+        candidats = np.concatenate([self.valeurs[lignes], np.where(np.isnan(bloc), -np.inf, bloc)], axis=1)
+        positions = np.concatenate([self.positions[lignes],
+                                    np.broadcast_to(np.arange(colonnes.start, colonnes.stop), bloc.shape)], axis=1)
+        meilleurs = np.argpartition(-candidats, self.k - 1, axis=1)[:, :self.k]
+        self.valeurs[lignes] = np.take_along_axis(candidats, meilleurs, axis=1)
+        self.positions[lignes] = np.take_along_axis(positions, meilleurs, axis=1)
+
+    # Intégrer un bloc du triangle supérieur (et son symétrique)
+    def ajouter(self, lignes, colonnes, bloc):
+        if lignes == colonnes:
+            bloc = bloc.copy()
+            np.fill_diagonal(bloc, np.nan)  # une action n'est pas son propre pair
+        self._fusionner(lignes, colonnes, bloc)
+        if lignes != colonnes:
+            self._fusionner(colonnes, lignes, bloc.T)
+
+    # Tableau long : une ligne par (action, rang), pairs triés par corrélation décroissante
+    def tableau(self, symboles, secteurs):
+        ordre = np.argsort(-self.valeurs, axis=1, kind='stable')
+        valeurs = np.take_along_axis(self.valeurs, ordre, axis=1)
+        positions = np.take_along_axis(self.positions, ordre, axis=1)
+        valides = np.isfinite(valeurs)
+        lignes, rangs = np.nonzero(valides)
+        pairs = positions[valides]
+        symboles, secteurs = np.asarray(symboles, dtype=object), np.asarray(secteurs, dtype=object)
+        return pd.DataFrame({'Symbole': symboles[lignes], 'Secteur': secteurs[lignes], 'Rang': rangs + 1,
+                             'Pair': symboles[pairs], 'Secteur_Pair': secteurs[pairs], 'Correlation': valeurs[valides]})
+
+
+# Sommes et nombres de corrélations par couple de secteurs, accumulés bloc par bloc (paires distinctes seulement)
+class CorrelationsSectorielles:
+    def __init__(self, secteurs):
+        etiquettes = pd.Categorical(secteurs).remove_unused_categories()
+        self.noms = list(etiquettes.categories)
+        self.indicatrices = np.zeros((len(etiquettes), len(self.noms)))
+        self.indicatrices[np.arange(len(etiquettes)), etiquettes.codes] = 1.0
+        self.sommes = np.zeros((len(self.noms), len(self.noms)))
+        self.nombres = np.zeros((len(self.noms), len(self.noms)))
+
+    def ajouter(self, lignes, colonnes, bloc):
+        valides = ~np.isnan(bloc)
+        if lignes == colonnes:
+            np.fill_diagonal(valides, False)
+        gauche, droite = self.indicatrices[lignes], self.indicatrices[colonnes]
+        sommes = gauche.T @ np.where(valides, bloc, 0.0) @ droite
+        nombres = gauche.T @ valides @ droite
+        if lignes != colonnes:
+            sommes, nombres = sommes + sommes.T, nombres + nombres.T
+        self.sommes += sommes
+        self.nombres += nombres
+
+    # Corrélation moyenne entre secteurs (secteurs x secteurs) et synthèse intra / inter-secteurs par secteur
+    def tableaux(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            moyennes = pd.DataFrame(self.sommes / self.nombres, index=self.noms, columns=self.noms)
+            intra = np.diag(self.sommes) / np.diag(self.nombres)
+            inter = ((self.sommes.sum(axis=1) - np.diag(self.sommes))
+                     / (self.nombres.sum(axis=1) - np.diag(self.nombres)))
+        synthese = pd.DataFrame({'Corrélation_Intra': intra, 'Corrélation_Inter': inter,
+                                 'Écart_Intra_Inter': intra - inter}, index=pd.Index(self.noms, name='Secteur'))
+        moyennes.index.name = 'Secteur'
+        return moyennes, synthese
+
+
+# Distances de corrélation sqrt((1 - rho) / 2) (corrélation inconnue : distance des actions non corrélées)
+def distances_correlation(matrice):
+    distances = np.sqrt(np.clip((1 - np.nan_to_num(np.asarray(matrice, dtype=float))) / 2, 0, 1))
+    np.fill_diagonal(distances, 0.0)
+    return distances
+
+
+# Classification hiérarchique à lien moyen par chaîne des plus proches voisins (sans scipy) : O(N²) opérations
+# vectorisées sur les lignes de la matrice des distances. Retourne la liste des fusions (groupe, groupe, distance)
+# numérotées comme scipy (feuilles 0..N-1, puis N, N+1, ... dans l'ordre des fusions).
+def lien_moyen(distances):
+    distances = np.array(distances, dtype=float)
+    n = len(distances)
+    np.fill_diagonal(distances, np.inf)
+    tailles = np.ones(n)
+    groupes = np.arange(n)
+    fusions = []
+    chaine = []
+    for _ in range(n - 1):
+        while True:
+            if not chaine:
+                chaine.append(int(np.flatnonzero(tailles > 0)[0]))
+            a = chaine[-1]
+            b = int(np.argmin(distances[a]))
+            if len(chaine) > 1 and distances[a, chaine[-2]] <= distances[a, b]:
+                b = chaine[-2]
+            if len(chaine) > 1 and b == chaine[-2]:
+                break
+            chaine.append(b)
+        chaine = chaine[:-2]
+
+        # Fusion de b dans a (formule de Lance-Williams du lien moyen)
+        fusions.append((groupes[a], groupes[b], distances[a, b]))
+        ligne = (tailles[a] * distances[a] + tailles[b] * distances[b]) / (tailles[a] + tailles[b])
+        distances[a], distances[:, a] = ligne, ligne
+        distances[b], distances[:, b] = np.inf, np.inf
+        distances[a, a] = np.inf
+        tailles[a] += tailles[b]
+        tailles[b] = 0
+        groupes[a] = n + len(fusions) - 1
+    return fusions
+
+
+# Ordre des feuilles de l'arbre de classification (parcours en profondeur, sans récursion)
+def ordre_feuilles(fusions, n):
+    if n == 0:
+        return np.array([], dtype=int)
+    enfants = {n + k: (gauche, droite) for k, (gauche, droite, _) in enumerate(fusions)}
+    ordre, pile = [], [n + len(fusions) - 1 if fusions else 0]
+    while pile:
+        noeud = pile.pop()
+        if noeud < n:
+            ordre.append(noeud)
+        else:
+            gauche, droite = enfants[noeud]
+            pile.extend([droite, gauche])
+    return np.array(ordre)
+
+
+# Ordre des actions regroupant les plus corrélées : classification hiérarchique à lien moyen sur les distances de
+# corrélation (scipy si disponible, sinon chaîne des plus proches voisins en numpy)
+def ordre_clustering(matrice):
+    distances = distances_correlation(matrice)
+    if len(distances) < 2:
+        return np.arange(len(distances))
+    try:
+        from scipy.cluster.hierarchy import linkage, leaves_list
+        from scipy.spatial.distance import squareform
+    except ImportError:
+        return ordre_feuilles(lien_moyen(distances), len(distances))
+    return leaves_list(linkage(squareform(distances, checks=False), method='average'))
+
+
+# Corrélations croisées des actions : matrice complète par blocs (valeurs manquantes exclues paire par paire),
+# pairs les plus corrélés, corrélations moyennes intra / inter-secteurs et ordre de classification.
+# Avec avec_matrice=False, seuls les résultats dérivés sont calculés (mémoire O(N), sans ordre de classification).
+# `fichier_matrice` (.npy) conserve la matrice sur disque (mappée en mémoire) pour les très grands univers.
+def correlations_croisees(rendements_actions, secteurs=None, k=NB_PAIRS, taille_bloc=TAILLE_BLOC, nb_threads=1,
+                          min_observations=30, dtype=np.float64, avec_matrice=True, fichier_matrice=None):
+    symboles = list(rendements_actions.columns)
+    secteurs = referentiel.secteurs_de(symboles) if secteurs is None else secteurs
+    pairs = PairsProches(len(symboles), k)
+    sectorielles = CorrelationsSectorielles(secteurs)
+
+    matrice = None
+    if avec_matrice:
+        forme = (len(symboles), len(symboles))
+        matrice = (np.lib.format.open_memmap(fichier_matrice, mode='w+', dtype=dtype, shape=forme)
+                   if fichier_matrice else np.empty(forme, dtype=dtype))
+
+    for lignes, colonnes, bloc in blocs_correlation(rendements_actions, taille_bloc, min_observations, nb_threads,
+                                                    dtype):
+        pairs.ajouter(lignes, colonnes, bloc)
+        sectorielles.ajouter(lignes, colonnes, bloc)
+        if matrice is not None:
+            matrice[lignes, colonnes] = bloc
+            matrice[colonnes, lignes] = bloc.T
+
+    ordre = None
+    if matrice is not None:
+        ordre = [symboles[i] for i in ordre_clustering(matrice)]
+        matrice = pd.DataFrame(matrice, index=symboles, columns=symboles)
+    moyennes_secteurs, synthese_secteurs = sectorielles.tableaux()
+    return matrice, pairs.tableau(symboles, np.asarray(secteurs)), moyennes_secteurs, synthese_secteurs, ordre
+
+
+# Exporter pairs, corrélations sectorielles et, pour les univers de taille raisonnable, la matrice dans l'ordre
+# de classification (CSV si openpyxl n'est pas disponible)
+def exporter_correlations(matrice, pairs, moyennes_secteurs, synthese_secteurs, ordre=None,
+                          fichier_excel='correlations_5ans.xlsx', format_export='excel'):
+    feuilles = [('Synthèse Secteurs', synthese_secteurs.round(4), True, 'correlations_synthese_secteurs_5ans'),
+                ('Corrélations Secteurs', moyennes_secteurs.round(4), True, 'correlations_secteurs_5ans'),
+                ('Pairs Proches', pairs.round(4), False, 'correlations_pairs_5ans')]
+    if matrice is not None and len(matrice) <= LIMITE_MATRICE_EXPORT:
+        if ordre is not None:
+            matrice = matrice.loc[ordre, ordre]
+        feuilles.append(('Matrice', matrice.round(4), True, 'correlations_matrice_5ans'))
+
+    format_utilise = exporter_feuilles(fichier_excel, feuilles, format_export)
+    if format_utilise == 'excel':
+        print(f"Corrélations croisées exportées dans '{fichier_excel}'!")
+    else:
+        print(f"Corrélations croisées exportées au format {format_utilise.upper()}!")
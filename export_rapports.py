@@ -0,0 +1,168 @@
+import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Formats d'export : classeur Excel standard (pandas), classeur Excel écrit en flux (mémoire constante),
+# fichiers CSV ou Parquet écrits en parallèle (un fichier par tableau)
+FORMATS_EXPORT = ['excel', 'flux', 'csv', 'parquet']
+
+# Format des dates écrites dans les CSV (relu par TO.charger_donnees)
+FORMAT_DATE = '%d/%m/%Y'
+
+# Format Excel des dates (cellules de date, affichées jj/mm/aaaa)
+FORMAT_DATE_EXCEL = 'DD/MM/YYYY'
+
+
+# Nombre de lignes converties à la fois en valeurs Python (borne la mémoire du mode flux)
+LIGNES_PAR_BLOC = 1024
+
+
+# Lignes d'un bloc du tableau en valeurs Python natives, NaN et infinis -> cellules vides
+def _valeurs_bloc(bloc):
+    valeurs = bloc.to_numpy(dtype=object)
+    numeriques = bloc.select_dtypes('number').columns
+    if len(numeriques) == bloc.shape[1]:
+        vides = ~np.isfinite(bloc.to_numpy(dtype=float))
+    else:
+        vides = pd.isna(valeurs)
+        if len(numeriques):
+            positions = bloc.columns.get_indexer(numeriques)
+            vides[:, positions] |= np.isinf(bloc[numeriques].to_numpy(dtype=float))
+    valeurs[vides] = None
+    return valeurs.tolist()
+
+
+# Lignes d'un tableau (en-tête compris) générées bloc par bloc, sans copie du tableau ni des dates.
+# `date` transforme l'étiquette d'une ligne d'index de dates en cellule de date du moteur.
+def _lignes(tableau, avec_index, date):
+    entete = list(map(str, tableau.columns))
+    yield ([tableau.index.name or ''] + entete) if avec_index else entete
+
+    dates = isinstance(tableau.index, pd.DatetimeIndex)
+    for debut in range(0, len(tableau), LIGNES_PAR_BLOC):
+        bloc = tableau.iloc[debut:debut + LIGNES_PAR_BLOC]
+        lignes = _valeurs_bloc(bloc)
+        if not avec_index:
+            yield from lignes
+            continue
+        etiquettes = [date(d) for d in bloc.index.to_pydatetime()] if dates else bloc.index.tolist()
+        for etiquette, ligne in zip(etiquettes, lignes):
+            yield [etiquette] + ligne
+
+
+# Écrire un classeur en flux : les lignes sont envoyées au fichier au fur et à mesure (xlsxwriter en mode
+# mémoire constante si disponible, sinon openpyxl en écriture seule). ImportError si aucun moteur n'est installé.
+def ecrire_classeur_flux(fichier_excel, feuilles):
+    try:
+        import xlsxwriter
+    except ImportError:
+        xlsxwriter = None
+
+    if xlsxwriter is not None:
+        classeur = xlsxwriter.Workbook(fichier_excel, {'constant_memory': True})
+        format_date = classeur.add_format({'num_format': FORMAT_DATE_EXCEL})
+        try:
+            for nom_feuille, tableau, avec_index, _ in feuilles:
+                feuille = classeur.add_worksheet(nom_feuille[:31])
+                for numero, ligne in enumerate(_lignes(tableau, avec_index, lambda d: d)):
+                    if numero and avec_index and isinstance(ligne[0], datetime.datetime):
+                        feuille.write_datetime(numero, 0, ligne[0], format_date)
+                        feuille.write_row(numero, 1, ligne[1:])
+                    else:
+                        feuille.write_row(numero, 0, ligne)
+        finally:
+            classeur.close()
+        return
+
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    classeur = Workbook(write_only=True)
+    for nom_feuille, tableau, avec_index, _ in feuilles:
+        feuille = classeur.create_sheet(nom_feuille[:31])
+
+        def date(valeur):
+            cellule = WriteOnlyCell(feuille, value=valeur)
+            cellule.number_format = FORMAT_DATE_EXCEL
+            return cellule
+
+        for ligne in _lignes(tableau, avec_index, date):
+            feuille.append(ligne)
+    classeur.save(fichier_excel)
+
+
+# Appliquer le format de date aux colonnes de dates d'une feuille openpyxl (index compris) : openpyxl ignore
+# date_format/datetime_format d'ExcelWriter et garde le format AAAA-MM-JJ HH:MM:SS
+def _formater_dates_openpyxl(feuille, tableau, avec_index):
+    colonnes = []
+    if avec_index:
+        colonnes += [i + 1 for i in range(tableau.index.nlevels)
+                     if pd.api.types.is_datetime64_any_dtype(tableau.index.get_level_values(i))]
+    decalage = tableau.index.nlevels if avec_index else 0
+    colonnes += [decalage + j + 1 for j, dtype in enumerate(tableau.dtypes)
+                 if pd.api.types.is_datetime64_any_dtype(dtype)]
+    premiere_ligne = tableau.columns.nlevels + 1
+    for colonne in colonnes:
+        for (cellule,) in feuille.iter_rows(min_row=premiere_ligne, max_row=premiere_ligne + len(tableau) - 1,
+                                            min_col=colonne, max_col=colonne):
+            cellule.number_format = FORMAT_DATE_EXCEL
+
+
+# Écrire un classeur avec pandas (mise en forme par défaut, dates écrites comme dates jj/mm/aaaa)
+def ecrire_classeur_standard(fichier_excel, feuilles):
+    with pd.ExcelWriter(fichier_excel, date_format=FORMAT_DATE_EXCEL,
+                        datetime_format=FORMAT_DATE_EXCEL) as writer:
+        for nom_feuille, tableau, avec_index, _ in feuilles:
+            tableau.to_excel(writer, sheet_name=nom_feuille[:31], index=avec_index)
+            if writer.engine == 'openpyxl':
+                _formater_dates_openpyxl(writer.sheets[nom_feuille[:31]], tableau, avec_index)
+
+
+def _ecrire_fichier_plat(tableau, avec_index, fichier, format_fichier):
+    if format_fichier == 'parquet':
+        tableau.to_parquet(fichier, index=avec_index)
+    else:
+        tableau.to_csv(fichier, index=avec_index, date_format=FORMAT_DATE)
+    return fichier
+
+
+# Écrire les tableaux ayant un nom de fichier plat, en parallèle (CSV, ou Parquet si pyarrow/fastparquet
+# est disponible). Retourne la liste des fichiers écrits.
+def ecrire_fichiers_plats(feuilles, format_fichier='csv', nb_threads=None):
+    if format_fichier == 'parquet':
+        try:
+            pd.io.parquet.get_engine('auto')
+        except ImportError:
+            print("Aucun moteur Parquet disponible (pyarrow), export au format CSV")
+            format_fichier = 'csv'
+
+    taches = [(tableau, avec_index, f"{fichier}.{format_fichier}", format_fichier)
+              for _, tableau, avec_index, fichier in feuilles if fichier is not None]
+    nb_threads = nb_threads or min(len(taches), os.cpu_count() or 1) or 1
+    with ThreadPoolExecutor(max_workers=nb_threads) as executeur:
+        return list(executeur.map(lambda tache: _ecrire_fichier_plat(*tache), taches))
+
+
+# Exporter une liste de feuilles (nom, tableau, avec_index, fichier plat sans extension ou None) dans le
+# format demandé. Sans moteur Excel, les tableaux ayant un fichier plat sont écrits en CSV.
+# Retourne le format effectivement utilisé.
+def exporter_feuilles(fichier_excel, feuilles, format_export='excel', nb_threads=None):
+    if format_export not in FORMATS_EXPORT:
+        raise ValueError(f"Format d'export inconnu: {format_export}")
+
+    if format_export in ('csv', 'parquet'):
+        fichiers = ecrire_fichiers_plats(feuilles, format_export, nb_threads)
+        return os.path.splitext(fichiers[0])[1][1:] if fichiers else format_export
+
+    try:
+        if format_export == 'flux':
+            ecrire_classeur_flux(fichier_excel, feuilles)
+        else:
+            ecrire_classeur_standard(fichier_excel, feuilles)
+        return 'excel'
+    except ImportError:
+        ecrire_fichiers_plats(feuilles, 'csv', nb_threads)
+        return 'csv'
@@ -0,0 +1,253 @@
+import argparse
+import atexit
+import contextlib
+import collections
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+
+# Fichier par défaut du rapport d'exécution
+FICHIER_RAPPORT = 'rapport_execution.json'
+
+# Modes de profilage disponibles en ligne de commande
+MODES_PROFIL = ['cprofile', 'echantillonnage']
+
+# Nombre de fonctions retenues dans le rapport de profilage
+NB_FONCTIONS_CHAUDES = 25
+
+_CONTEXTE_NUL = contextlib.nullcontext()
+
+
+# Mémoire résidente courante du processus en Mo (None si indisponible)
+def memoire_residente_mo():
+    try:
+        with open('/proc/self/statm') as fichier:
+            return int(fichier.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        maximum = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximum / 2 ** 20 if sys.platform == 'darwin' else maximum / 2 ** 10
+    except ImportError:
+        return None
+
+
+# Instrumentation de l'exécution : durée et pic mémoire par étape, télémétrie des téléchargements (niveau logique
+# par symbole et requêtes en amont), profilage optionnel. Désactivée, chaque appel se réduit à un test de booléen.
+class Instrumentation:
+    def __init__(self):
+        self.actif = False
+        self.profil = None
+        self._verrou = threading.Lock()
+        self._etapes = []
+        self._etapes_ouvertes = []
+        self._telechargements = []
+        self._requetes_amont = []
+        self._pic_memoire = None
+        self._arret = threading.Event()
+        self._threads = []
+        self._profileur = None
+        self._echantillons = collections.Counter()
+        self._piles = collections.Counter()
+        self._debut = None
+
+    def activer(self, profil=None, intervalle_memoire=0.05, intervalle_echantillonnage=0.005):
+        if self.actif:
+            return
+        self.actif = True
+        self.profil = profil
+        self._debut = time.perf_counter()
+        self._demarrer_thread(self._echantillonner_memoire, intervalle_memoire)
+
+        if profil == 'cprofile':
+            import cProfile
+            self._profileur = cProfile.Profile()
+            self._profileur.enable()
+        elif profil == 'echantillonnage':
+            self._demarrer_thread(self._echantillonner_piles, intervalle_echantillonnage, threading.get_ident())
+
+    def _demarrer_thread(self, cible, *args):
+        thread = threading.Thread(target=cible, args=args, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    # Échantillonnage périodique de la mémoire résidente (pic global et pic de chaque étape ouverte)
+    def _echantillonner_memoire(self, intervalle):
+        while not self._arret.wait(intervalle):
+            memoire = memoire_residente_mo()
+            if memoire is None:
+                return
+            with self._verrou:
+                self._pic_memoire = max(self._pic_memoire or 0, memoire)
+                for etape in self._etapes_ouvertes:
+                    etape['memoire_pic_mo'] = max(etape['memoire_pic_mo'] or 0, memoire)
+
+    # Échantillonnage des piles d'appels du thread principal (chemins chauds)
+    def _echantillonner_piles(self, intervalle, identifiant_thread):
+        while not self._arret.wait(intervalle):
+            cadre = sys._current_frames().get(identifiant_thread)
+            if cadre is None:
+                continue
+            pile = []
+            while cadre is not None:
+                code = cadre.f_code
+                pile.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                cadre = cadre.f_back
+            self._echantillons[pile[0]] += 1
+            self._piles[';'.join(reversed(pile))] += 1
+
+    # Mesurer une étape du traitement (gestionnaire de contexte)
+    def etape(self, nom):
+        if not self.actif:
+            return _CONTEXTE_NUL
+        return self._mesurer_etape(nom)
+
+    @contextlib.contextmanager
+    def _mesurer_etape(self, nom):
+        memoire = memoire_residente_mo()
+        etape = {'nom': nom, 'debut_s': round(time.perf_counter() - self._debut, 6),
+                 'memoire_debut_mo': memoire, 'memoire_pic_mo': memoire}
+        with self._verrou:
+            self._etapes_ouvertes.append(etape)
+        debut = time.perf_counter()
+        try:
+            yield etape
+        finally:
+            etape['duree_s'] = round(time.perf_counter() - debut, 6)
+            memoire = memoire_residente_mo()
+            with self._verrou:
+                self._etapes_ouvertes.remove(etape)
+                etape['memoire_fin_mo'] = memoire
+                if memoire is not None:
+                    etape['memoire_pic_mo'] = max(etape['memoire_pic_mo'] or 0, memoire)
+                self._etapes.append(etape)
+
+    # Télémétrie logique de la récupération d'un symbole par le téléchargeur : latence totale (stockage local
+    # compris), tentatives et taille en mémoire de l'historique retourné (données stockées comprises)
+    def enregistrer_telechargement(self, symbole, latence_s, tentatives, taille_octets, succes):
+        if not self.actif:
+            return
+        with self._verrou:
+            self._telechargements.append({'symbole': symbole, 'latence_s': round(latence_s, 6),
+                                          'tentatives': tentatives, 'taille_memoire_octets': int(taille_octets),
+                                          'succes': succes})
+
+    # Télémétrie d'une requête envoyée au fournisseur en amont : attente du limiteur de débit, latence de la
+    # requête seule, lignes et octets reçus, erreur éventuelle (même si le stockage local la masque ensuite)
+    def enregistrer_requete(self, symbole, date_debut, date_fin, attente_s, latence_s, lignes, octets, erreur=None):
+        if not self.actif:
+            return
+        with self._verrou:
+            self._requetes_amont.append({'symbole': symbole, 'debut': str(date_debut), 'fin': str(date_fin),
+                                         'attente_s': round(attente_s, 6), 'latence_s': round(latence_s, 6),
+                                         'lignes': int(lignes), 'octets': int(octets), 'succes': erreur is None,
+                                         'erreur': erreur})
+
+    def _rapport_profil(self):
+        if self._profileur is not None:
+            import pstats
+            statistiques = pstats.Stats(self._profileur).stats
+            lignes = sorted(statistiques.items(), key=lambda element: element[1][3], reverse=True)
+            return [{'fonction': f"{os.path.basename(fichier)}:{ligne}:{nom}", 'appels': appels,
+                     'temps_propre_s': round(propre, 6), 'temps_cumule_s': round(cumule, 6)}
+                    for (fichier, ligne, nom), (_, appels, propre, cumule, _) in lignes[:NB_FONCTIONS_CHAUDES]]
+        if self._echantillons:
+            total = sum(self._echantillons.values())
+            return {
+                'echantillons': total,
+                'fonctions_chaudes': [{'fonction': f, 'part': round(n / total, 4)}
+                                      for f, n in self._echantillons.most_common(NB_FONCTIONS_CHAUDES)],
+                'piles_chaudes': [{'pile': p, 'part': round(n / total, 4)} for p, n in self._piles.most_common(10)],
+            }
+        return None
+
+    def rapport(self):
+        with self._verrou:
+            telechargements = list(self._telechargements)
+            requetes = list(self._requetes_amont)
+            etapes = list(self._etapes)
+        latences = sorted(t['latence_s'] for t in telechargements)
+        latences_amont = sorted(r['latence_s'] for r in requetes)
+        return {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'duree_totale_s': round(time.perf_counter() - self._debut, 6) if self._debut else None,
+            'memoire_pic_mo': self._pic_memoire,
+            'etapes': etapes,
+            'telechargements': {
+                'nombre': len(telechargements),
+                'echecs': sum(not t['succes'] for t in telechargements),
+                'tentatives': sum(t['tentatives'] for t in telechargements),
+                'taille_memoire_octets': sum(t['taille_memoire_octets'] for t in telechargements),
+                'latence_mediane_s': latences[len(latences) // 2] if latences else None,
+                'latence_max_s': latences[-1] if latences else None,
+                'detail': telechargements,
+            },
+            'requetes_amont': {
+                'nombre': len(requetes),
+                'echecs': sum(not r['succes'] for r in requetes),
+                'lignes': sum(r['lignes'] for r in requetes),
+                'octets': sum(r['octets'] for r in requetes),
+                'attente_limiteur_s': round(sum(r['attente_s'] for r in requetes), 6),
+                'latence_mediane_s': latences_amont[len(latences_amont) // 2] if latences_amont else None,
+                'latence_max_s': latences_amont[-1] if latences_amont else None,
+                'detail': requetes,
+            },
+            'profil': {'mode': self.profil, 'resultats': self._rapport_profil()} if self.profil else None,
+        }
+
+    # Arrêter les mesures et écrire le rapport JSON
+    def terminer(self, chemin=FICHIER_RAPPORT):
+        if not self.actif:
+            return
+        self._arret.set()
+        for thread in self._threads:
+            thread.join()
+        if self._profileur is not None:
+            self._profileur.disable()
+            self._profileur.dump_stats(os.path.splitext(chemin)[0] + '.prof')
+
+        with open(chemin, 'w', encoding='utf-8') as fichier:
+            json.dump(self.rapport(), fichier, indent=2, ensure_ascii=False)
+        self.actif = False
+        print(f"Rapport d'exécution écrit dans '{chemin}'")
+
+
+# Instance partagée par Port.py, TO.py et les modules de téléchargement
+instrumentation = Instrumentation()
+
+
+# Options communes de ligne de commande pour l'instrumentation (--rapport est un simple drapeau, pour ne pas
+# absorber la sous-commande qui le suit)
+def ajouter_options(parser):
+    parser.add_argument('--rapport', action='store_true',
+                        help=f"Activer l'instrumentation et écrire le rapport JSON (défaut: {FICHIER_RAPPORT})")
+    parser.add_argument('--fichier-rapport', default=None, help="Fichier du rapport JSON (active l'instrumentation)")
+    parser.add_argument('--profil', choices=MODES_PROFIL, default=None,
+                        help="Profilage: cprofile (déterministe) ou echantillonnage (piles d'appels)")
+
+
+# Fichier du rapport demandé par les options (--rapport ou --fichier-rapport), ou None
+def fichier_rapport_demande(options):
+    if options.fichier_rapport is not None:
+        return options.fichier_rapport
+    return FICHIER_RAPPORT if options.rapport else None
+
+
+# Lire les options d'instrumentation de la ligne de commande, activer les mesures et écrire le rapport à la sortie
+def configurer_depuis_ligne_de_commande(arguments=None):
+    parser = argparse.ArgumentParser(add_help=False)
+    ajouter_options(parser)
+    options, _ = parser.parse_known_args(arguments)
+    configurer(fichier_rapport_demande(options), options.profil)
+    return options
+
+
+def configurer(rapport=None, profil=None):
+    if rapport is None and profil is None:
+        return
+    instrumentation.activer(profil=profil)
+    atexit.register(instrumentation.terminer, rapport or FICHIER_RAPPORT)
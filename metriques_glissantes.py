@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+from export_rapports import exporter_feuilles
+from annualisation import JOURS_TRADING_ANNEE
+
+# Fenêtres glissantes par défaut (environ 3 mois, 6 mois et 1 an de bourse)
+FENETRES_DEFAUT = (60, 126, 252)
+
+# Format par défaut du rapport glissant : un panel dates x symboles par métrique et fenêtre, beaucoup plus rapide
+# à écrire en CSV (en parallèle) qu'en classeur Excel standard
+FORMAT_EXPORT_GLISSANT = 'csv'
+
+METRIQUES_GLISSANTES = ['Beta', 'Alpha', 'Correlation', 'Volatilité_Totale',
+                        'Volatilité_Systématique', 'Volatilité_Résiduelle']
+
+
+# Somme glissante sur l'axe des dates à partir des sommes cumulées (O(T) par colonne, quelle que soit la fenêtre)
+def _somme_glissante(valeurs, fenetre):
+    cumul = np.zeros((valeurs.shape[0] + 1,) + valeurs.shape[1:])
+    np.cumsum(valeurs, axis=0, out=cumul[1:])
+    somme = cumul[1:].copy()
+    somme[fenetre:] -= cumul[1:-fenetre]
+    return somme
+
+
+# Fonction pour calculer bêta, alpha, corrélation et volatilités glissants de toutes les actions
+def calculer_metriques_glissantes(rendements_actions, rendements_indice, fenetre, min_observations=30):
+    min_observations = min(min_observations, fenetre)
+    y = rendements_actions.to_numpy(dtype=float)
+    x = rendements_indice.reindex(rendements_actions.index).to_numpy(dtype=float)[:, None]
+
+    # Observations communes action/indice ; les trous sont exclus de chaque fenêtre
+    masque = ~np.isnan(y) & ~np.isnan(x)
+
+    # Centrer sur la moyenne de la période complète : les moments centrés sont inchangés
+    # et les sommes cumulées restent précises sur de longues séries
+    x_centre = np.where(masque, x - np.nanmean(x), 0.0)
+    with np.errstate(invalid='ignore'):
+        moyennes_y = np.nanmean(np.where(masque, y, np.nan), axis=0)
+    y_centre = np.where(masque, y - np.nan_to_num(moyennes_y), 0.0)
+
+    n = _somme_glissante(masque.astype(float), fenetre)
+    sx = _somme_glissante(x_centre, fenetre)
+    sy = _somme_glissante(y_centre, fenetre)
+    sxx = _somme_glissante(x_centre * x_centre, fenetre)
+    syy = _somme_glissante(y_centre * y_centre, fenetre)
+    sxy = _somme_glissante(x_centre * y_centre, fenetre)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        n = np.where(n >= min_observations, n, np.nan)
+        cxx = np.maximum(sxx - sx * sx / n, 0)
+        cyy = np.maximum(syy - sy * sy / n, 0)
+        cxy = sxy - sx * sy / n
+
+        beta = cxy / cxx
+        correlation = cxy / np.sqrt(cxx * cyy)
+        # Alpha sur les rendements non centrés : moyenne(y) - bêta * moyenne(x)
+        moyenne_x = sx / n + np.nanmean(x)
+        moyenne_y = sy / n + np.nan_to_num(moyennes_y)
+        alpha = (moyenne_y - beta * moyenne_x) * JOURS_TRADING_ANNEE
+        vol_totale = np.sqrt(cyy / (n - 1) * JOURS_TRADING_ANNEE)
+        vol_systematique = beta * np.sqrt(cxx / (n - 1) * JOURS_TRADING_ANNEE)
+        vol_residuelle = np.sqrt(np.maximum(0, vol_totale ** 2 - vol_systematique ** 2))
+
+    valeurs = dict(zip(METRIQUES_GLISSANTES,
+                       [beta, alpha, correlation, vol_totale, vol_systematique, vol_residuelle]))
+    return {nom: pd.DataFrame(valeur, index=rendements_actions.index, columns=rendements_actions.columns)
+            for nom, valeur in valeurs.items()}
+
+
+# Calculer les métriques glissantes pour plusieurs fenêtres : {fenetre: {metrique: panel dates x symboles}}
+def calculer_toutes_fenetres(rendements_actions, rendements_indice, fenetres=FENETRES_DEFAUT, min_observations=30):
+    return {fenetre: calculer_metriques_glissantes(rendements_actions, rendements_indice, fenetre, min_observations)
+            for fenetre in fenetres}
+
+
+# Exporter une feuille par métrique et par fenêtre (CSV si openpyxl n'est pas disponible)
+def exporter_metriques_glissantes(resultats, fichier_excel='metriques_glissantes_5ans.xlsx',
+                                  format_export=FORMAT_EXPORT_GLISSANT):
+    feuilles = []
+    for fenetre, metriques in resultats.items():
+        for metrique, panel in metriques.items():
+            nom_feuille = f"{metrique} {fenetre}j"[:31]
+            feuilles.append((nom_feuille, panel.dropna(how='all').round(4), True,
+                             f"glissant_{nom_feuille.replace(' ', '_')}"))
+
+    format_utilise = exporter_feuilles(fichier_excel, feuilles, format_export)
+    if format_utilise == 'excel':
+        print(f"Métriques glissantes exportées dans '{fichier_excel}'!")
+    else:
+        print(f"Métriques glissantes exportées au format {format_utilise.upper()}!")
@@ -0,0 +1,145 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from annualisation import JOURS_TRADING_ANNEE, rendement_geometrique_annualise
+
+# Niveau de confiance des VaR/CVaR (pertes journalières)
+NIVEAU_VAR = 0.95
+
+# Au-delà de ce nombre de rangs distincts à isoler, un tri complet est plus rapide qu'une partition
+RANGS_PARTITION_MAX = 64
+
+
+# Noms des colonnes de risque extrême (le niveau de confiance figure dans les noms des VaR/CVaR)
+def noms_metriques_risque(niveau=NIVEAU_VAR):
+    suffixe = f"{niveau * 100:g}"
+    return [f'VaR_Historique_{suffixe}', f'CVaR_Historique_{suffixe}', f'VaR_Paramétrique_{suffixe}',
+            f'CVaR_Paramétrique_{suffixe}', 'Drawdown_Max', 'Durée_Drawdown_Max', 'Ratio_Sortino', 'Ratio_Calmar',
+            'Beta_Baissier', 'Asymétrie', 'Kurtosis']
+
+
+METRIQUES_RISQUE = noms_metriques_risque()
+
+
+# Quantile (interpolation linéaire, comme np.quantile) de chaque colonne sur ses seules valeurs présentes.
+# Les valeurs manquantes sont repoussées en fin de colonne et seuls les rangs nécessaires sont isolés par
+# une partition commune à toutes les colonnes.
+def quantiles_colonnes(y, masque, probabilite):
+    n = masque.sum(axis=0)
+    position = np.maximum(n - 1, 0) * probabilite
+    bas = np.floor(position).astype(np.intp)
+    haut = np.minimum(bas + 1, np.maximum(n - 1, 0))
+
+    valeurs = np.where(masque, y, np.inf)
+    rangs = np.unique(np.concatenate([bas, haut]))
+    if len(rangs) <= RANGS_PARTITION_MAX and len(valeurs):
+        valeurs = np.partition(valeurs, rangs, axis=0)
+    else:
+        valeurs = np.sort(valeurs, axis=0)
+
+    colonnes = np.arange(y.shape[1])
+    v_bas = valeurs[bas, colonnes] if len(valeurs) else np.full(y.shape[1], np.nan)
+    v_haut = valeurs[haut, colonnes] if len(valeurs) else np.full(y.shape[1], np.nan)
+    with np.errstate(invalid='ignore'):
+        quantile = v_bas + (position - bas) * (v_haut - v_bas)
+    return np.where(n > 0, quantile, np.nan)
+
+
+# Drawdown maximal (négatif) et durée du plus long drawdown (en jours de bourse) de chaque colonne d'un
+# panel de prix, par maximum cumulé. Les prix manquants entre la première et la dernière cotation d'une colonne
+# sont complétés par le dernier prix connu (comme Port.py) : un trou ne met pas fin au drawdown en cours.
+def drawdowns(prix):
+    lignes = np.arange(len(prix))[:, None]
+    valides = ~np.isnan(prix)
+    derniere_valide = np.maximum.accumulate(np.where(valides, lignes, -1), axis=0)
+    cotee = (derniere_valide >= 0) & (lignes <= derniere_valide.max(axis=0, initial=-1))
+    prix = np.where(cotee, prix[np.maximum(derniere_valide, 0), np.arange(prix.shape[1])], np.nan)
+
+    sommets = np.fmax.accumulate(prix, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        baisse = prix / sommets - 1
+    drawdown_max = np.min(np.where(np.isnan(baisse), np.inf, baisse), axis=0)
+    drawdown_max = np.where(np.isinf(drawdown_max), np.nan, drawdown_max)
+
+    # Durée : écart entre chaque date et la dernière date hors drawdown
+    sous_sommet = baisse < 0
+    derniere_sortie = np.maximum.accumulate(np.where(sous_sommet, -1, lignes), axis=0)
+    duree_max = np.where(sous_sommet, lignes - derniere_sortie, 0).max(axis=0, initial=0)
+    return drawdown_max, duree_max.astype(float)
+
+
+# Métriques de risque extrême de toutes les actions en une seule passe : VaR et CVaR historiques et
+# paramétriques (pertes journalières, positives), drawdown maximal et sa durée, ratios de Sortino et de Calmar,
+# bêta baissier (jours de baisse de l'indice), asymétrie et kurtosis en excès (estimateurs corrigés, comme pandas)
+def calculer_metriques_risque(rendements_actions, rendements_indice, prix_actions=None, niveau=NIVEAU_VAR,
+                              min_observations=30):
+    y = rendements_actions.to_numpy(dtype=float)
+    x = rendements_indice.reindex(rendements_actions.index).to_numpy(dtype=float)[:, None]
+    presents = ~np.isnan(y)
+    n = presents.sum(axis=0).astype(float)
+    n_sur = np.where(n >= min_observations, n, np.nan)
+    y0 = np.where(presents, y, 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Moments centrés
+        moyenne = y0.sum(axis=0) / n_sur
+        ecarts = np.where(presents, y0 - moyenne, 0.0)
+        carres = ecarts * ecarts
+        m2 = carres.sum(axis=0) / n_sur
+        m3 = (carres * ecarts).sum(axis=0) / n_sur
+        m4 = (carres * carres).sum(axis=0) / n_sur
+        ecart_type = np.sqrt(m2 * n_sur / (n_sur - 1))
+        asymetrie = m3 / m2 ** 1.5 * np.sqrt(n_sur * (n_sur - 1)) / (n_sur - 2)
+        kurtosis = ((n_sur + 1) * (m4 / m2 ** 2 - 3) + 6) * (n_sur - 1) / ((n_sur - 2) * (n_sur - 3))
+
+        # VaR et CVaR historiques : quantile des rendements et moyenne des rendements au-delà
+        risque = 1 - niveau
+        quantile = quantiles_colonnes(y, presents, risque)
+        queue = presents & (y <= quantile)
+        var_historique = -quantile
+        cvar_historique = -np.where(queue, y0, 0.0).sum(axis=0) / queue.sum(axis=0)
+
+        # VaR et CVaR paramétriques (loi normale)
+        loi = NormalDist()
+        z = loi.inv_cdf(risque)
+        var_parametrique = -(moyenne + z * ecart_type)
+        cvar_parametrique = -(moyenne - ecart_type * loi.pdf(z) / risque)
+
+        # Ratio de Sortino : rendement moyen annualisé sur l'écart-type baissier annualisé (cible 0)
+        baisses = np.minimum(y0, 0.0)
+        ecart_baissier = np.sqrt((baisses * baisses).sum(axis=0) / n_sur * JOURS_TRADING_ANNEE)
+        sortino = moyenne * JOURS_TRADING_ANNEE / ecart_baissier
+
+        # Bêta baissier : régression sur les seuls jours de baisse de l'indice
+        masque_baisse = presents & (x < 0)
+        nb_baisse = masque_baisse.sum(axis=0)
+        nb_baisse_sur = np.where((nb_baisse >= min_observations) & (n >= min_observations), nb_baisse, np.nan)
+        xb = np.where(masque_baisse, x, 0.0)
+        yb = np.where(masque_baisse, y0, 0.0)
+        dx = np.where(masque_baisse, xb - xb.sum(axis=0) / nb_baisse_sur, 0.0)
+        dy = np.where(masque_baisse, yb - yb.sum(axis=0) / nb_baisse_sur, 0.0)
+        beta_baissier = (dx * dy).sum(axis=0) / (dx * dx).sum(axis=0)
+
+    # Drawdowns sur les prix (ou sur la valeur cumulée des rendements à défaut)
+    if prix_actions is not None:
+        prix = prix_actions.reindex(index=rendements_actions.index.union(prix_actions.index),
+                                    columns=rendements_actions.columns).to_numpy(dtype=float)
+    else:
+        croissance = np.cumprod(1 + y0, axis=0)
+        prix = np.where(np.cumsum(presents, axis=0) > 0, croissance, np.nan)
+    drawdown_max, duree_max = drawdowns(prix)
+
+    # Ratio de Calmar : rendement géométrique annualisé (premier et dernier prix) sur le drawdown maximal
+    rendement_geo = rendement_geometrique_annualise(prix)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        calmar = np.where(drawdown_max < 0, rendement_geo / -drawdown_max, np.nan)
+
+    metriques = pd.DataFrame(dict(zip(noms_metriques_risque(niveau), [
+        var_historique, cvar_historique, var_parametrique, cvar_parametrique, drawdown_max, duree_max,
+        sortino, calmar, beta_baissier, asymetrie, kurtosis])), index=rendements_actions.columns)
+
+    # Comme calculer_metriques_panel, aucune métrique en dessous de min_observations rendements
+    metriques.loc[np.isnan(n_sur)] = np.nan
+    return metriques
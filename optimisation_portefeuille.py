@@ -0,0 +1,242 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from annualisation import JOURS_TRADING_ANNEE
+from export_rapports import exporter_feuilles
+
+
+# Covariance de Ledoit-Wolf (cible : identité mise à l'échelle), annualisée.
+# Les rendements manquants sont remplacés par 0 après centrage (aucune contribution aux co-moments).
+def covariance_ledoit_wolf(rendements):
+    valeurs = rendements.to_numpy(dtype=float)
+    X = np.nan_to_num(valeurs - np.nanmean(valeurs, axis=0))
+    t, n = X.shape
+
+    S = X.T @ X / t
+    mu = np.trace(S) / n
+    norme_s2 = (S * S).sum()
+
+    # Distance à la cible et variance d'estimation, sans former les T matrices x_t x_t'
+    d2 = (norme_s2 - 2 * mu * np.trace(S) + mu * mu * n) / n
+    b2_barre = ((X * X).sum(axis=1) ** 2).sum() / t - norme_s2
+    b2 = min(b2_barre / t / n, d2)
+    intensite = b2 / d2 if d2 > 0 else 1.0
+
+    S *= (1 - intensite)
+    S[np.diag_indices(n)] += intensite * mu
+    return pd.DataFrame(S * JOURS_TRADING_ANNEE, index=rendements.columns, columns=rendements.columns), intensite
+
+
+# Covariance d'un modèle à un facteur à partir des bêtas et volatilités déjà calculés par TO.py :
+# Sigma = beta beta' vol_indice² + diag(vol_residuelle²)
+def covariance_factorielle(betas, volatilites_residuelles, volatilite_indice):
+    beta = betas.to_numpy(dtype=float)
+    sigma = np.outer(beta, beta) * volatilite_indice ** 2
+    sigma[np.diag_indices(len(beta))] += volatilites_residuelles.reindex(betas.index).to_numpy(dtype=float) ** 2
+    return pd.DataFrame(sigma, index=betas.index, columns=betas.index)
+
+
+# Solveur ADMM pour min 1/2 w'Σw - tolerance * mu'w  s.c.  somme(w) = 1, bornes par actif, plafonds par secteur.
+# La décomposition propre de Σ est calculée une seule fois et réutilisée pour tous les points de la frontière
+# (aucune inverse dense n'est formée) ; chaque résolution repart de la solution précédente.
+class SolveurPortefeuille:
+    def __init__(self, covariance, rendements_attendus, poids_min=0.0, poids_max=1.0,
+                 secteurs=None, max_secteur=None, tolerance=1e-7, iterations_max=5000):
+        self.symboles = list(covariance.index)
+        self.sigma = covariance.to_numpy(dtype=float)
+        self.mu = rendements_attendus.reindex(covariance.index).to_numpy(dtype=float)
+        n = len(self.symboles)
+        self.poids_min = np.broadcast_to(np.asarray(poids_min, dtype=float), (n,)).copy()
+        self.poids_max = np.broadcast_to(np.asarray(poids_max, dtype=float), (n,)).copy()
+        if self.poids_min.sum() > 1 or self.poids_max.sum() < 1:
+            raise ValueError("Bornes de poids incompatibles avec un portefeuille investi à 100%")
+
+        # Plafonds sectoriels : code de secteur par actif et plafond par code
+        self.codes_secteur = None
+        if secteurs is not None and max_secteur is not None:
+            etiquettes = pd.Categorical([secteurs[s] for s in self.symboles])
+            self.codes_secteur = etiquettes.codes
+            if isinstance(max_secteur, dict):
+                self.plafonds = np.array([max_secteur.get(c, 1.0) for c in etiquettes.categories], dtype=float)
+            else:
+                self.plafonds = np.full(len(etiquettes.categories), float(max_secteur))
+            minimums = np.bincount(self.codes_secteur, self.poids_min, len(self.plafonds))
+            if (minimums > self.plafonds).any():
+                raise ValueError("Plafonds sectoriels inférieurs aux poids minimums imposés")
+            capacites = np.minimum(np.bincount(self.codes_secteur, self.poids_max, len(self.plafonds)), self.plafonds)
+            if capacites.sum() < 1:
+                raise ValueError("Plafonds sectoriels incompatibles avec un portefeuille investi à 100%")
+
+        self.tolerance = tolerance
+        self.iterations_max = iterations_max
+
+        # Factorisation unique : Σ = V diag(λ) V'
+        self.valeurs_propres, self.vecteurs_propres = np.linalg.eigh(self.sigma)
+        self.echelle = max(np.trace(self.sigma) / n, 1e-12)
+        self._changer_rho(self.echelle)
+        self._etat = None
+
+    # Résoudre (Σ + ρI) x = b en O(n²) grâce à la décomposition propre
+    def _resoudre_lineaire(self, b):
+        V = self.vecteurs_propres
+        return V @ ((V.T @ b) / (self.valeurs_propres + self.rho))
+
+    # Projection sur {bornes} ∩ {somme par secteur <= plafond}, par bissection vectorisée sur tous les secteurs
+    def _projeter(self, v):
+        z = np.clip(v, self.poids_min, self.poids_max)
+        if self.codes_secteur is None:
+            return z
+        nb_secteurs = len(self.plafonds)
+        depassement = np.bincount(self.codes_secteur, z, nb_secteurs) > self.plafonds
+        if not depassement.any():
+            return z
+
+        bas = np.zeros(nb_secteurs)
+        haut = np.where(depassement, np.bincount(self.codes_secteur, np.abs(v), nb_secteurs) + 1, 0)
+        for _ in range(60):
+            milieu = (bas + haut) / 2
+            essai = np.clip(v - milieu[self.codes_secteur], self.poids_min, self.poids_max)
+            trop = np.bincount(self.codes_secteur, essai, nb_secteurs) > self.plafonds
+            bas = np.where(trop, milieu, bas)
+            haut = np.where(trop, haut, milieu)
+        decalage = np.where(depassement, haut, 0)
+        return np.clip(v - decalage[self.codes_secteur], self.poids_min, self.poids_max)
+
+    # Changer le paramètre de pénalité : la décomposition propre reste valable, seul le dénominateur change
+    def _changer_rho(self, rho):
+        self.rho = rho
+        self._un_resolu = self._resoudre_lineaire(np.ones(len(self.symboles)))
+
+    # Résoudre pour une tolérance au risque donnée (0 = variance minimale)
+    def resoudre(self, tolerance_risque=0.0):
+        n = len(self.symboles)
+        if self._etat is None:
+            z = self._projeter(np.full(n, 1.0 / n))
+            self._etat = (z, np.zeros(n))
+        z, u = self._etat
+        seuil = self.tolerance * np.sqrt(n)
+
+        for iteration in range(self.iterations_max):
+            # Mise à jour x : système linéaire avec contrainte de budget (multiplicateur explicite)
+            q = self._resoudre_lineaire(tolerance_risque * self.mu + self.rho * (z - u))
+            x = q - self._un_resolu * (q.sum() - 1) / self._un_resolu.sum()
+
+            # Mise à jour z : projection sur les contraintes de bornes et de secteurs
+            z_precedent = z
+            z = self._projeter(x + u)
+            u = u + x - z
+
+            residu_primal = np.linalg.norm(x - z)
+            residu_dual = self.rho * np.linalg.norm(z - z_precedent)
+            if residu_primal < seuil and residu_dual < seuil:
+                break
+
+            # Équilibrage des résidus : ρ adaptatif, gratuit grâce à la décomposition propre
+            if iteration % 10 == 9:
+                if residu_primal > 10 * residu_dual:
+                    self._changer_rho(self.rho * 2)
+                    u = u / 2
+                elif residu_dual > 10 * residu_primal:
+                    self._changer_rho(self.rho / 2)
+                    u = u * 2
+
+        self._etat = (z, u)
+        return pd.Series(z, index=self.symboles)
+
+    def statistiques(self, poids, taux_sans_risque=0.0):
+        w = poids.to_numpy(dtype=float)
+        rendement = float(self.mu @ w)
+        volatilite = float(np.sqrt(max(w @ self.sigma @ w, 0)))
+        sharpe = (rendement - taux_sans_risque) / volatilite if volatilite > 0 else np.nan
+        return rendement, volatilite, sharpe
+
+
+# Frontière efficiente : résolutions successives à tolérance au risque croissante (factorisation réutilisée)
+def frontiere_efficiente(solveur, nb_points=25, taux_sans_risque=0.0):
+    echelle = solveur.echelle / max(np.abs(solveur.mu).max(), 1e-12)
+    tolerances = np.concatenate([[0.0], np.geomspace(1e-3, 10, nb_points - 1) * echelle])
+    points = []
+    poids = {}
+    for i, tolerance_risque in enumerate(tolerances):
+        w = solveur.resoudre(tolerance_risque)
+        rendement, volatilite, sharpe = solveur.statistiques(w, taux_sans_risque)
+        points.append({'Point': i, 'Tolérance_Risque': tolerance_risque, 'Rendement': rendement,
+                       'Volatilité': volatilite, 'Sharpe': sharpe})
+        poids[i] = w
+    return pd.DataFrame(points).set_index('Point'), pd.DataFrame(poids)
+
+
+# Portefeuille de Sharpe maximal : meilleur point de la frontière, affiné par section dorée sur la tolérance au risque
+def portefeuille_sharpe_max(solveur, frontiere, taux_sans_risque=0.0, precision=1e-3):
+    meilleur = int(frontiere['Sharpe'].idxmax())
+    tolerances = frontiere['Tolérance_Risque'].to_numpy()
+    a = tolerances[max(meilleur - 1, 0)]
+    b = tolerances[min(meilleur + 1, len(tolerances) - 1)]
+
+    def sharpe(t):
+        return solveur.statistiques(solveur.resoudre(t), taux_sans_risque)[2]
+
+    nombre_or = (np.sqrt(5) - 1) / 2
+    c, d = b - nombre_or * (b - a), a + nombre_or * (b - a)
+    sc, sd = sharpe(c), sharpe(d)
+    while b - a > precision * (a + b):
+        if sc > sd:
+            b, d, sd = d, c, sc
+            c = b - nombre_or * (b - a)
+            sc = sharpe(c)
+        else:
+            a, c, sc = c, d, sd
+            d = a + nombre_or * (b - a)
+            sd = sharpe(d)
+    return solveur.resoudre((a + b) / 2)
+
+
+# Construire les portefeuilles variance minimale, Sharpe maximal et la frontière à partir des rendements journaliers
+def optimiser_portefeuilles(rendements_actions, secteur_par_symbole, covariance=None, poids_max=0.10,
+                            max_secteur=0.30, nb_points=25, taux_sans_risque=0.0):
+    if covariance is None:
+        covariance, intensite = covariance_ledoit_wolf(rendements_actions)
+        print(f"Covariance Ledoit-Wolf (intensité de rétrécissement: {intensite:.3f})")
+    rendements_attendus = rendements_actions.mean() * JOURS_TRADING_ANNEE
+    secteurs = {s: secteur_par_symbole(s) for s in covariance.index}
+
+    # Relâcher le plafond par actif s'il est incompatible avec la taille de l'univers
+    poids_max = max(poids_max, 1.0 / len(covariance))
+    solveur = SolveurPortefeuille(covariance, rendements_attendus, poids_max=poids_max,
+                                  secteurs=secteurs, max_secteur=max_secteur)
+
+    variance_min = solveur.resoudre(0.0)
+    frontiere, poids_frontiere = frontiere_efficiente(solveur, nb_points, taux_sans_risque)
+    sharpe_max = portefeuille_sharpe_max(solveur, frontiere, taux_sans_risque)
+
+    portefeuilles = pd.DataFrame({'Variance_Minimale': variance_min, 'Sharpe_Maximal': sharpe_max})
+    portefeuilles.insert(0, 'Secteur', [secteurs[s] for s in portefeuilles.index])
+    synthese = pd.DataFrame([solveur.statistiques(portefeuilles[c], taux_sans_risque)
+                             for c in ['Variance_Minimale', 'Sharpe_Maximal']],
+                            index=['Variance_Minimale', 'Sharpe_Maximal'],
+                            columns=['Rendement', 'Volatilité', 'Sharpe'])
+    return portefeuilles, synthese, frontiere, poids_frontiere
+
+
+# Exporter les portefeuilles optimisés dans le format demandé (CSV sans moteur Excel)
+def exporter_portefeuilles(portefeuilles, synthese, frontiere, poids_frontiere,
+                           fichier_excel='optimisation_portefeuille_5ans.xlsx', format_export='excel'):
+    feuilles = [('Portefeuilles', portefeuilles.round(4).rename_axis('Symbole'), True, 'portefeuilles_5ans'),
+                ('Synthèse', synthese.round(4), True, 'portefeuilles_synthese_5ans'),
+                ('Frontière', frontiere.round(4), True, 'frontiere_efficiente_5ans'),
+                ('Poids Frontière', poids_frontiere.round(4).rename_axis('Symbole'), True, 'frontiere_poids_5ans')]
+
+    format_utilise = exporter_feuilles(fichier_excel, feuilles, format_export)
+    if format_utilise == 'excel':
+        print(f"Portefeuilles exportés dans '{fichier_excel}'!")
+    else:
+        print(f"Portefeuilles exportés au format {format_utilise.upper()}!")
+
+
+if __name__ == "__main__":
+    # Équivalent de : python cli.py optimise [options]
+    import cli
+
+    raise SystemExit(cli.main(['optimise'] + sys.argv[1:]))
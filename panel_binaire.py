@@ -0,0 +1,184 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Dossier par défaut du jeu de données échangé entre Port.py et TO.py
+DOSSIER_DONNEES = 'donnees_5ans'
+
+# Noms des panels du jeu de données
+PANEL_PRIX = 'prix_quotidiens'
+PANEL_RENDEMENTS = 'rendements_journaliers'
+
+# Type des valeurs stockées par défaut (np.float32 divise la mémoire par deux)
+TYPE_VALEURS = np.float64
+
+# Nombre de symboles traités à la fois par les opérations par blocs de colonnes
+TAILLE_BLOC = 512
+
+
+def _chemins(dossier, nom):
+    base = os.path.join(dossier, nom)
+    return base + '.npy', base + '.dates.npy', base + '.symboles.json'
+
+
+# Écrire un fichier de manière atomique (fichier temporaire puis renommage)
+def _ecrire_npy(chemin, tableau):
+    temporaire = chemin + '.tmp'
+    with open(temporaire, 'wb') as fichier:
+        np.save(fichier, tableau)
+    os.replace(temporaire, chemin)
+
+
+# Panel compact (dates x symboles) : une seule matrice contiguë en ordre colonne, un index des dates
+# (datetime64) et un index des symboles. Les sélections contiguës (plages de dates, blocs de colonnes)
+# sont des vues sans copie ; la matrice peut être mappée en mémoire depuis le disque.
+class PanelCompact:
+    def __init__(self, valeurs, dates, symboles):
+        self.valeurs = valeurs
+        self.dates = np.asarray(dates, dtype='datetime64[ns]')
+        self.symboles = [str(s) for s in symboles]
+        self._positions = {symbole: i for i, symbole in enumerate(self.symboles)}
+
+    # Construire le panel depuis un dictionnaire {symbole: série de prix} en une seule allocation
+    @classmethod
+    def depuis_series(cls, series, dtype=TYPE_VALEURS):
+        index_dates = [pd.DatetimeIndex(serie.index).to_numpy(dtype='datetime64[ns]') for serie in series.values()]
+        dates = np.unique(np.concatenate(index_dates)) if index_dates else np.array([], dtype='datetime64[ns]')
+        valeurs = np.full((len(dates), len(series)), np.nan, dtype=dtype, order='F')
+        for j, (dates_serie, serie) in enumerate(zip(index_dates, series.values())):
+            valeurs[np.searchsorted(dates, dates_serie), j] = serie.to_numpy(dtype=dtype)
+        return cls(valeurs, dates, series.keys())
+
+    @classmethod
+    def depuis_dataframe(cls, panel, dtype=None):
+        valeurs = np.asfortranarray(panel.to_numpy(dtype=dtype or TYPE_VALEURS))
+        return cls(valeurs, pd.DatetimeIndex(panel.index).to_numpy(dtype='datetime64[ns]'), panel.columns)
+
+    # Charger un panel sauvegardé ; avec memoire=True la matrice reste sur disque (lecture seule)
+    @classmethod
+    def charger(cls, dossier, nom, memoire=True):
+        chemin_valeurs, chemin_dates, chemin_symboles = _chemins(dossier, nom)
+        valeurs = np.load(chemin_valeurs, mmap_mode='r' if memoire else None)
+        with open(chemin_symboles, encoding='utf-8') as fichier:
+            symboles = json.load(fichier)
+        return cls(valeurs, np.load(chemin_dates), symboles)
+
+    # Sauvegarder le panel : matrice en ordre colonne (chaque symbole est contigu sur disque),
+    # dates et liste des symboles
+    def sauvegarder(self, dossier, nom):
+        os.makedirs(dossier, exist_ok=True)
+        chemin_valeurs, chemin_dates, chemin_symboles = _chemins(dossier, nom)
+        _ecrire_npy(chemin_valeurs, np.asfortranarray(self.valeurs))
+        _ecrire_npy(chemin_dates, self.dates)
+        with open(chemin_symboles, 'w', encoding='utf-8') as fichier:
+            json.dump(self.symboles, fichier, ensure_ascii=False)
+
+    @property
+    def shape(self):
+        return self.valeurs.shape
+
+    def __contains__(self, symbole):
+        return symbole in self._positions
+
+    def position(self, symbole):
+        return self._positions[symbole]
+
+    # Série d'un symbole (vue sur la matrice)
+    def colonne(self, symbole):
+        return self.valeurs[:, self._positions[symbole]]
+
+    # Restreindre à une plage de dates (bornes incluses), par recherche dichotomique : vue sans copie
+    def plage(self, date_debut=None, date_fin=None):
+        debut = 0 if date_debut is None else np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date_debut)),
+                                                             'left')
+        fin = len(self.dates) if date_fin is None else np.searchsorted(self.dates,
+                                                                       np.datetime64(pd.Timestamp(date_fin)), 'right')
+        return PanelCompact(self.valeurs[debut:fin], self.dates[debut:fin], self.symboles)
+
+    # Restreindre à certains symboles (symboles inconnus ignorés) ; vue si les colonnes sont contiguës
+    def selection(self, symboles):
+        positions = np.array([self._positions[s] for s in symboles if s in self._positions], dtype=np.intp)
+        if len(positions) and np.array_equal(positions, np.arange(positions[0], positions[0] + len(positions))):
+            valeurs = self.valeurs[:, positions[0]:positions[0] + len(positions)]
+        else:
+            valeurs = self.valeurs[:, positions]
+        return PanelCompact(valeurs, self.dates, [self.symboles[p] for p in positions])
+
+    # Parcourir les colonnes par blocs de `taille` symboles : (symboles, vue dates x bloc)
+    def blocs(self, taille=TAILLE_BLOC):
+        for debut in range(0, len(self.symboles), taille):
+            yield self.symboles[debut:debut + taille], self.valeurs[:, debut:debut + taille]
+
+    # Remplacer en place les valeurs manquantes par la dernière valeur connue (équivalent de ffill)
+    def remplir_vers_l_avant(self, taille=TAILLE_BLOC):
+        lignes = np.arange(len(self.dates))[:, None]
+        for _, bloc in self.blocs(taille):
+            derniere = np.where(np.isnan(bloc), 0, lignes)
+            np.maximum.accumulate(derniere, axis=0, out=derniere)
+            bloc[:] = np.take_along_axis(bloc, derniere, axis=0)
+        return self
+
+    # Rendements journaliers (nouveau panel de même calendrier, première date manquante)
+    def rendements(self, taille=TAILLE_BLOC):
+        rendements = np.full(self.valeurs.shape, np.nan, dtype=self.valeurs.dtype, order='F')
+        for debut in range(0, len(self.symboles), taille):
+            bloc = self.valeurs[:, debut:debut + taille]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                np.divide(bloc[1:], bloc[:-1], out=rendements[1:, debut:debut + taille])
+            rendements[1:, debut:debut + taille] -= 1
+        return PanelCompact(rendements, self.dates, self.symboles)
+
+    # Supprimer les dates sans aucune valeur (vue si les dates conservées sont contiguës)
+    def lignes_non_vides(self, taille=TAILLE_BLOC):
+        presentes = np.zeros(len(self.dates), dtype=bool)
+        for _, bloc in self.blocs(taille):
+            presentes |= ~np.isnan(bloc).all(axis=1)
+        lignes = np.flatnonzero(presentes)
+        if len(lignes) == len(self.dates):
+            return self
+        if len(lignes) and lignes[-1] - lignes[0] + 1 == len(lignes):
+            return PanelCompact(self.valeurs[lignes[0]:lignes[-1] + 1], self.dates[lignes], self.symboles)
+        return PanelCompact(np.asfortranarray(self.valeurs[lignes]), self.dates[lignes], self.symboles)
+
+    # Vue DataFrame sur la matrice (sans copie)
+    def vers_dataframe(self):
+        return pd.DataFrame(self.valeurs, index=pd.DatetimeIndex(self.dates, name='Date'), columns=self.symboles,
+                            copy=False)
+
+
+# Sauvegarder un panel (dates x symboles, DataFrame ou PanelCompact) : matrice en ordre colonne,
+# mappable en mémoire, plus un index des dates (datetime64) et la liste des symboles
+def sauvegarder_panel(panel, dossier, nom):
+    if not isinstance(panel, PanelCompact):
+        panel = PanelCompact.depuis_dataframe(panel, dtype=np.float64)
+    panel.sauvegarder(dossier, nom)
+
+
+# Charger un panel, éventuellement limité à certaines colonnes et à une plage de dates (bornes incluses).
+# Les données sont mappées en mémoire : sans sélection de colonnes, le DataFrame est une vue du fichier
+# (lecture seule) ; avec une sélection, seules les colonnes demandées sont lues.
+def charger_panel(dossier, nom, colonnes=None, date_debut=None, date_fin=None):
+    panel = PanelCompact.charger(dossier, nom).plage(date_debut, date_fin)
+    if colonnes is not None:
+        panel = panel.selection(colonnes)
+    return panel.vers_dataframe()
+
+
+# Sauvegarder le jeu de données complet (prix et rendements)
+def sauvegarder_jeu_donnees(prix_quotidiens, rendements_journaliers, dossier=DOSSIER_DONNEES):
+    sauvegarder_panel(prix_quotidiens, dossier, PANEL_PRIX)
+    sauvegarder_panel(rendements_journaliers, dossier, PANEL_RENDEMENTS)
+
+
+# Vérifier si un jeu de données binaire existe
+def jeu_donnees_disponible(dossier=DOSSIER_DONNEES):
+    return all(os.path.exists(chemin) for nom in (PANEL_PRIX, PANEL_RENDEMENTS) for chemin in _chemins(dossier, nom))
+
+
+# Charger le jeu de données complet (prix et rendements)
+def charger_jeu_donnees(dossier=DOSSIER_DONNEES, colonnes=None, date_debut=None, date_fin=None):
+    prix_quotidiens = charger_panel(dossier, PANEL_PRIX, colonnes, date_debut, date_fin)
+    rendements_journaliers = charger_panel(dossier, PANEL_RENDEMENTS, colonnes, date_debut, date_fin)
+    return prix_quotidiens, rendements_journaliers
@@ -0,0 +1,123 @@
+import os
+
+import pandas as pd
+
+# Fichier du référentiel des titres (une ligne par symbole), à côté des scripts
+FICHIER_REFERENTIEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'referentiel_titres.csv')
+
+# Colonnes du référentiel ; Devise et Place sont déduites de l'extension du symbole si absentes
+COLONNES_REFERENTIEL = ['Symbole', 'Entreprise', 'Secteur', 'Devise', 'Place']
+
+# Secteur attribué aux symboles absents du référentiel
+SECTEUR_DEFAUT = "Autre"
+
+# Place de cotation et devise de cotation selon l'extension Yahoo Finance du symbole
+places_par_extension = {
+    '.L': ('Londres', 'GBp'),       # Londres - pence sterling (cotation en centièmes de livre)
+    '.SW': ('Zurich', 'CHF'),       # Suisse - Franc suisse
+    '.BR': ('Bruxelles', 'EUR'),    # Bruxelles - Euro
+    '.PA': ('Paris', 'EUR'),        # Paris - Euro
+    '.AS': ('Amsterdam', 'EUR'),    # Amsterdam - Euro
+    '.DE': ('Xetra', 'EUR'),        # Allemagne - Euro
+    '.MC': ('Madrid', 'EUR'),       # Madrid - Euro
+    '.ST': ('Stockholm', 'SEK'),    # Stockholm - Couronne suédoise
+    '.MI': ('Milan', 'EUR'),        # Milan - Euro
+    '.CO': ('Copenhague', 'DKK'),   # Copenhague - Couronne danoise
+    '.OL': ('Oslo', 'NOK'),         # Oslo - Couronne norvégienne
+    '.VI': ('Vienne', 'EUR'),       # Vienne - Euro
+    '.LS': ('Lisbonne', 'EUR'),     # Lisbonne - Euro
+    '.HE': ('Helsinki', 'EUR'),     # Helsinki - Euro
+    '.I': ('Dublin', 'EUR'),        # Irlande - Euro
+}
+
+
+# Extension de place d'un symbole ('AIR.PA' -> '.PA', '^STOXX' -> '')
+def extension(symbole):
+    _, point, suffixe = symbole.rpartition('.')
+    return point + suffixe if point else ''
+
+
+# Place et devise déduites de l'extension (Euro par défaut)
+def place_et_devise(symbole):
+    return places_par_extension.get(extension(symbole), (None, 'EUR'))
+
+
+# Lire la table brute d'un référentiel (CSV ou Excel, toutes les colonnes en texte)
+def lire_table(fichier):
+    if fichier.endswith(('.xlsx', '.xls')):
+        return pd.read_excel(fichier, dtype=str)
+    return pd.read_csv(fichier, dtype=str, keep_default_na=False, na_values=[''])
+
+
+# Référentiel des titres : symbole, entreprise, secteur, devise et place de cotation.
+# Les recherches par symbole sont des accès directs à des dictionnaires ; les colonnes
+# Secteur, Devise et Place sont catégorielles pour les regroupements vectorisés.
+class Referentiel:
+    def __init__(self, table):
+        table = table.dropna(subset=['Symbole']).drop_duplicates('Symbole', keep='last').set_index('Symbole')
+        table = table.reindex(columns=COLONNES_REFERENTIEL[1:])
+
+        # Compléter devise et place à partir de l'extension du symbole
+        deduites = pd.DataFrame([place_et_devise(s) for s in table.index], index=table.index,
+                                columns=['Place', 'Devise'])
+        table['Devise'] = table['Devise'].fillna(deduites['Devise'])
+        table['Place'] = table['Place'].fillna(deduites['Place'])
+        table['Entreprise'] = table['Entreprise'].fillna(pd.Series(table.index, index=table.index))
+        table['Secteur'] = table['Secteur'].fillna(SECTEUR_DEFAUT)
+        for colonne in ('Secteur', 'Devise', 'Place'):
+            table[colonne] = table[colonne].astype('category')
+        self.table = table
+
+        self._entreprises = dict(zip(table.index, table['Entreprise']))
+        self._secteurs = dict(zip(table.index, table['Secteur'].astype(str)))
+        self._devises = dict(zip(table.index, table['Devise'].astype(str)))
+
+    # Charger le référentiel depuis un fichier CSV ou Excel
+    @classmethod
+    def charger(cls, fichier=FICHIER_REFERENTIEL):
+        return cls(lire_table(fichier))
+
+    # Remplacer le contenu par celui d'un autre fichier (le référentiel partagé reste la même instance)
+    def recharger(self, fichier):
+        self.__init__(lire_table(fichier))
+
+    # Symboles du référentiel, dans l'ordre du fichier
+    @property
+    def symboles(self):
+        return list(self.table.index)
+
+    def __contains__(self, symbole):
+        return symbole in self._entreprises
+
+    def __len__(self):
+        return len(self.table)
+
+    def entreprise(self, symbole):
+        return self._entreprises.get(symbole, symbole)
+
+    def secteur(self, symbole):
+        return self._secteurs.get(symbole, SECTEUR_DEFAUT)
+
+    # Devise de cotation (référentiel, sinon extension de la place)
+    def devise(self, symbole):
+        devise = self._devises.get(symbole)
+        return devise if devise is not None else place_et_devise(symbole)[1]
+
+    # Colonne catégorielle des secteurs pour une liste de symboles (symboles inconnus : secteur par défaut)
+    def secteurs_de(self, symboles):
+        secteurs = self.table['Secteur'].reindex(symboles)
+        if SECTEUR_DEFAUT not in secteurs.cat.categories:
+            secteurs = secteurs.cat.add_categories(SECTEUR_DEFAUT)
+        return pd.Categorical(secteurs.fillna(SECTEUR_DEFAUT))
+
+    # Noms d'entreprise pour une liste de symboles (symbole à défaut)
+    def entreprises_de(self, symboles):
+        return [self._entreprises.get(s, s) for s in symboles]
+
+    # Noms des secteurs présents dans le référentiel
+    def noms_secteurs(self):
+        return list(self.table['Secteur'].cat.categories)
+
+
+# Référentiel partagé par Port.py et TO.py
+referentiel = Referentiel.charger()
@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from annualisation import JOURS_TRADING_ANNEE
+from export_rapports import exporter_feuilles
+
+# Fichier optionnel de séries de facteurs fournies par l'utilisateur (dates en index, un facteur par colonne)
+FICHIER_FACTEURS = 'facteurs_5ans.csv'
+
+
+# Construire des indices sectoriels équipondérés à partir des rendements des actions
+def construire_indices_sectoriels(rendements_actions, secteur_par_symbole):
+    secteurs = pd.Series({s: secteur_par_symbole(s) for s in rendements_actions.columns})
+    return rendements_actions.T.groupby(secteurs).mean().T.add_prefix('Secteur ')
+
+
+# Charger les séries de facteurs de l'utilisateur (rendements journaliers)
+def charger_facteurs(fichier=FICHIER_FACTEURS):
+    if not os.path.exists(fichier):
+        return pd.DataFrame()
+    facteurs = pd.read_csv(fichier, index_col=0)
+    facteurs.index = pd.to_datetime(facteurs.index, dayfirst=True)
+    return facteurs.astype(float)
+
+
+# Régressions multi-facteurs de toutes les actions sur une matrice de facteurs partagée.
+# Les actions ayant le même masque de données manquantes sont résolues ensemble par un seul appel lstsq.
+def regression_multifacteurs(rendements_actions, facteurs, min_observations=30):
+    facteurs = facteurs.reindex(rendements_actions.index)
+    noms = ['Alpha'] + list(facteurs.columns)
+    X = np.column_stack([np.ones(len(facteurs)), facteurs.to_numpy(dtype=float)])
+    Y = rendements_actions.to_numpy(dtype=float)
+
+    # Masque par action : dates où l'action et tous les facteurs sont disponibles
+    lignes_valides = ~np.isnan(X).any(axis=1)
+    masques = ~np.isnan(Y) & lignes_valides[:, None]
+
+    nb_symboles, k = Y.shape[1], X.shape[1]
+    coefficients = np.full((nb_symboles, k), np.nan)
+    erreurs = np.full((nb_symboles, k), np.nan)
+    r_squared = np.full(nb_symboles, np.nan)
+    variance_residuelle = np.full(nb_symboles, np.nan)
+    observations = masques.sum(axis=0)
+
+    # Regrouper les actions par masque identique (une seule matrice de conception par groupe)
+    masques_compactes = np.packbits(masques, axis=0)
+    _, groupes = np.unique(masques_compactes.T, axis=0, return_inverse=True)
+    for groupe in np.unique(groupes):
+        colonnes = np.flatnonzero(groupes == groupe)
+        lignes = masques[:, colonnes[0]]
+        n = lignes.sum()
+        if n < max(min_observations, k + 1):
+            continue
+
+        Xg = X[lignes]
+        Yg = Y[np.ix_(lignes, colonnes)]
+        beta, _, rang, _ = np.linalg.lstsq(Xg, Yg, rcond=None)
+        if rang < k:
+            continue  # Facteurs colinéaires sur ce sous-échantillon
+
+        residus = Yg - Xg @ beta
+        sce = (residus ** 2).sum(axis=0)
+        sct = ((Yg - Yg.mean(axis=0)) ** 2).sum(axis=0)
+        s2 = sce / (n - k)
+
+        # Diagonale de (X'X)^-1 via la décomposition QR (matrice k x k seulement)
+        r = np.linalg.qr(Xg, mode='r')
+        r_inv = np.linalg.solve(r, np.eye(k))
+        diag_xtx_inv = (r_inv ** 2).sum(axis=1)
+
+        coefficients[colonnes] = beta.T
+        erreurs[colonnes] = np.sqrt(np.outer(s2, diag_xtx_inv))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r_squared[colonnes] = 1 - sce / sct
+        variance_residuelle[colonnes] = s2
+
+    index = rendements_actions.columns
+    t_stats = pd.DataFrame(coefficients / erreurs, index=index, columns=noms)
+
+    # Alpha annualisé, comme dans calculer_metriques_avancees
+    coefficients[:, 0] *= JOURS_TRADING_ANNEE
+    loadings = pd.DataFrame(coefficients, index=index, columns=noms)
+    synthese = pd.DataFrame({
+        'R-squared': r_squared,
+        'Volatilité_Résiduelle': np.sqrt(variance_residuelle * JOURS_TRADING_ANNEE),
+        'Observations': observations
+    }, index=index)
+
+    return {'Loadings': loadings, 't-stats': t_stats, 'Synthèse': synthese}
+
+
+# Exporter les résultats de la régression multi-facteurs dans le format demandé (CSV sans moteur Excel)
+def exporter_regression_multifacteurs(resultats, fichier_excel='regression_multifacteurs_5ans.xlsx',
+                                      format_export='excel'):
+    feuilles = [(nom_feuille, tableau.round(4).rename_axis('Symbole'), True,
+                 f"multifacteurs_{nom_feuille.replace(' ', '_').replace('è', 'e')}")
+                for nom_feuille, tableau in resultats.items()]
+
+    format_utilise = exporter_feuilles(fichier_excel, feuilles, format_export)
+    if format_utilise == 'excel':
+        print(f"Régression multi-facteurs exportée dans '{fichier_excel}'!")
+    else:
+        print(f"Régression multi-facteurs exportée au format {format_utilise.upper()}!")
@@ -0,0 +1,173 @@
+import datetime
+import sqlite3
+import threading
+
+import pandas as pd
+
+from telechargement import FournisseurDonnees
+
+# Colonnes conservées pour chaque barre journalière
+COLONNES_PRIX = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Écart relatif toléré sur la dernière clôture stockée avant de considérer l'historique comme retraité
+TOLERANCE_RETRAITEMENT = 1e-6
+
+
+# Stockage local des prix par symbole (SQLite), avec les bornes connues de chaque symbole. debut_couvert
+# mémorise le début de période déjà demandé quand il précède la première barre (titre coté plus tard).
+class StockagePrix:
+    def __init__(self, chemin='prix_historiques.sqlite'):
+        self.chemin = chemin
+        self._connexion = sqlite3.connect(chemin, check_same_thread=False)
+        self._verrou = threading.Lock()
+        with self._verrou, self._connexion:
+            self._connexion.execute("""
+                CREATE TABLE IF NOT EXISTS prix (
+                    symbole TEXT NOT NULL, date TEXT NOT NULL,
+                    open REAL, high REAL, low REAL, close REAL, volume REAL,
+                    PRIMARY KEY (symbole, date)
+                ) WITHOUT ROWID""")
+            self._connexion.execute("""
+                CREATE TABLE IF NOT EXISTS symboles (
+                    symbole TEXT PRIMARY KEY, premiere_date TEXT NOT NULL, derniere_date TEXT NOT NULL,
+                    debut_couvert TEXT
+                )""")
+            # Migration d'un stockage créé avant l'ajout de debut_couvert
+            colonnes = [ligne[1] for ligne in self._connexion.execute("PRAGMA table_info(symboles)")]
+            if 'debut_couvert' not in colonnes:
+                self._connexion.execute("ALTER TABLE symboles ADD COLUMN debut_couvert TEXT")
+
+    # Retourner (début couvert, dernière date) pour un symbole, ou None s'il est inconnu. Le début couvert est
+    # la première date stockée, ou le début déjà demandé s'il est antérieur (aucune donnée avant la cotation).
+    def bornes(self, symbole):
+        with self._verrou:
+            ligne = self._connexion.execute(
+                "SELECT MIN(premiere_date, COALESCE(debut_couvert, premiere_date)), derniere_date "
+                "FROM symboles WHERE symbole = ?", (symbole,)).fetchone()
+        if ligne is None:
+            return None
+        return pd.Timestamp(ligne[0]), pd.Timestamp(ligne[1])
+
+    # Lire l'historique d'un symbole (date de fin exclue, comme yfinance)
+    def lire(self, symbole, date_debut=None, date_fin=None):
+        requete = "SELECT date, open, high, low, close, volume FROM prix WHERE symbole = ?"
+        parametres = [symbole]
+        if date_debut is not None:
+            requete += " AND date >= ?"
+            parametres.append(pd.Timestamp(date_debut).strftime('%Y-%m-%d'))
+        if date_fin is not None:
+            requete += " AND date < ?"
+            parametres.append(pd.Timestamp(date_fin).strftime('%Y-%m-%d'))
+        with self._verrou:
+            lignes = self._connexion.execute(requete + " ORDER BY date", parametres).fetchall()
+
+        historique = pd.DataFrame(lignes, columns=['Date'] + COLONNES_PRIX)
+        historique['Date'] = pd.to_datetime(historique['Date'])
+        return historique.set_index('Date')
+
+    # Ajouter (ou remplacer) des barres pour un symbole et mettre à jour ses bornes
+    def ajouter(self, symbole, historique):
+        if historique.empty:
+            return
+        donnees = historique.reindex(columns=COLONNES_PRIX).astype(float)
+        dates = pd.DatetimeIndex(historique.index).strftime('%Y-%m-%d')
+        lignes = [(symbole, date) + tuple(None if pd.isna(v) else v for v in valeurs)
+                  for date, valeurs in zip(dates, donnees.itertuples(index=False, name=None))]
+
+        with self._verrou, self._connexion:
+            self._connexion.executemany("INSERT OR REPLACE INTO prix VALUES (?, ?, ?, ?, ?, ?, ?)", lignes)
+            self._connexion.execute("""
+                INSERT INTO symboles (symbole, premiere_date, derniere_date) VALUES (?, ?, ?)
+                ON CONFLICT(symbole) DO UPDATE SET
+                    premiere_date = MIN(premiere_date, excluded.premiere_date),
+                    derniere_date = MAX(derniere_date, excluded.derniere_date)""",
+                                    (symbole, min(dates), max(dates)))
+
+    # Mémoriser qu'aucune donnée n'existe avant la première barre depuis `date_debut` (sans effet sur un symbole
+    # inconnu ou si des barres sont stockées avant cette date)
+    def marquer_debut_couvert(self, symbole, date_debut):
+        with self._verrou, self._connexion:
+            self._connexion.execute("""
+                UPDATE symboles SET debut_couvert = MIN(COALESCE(debut_couvert, premiere_date), ?)
+                WHERE symbole = ?""", (pd.Timestamp(date_debut).strftime('%Y-%m-%d'), symbole))
+
+    # Invalider l'historique d'un symbole (opérations sur titres : splits, dividendes, retraitements).
+    # Sans date, tout l'historique est supprimé ; sinon seulement les barres à partir de `depuis`.
+    def invalider(self, symbole, depuis=None):
+        with self._verrou, self._connexion:
+            if depuis is None:
+                self._connexion.execute("DELETE FROM prix WHERE symbole = ?", (symbole,))
+            else:
+                self._connexion.execute("DELETE FROM prix WHERE symbole = ? AND date >= ?",
+                                        (symbole, pd.Timestamp(depuis).strftime('%Y-%m-%d')))
+            bornes = self._connexion.execute(
+                "SELECT MIN(date), MAX(date) FROM prix WHERE symbole = ?", (symbole,)).fetchone()
+            if bornes[0] is None:
+                self._connexion.execute("DELETE FROM symboles WHERE symbole = ?", (symbole,))
+            else:
+                self._connexion.execute("UPDATE symboles SET premiere_date = ?, derniere_date = ? WHERE symbole = ?",
+                                        (bornes[0], bornes[1], symbole))
+
+    def symboles(self):
+        with self._verrou:
+            return [ligne[0] for ligne in self._connexion.execute("SELECT symbole FROM symboles ORDER BY symbole")]
+
+    def fermer(self):
+        with self._verrou:
+            self._connexion.close()
+
+
+# Fournisseur incrémental : ne demande au fournisseur sous-jacent que la plage manquante du stockage local
+class FournisseurIncremental(FournisseurDonnees):
+    def __init__(self, fournisseur, stockage, verifier_retraitement=True):
+        self.fournisseur = fournisseur
+        self.stockage = stockage
+        self.verifier_retraitement = verifier_retraitement
+
+    # Télécharger une plage, la stocker et mémoriser le début demandé (demandé une seule fois même si le titre
+    # n'était pas encore coté)
+    def _completer(self, symbole, date_debut, date_fin):
+        historique = self.fournisseur.historique(symbole, date_debut, date_fin)
+        self.stockage.ajouter(symbole, historique)
+        self.stockage.marquer_debut_couvert(symbole, date_debut)
+        return historique
+
+    def historique(self, symbole, date_debut, date_fin):
+        date_debut, date_fin = pd.Timestamp(date_debut), pd.Timestamp(date_fin)
+        bornes = self.stockage.bornes(symbole)
+
+        if bornes is None:
+            # Symbole inconnu : téléchargement complet
+            self._completer(symbole, date_debut, date_fin)
+        else:
+            try:
+                self._mettre_a_jour(symbole, date_debut, date_fin, *bornes)
+            except Exception as e:
+                # Fournisseur en erreur : l'historique déjà stocké reste utilisable
+                print(f"Mise à jour impossible pour {symbole} ({e}), données stockées utilisées")
+
+        return self.stockage.lire(symbole, date_debut, date_fin)
+
+    def _mettre_a_jour(self, symbole, date_debut, date_fin, premiere, derniere):
+        # Compléter le début de la période si elle commence avant les données stockées
+        if date_debut < premiere:
+            self._completer(symbole, date_debut, premiere)
+
+        # Compléter la fin, en redemandant la dernière barre stockée pour détecter un retraitement
+        if derniere + datetime.timedelta(days=1) < date_fin:
+            nouveau = self.fournisseur.historique(symbole, derniere, date_fin)
+            if self.verifier_retraitement and self._est_retraite(symbole, derniere, nouveau):
+                print(f"Historique retraité détecté pour {symbole}, rechargement complet")
+                self.stockage.invalider(symbole)
+                self._completer(symbole, date_debut, date_fin)
+            else:
+                self.stockage.ajouter(symbole, nouveau)
+
+    def _est_retraite(self, symbole, derniere, nouveau):
+        if nouveau.empty or derniere not in nouveau.index:
+            return False
+        ancienne = self.stockage.lire(symbole, derniere, derniere + datetime.timedelta(days=1))['Close']
+        if ancienne.empty or pd.isna(ancienne.iloc[0]):
+            return False
+        ecart = abs(nouveau.loc[derniere, 'Close'] / ancienne.iloc[0] - 1)
+        return ecart > TOLERANCE_RETRAITEMENT
@@ -0,0 +1,181 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from instrumentation import instrumentation
+
+
+# Limiteur de débit à seau de jetons, partagé par tous les threads de téléchargement
+class LimiteurDebit:
+    def __init__(self, requetes_par_seconde=4.0, capacite=None):
+        self.debit = float(requetes_par_seconde)
+        self.capacite = float(capacite if capacite is not None else max(1.0, requetes_par_seconde))
+        self._jetons = self.capacite
+        self._dernier = time.monotonic()
+        self._verrou = threading.Lock()
+
+    # Bloquer jusqu'à ce qu'un jeton soit disponible
+    def acquerir(self):
+        while True:
+            with self._verrou:
+                maintenant = time.monotonic()
+                self._jetons = min(self.capacite, self._jetons + (maintenant - self._dernier) * self.debit)
+                self._dernier = maintenant
+                if self._jetons >= 1:
+                    self._jetons -= 1
+                    return
+                attente = (1 - self._jetons) / self.debit
+            time.sleep(attente)
+
+
+# Interface commune des fournisseurs de données historiques
+class FournisseurDonnees:
+    def historique(self, symbole, date_debut, date_fin):
+        raise NotImplementedError
+
+
+# Fournisseur dont chaque requête en amont consomme un jeton du limiteur de débit (placé sous le stockage
+# incrémental, il borne le trafic réel même quand un appel logique déclenche plusieurs requêtes). Chaque requête
+# est aussi enregistrée dans la télémétrie : attente du limiteur, latence, lignes et octets reçus, erreur.
+class FournisseurLimite(FournisseurDonnees):
+    def __init__(self, fournisseur, limiteur):
+        self.fournisseur = fournisseur
+        self.limiteur = limiteur
+
+    def historique(self, symbole, date_debut, date_fin):
+        debut = time.perf_counter()
+        self.limiteur.acquerir()
+        attente = time.perf_counter() - debut
+        if not instrumentation.actif:
+            return self.fournisseur.historique(symbole, date_debut, date_fin)
+
+        debut = time.perf_counter()
+        try:
+            historique = self.fournisseur.historique(symbole, date_debut, date_fin)
+        except Exception as e:
+            instrumentation.enregistrer_requete(symbole, date_debut, date_fin, attente, time.perf_counter() - debut,
+                                                0, 0, f"{type(e).__name__}: {e}")
+            raise
+        instrumentation.enregistrer_requete(symbole, date_debut, date_fin, attente, time.perf_counter() - debut,
+                                            len(historique), historique.memory_usage(index=True).sum())
+        return historique
+
+
+# Fournisseur Yahoo Finance (yfinance n'est importé qu'au premier appel)
+class FournisseurYahoo(FournisseurDonnees):
+    def historique(self, symbole, date_debut, date_fin):
+        import yfinance as yf
+
+        historique = yf.Ticker(symbole).history(start=date_debut, end=date_fin)
+        if not historique.empty:
+            # Supprimer les informations de fuseau horaire
+            historique.index = historique.index.tz_localize(None)
+        return historique
+
+
+# Fournisseur local à partir de DataFrames déjà en mémoire (tests, fonctionnement hors réseau)
+class FournisseurLocal(FournisseurDonnees):
+    def __init__(self, donnees):
+        self.donnees = donnees
+        self.appels = []
+
+    def historique(self, symbole, date_debut, date_fin):
+        self.appels.append(symbole)
+        historique = self.donnees.get(symbole)
+        if historique is None:
+            return pd.DataFrame()
+        # Même convention que yfinance : date de fin exclue
+        return historique[(historique.index >= pd.Timestamp(date_debut)) & (historique.index < pd.Timestamp(date_fin))]
+
+
+# Téléchargeur concurrent : pool de threads, limiteur de débit partagé, reprises avec attente exponentielle
+# et déduplication (un même symbole n'est jamais demandé deux fois pour la même période).
+# limiteur=False : le fournisseur limite lui-même ses requêtes en amont (FournisseurLimite)
+# La télémétrie enregistrée ici est celle de l'appel logique par symbole (stockage local compris) ; les requêtes
+# réellement envoyées en amont sont enregistrées par FournisseurLimite.
+class TelechargeurConcurrent:
+    def __init__(self, fournisseur, limiteur=None, nb_threads=8, tentatives_max=3, delai=1.0):
+        self.fournisseur = fournisseur
+        self.limiteur = limiteur if limiteur is not None else LimiteurDebit()
+        self.tentatives_max = tentatives_max
+        self.delai = delai
+        self._executeur = ThreadPoolExecutor(max_workers=nb_threads)
+        self._requetes = {}
+        self._verrou = threading.Lock()
+
+    def _telecharger(self, symbole, date_debut, date_fin):
+        latence = 0.0
+        for tentative in range(self.tentatives_max):
+            if self.limiteur:
+                self.limiteur.acquerir()
+            debut = time.perf_counter()
+            try:
+                historique = self.fournisseur.historique(symbole, date_debut, date_fin)
+                latence += time.perf_counter() - debut
+                if not historique.empty:
+                    if instrumentation.actif:
+                        instrumentation.enregistrer_telechargement(symbole, latence, tentative + 1,
+                                                                   historique.memory_usage(index=True).sum(), True)
+                    return historique
+            except Exception as e:
+                latence += time.perf_counter() - debut
+                print(f"Erreur pour {symbole} (tentative {tentative+1}): {e}")
+
+            # Attente exponentielle avec gigue, uniquement dans le thread concerné
+            if tentative < self.tentatives_max - 1:
+                time.sleep(self.delai * 2 ** tentative * (1 + random.random() / 2))
+
+        # Si toutes les tentatives échouent, retourner un DataFrame vide
+        print(f"Impossible de récupérer les données pour {symbole} après {self.tentatives_max} tentatives")
+        instrumentation.enregistrer_telechargement(symbole, latence, self.tentatives_max, 0, False)
+        return pd.DataFrame()
+
+    # Planifier le téléchargement d'un symbole (ou réutiliser la requête déjà en cours)
+    def soumettre(self, symbole, date_debut, date_fin):
+        cle = (symbole, str(date_debut), str(date_fin))
+        with self._verrou:
+            future = self._requetes.get(cle)
+            if future is None:
+                future = self._executeur.submit(self._telecharger, symbole, date_debut, date_fin)
+                self._requetes[cle] = future
+        return future
+
+    def obtenir(self, symbole, date_debut, date_fin):
+        return self.soumettre(symbole, date_debut, date_fin).result()
+
+    # Oublier les requêtes terminées d'un ou plusieurs symboles (leurs historiques ne sont plus retenus ; une
+    # nouvelle demande les téléchargera à nouveau). Les requêtes en cours restent partagées.
+    def liberer(self, symboles, date_debut, date_fin):
+        with self._verrou:
+            for symbole in ([symboles] if isinstance(symboles, str) else symboles):
+                cle = (symbole, str(date_debut), str(date_fin))
+                future = self._requetes.get(cle)
+                if future is not None and future.done():
+                    del self._requetes[cle]
+
+    # Télécharger une liste de symboles en parallèle et retourner {symbole: historique}. Avec `colonne`, seule une
+    # copie de cette colonne est conservée pour chaque symbole ; avec liberer=True, chaque historique complet est
+    # oublié dès sa colonne extraite (mémoire bornée par les colonnes retenues, et non par les historiques OHLCV).
+    def telecharger(self, symboles, date_debut, date_fin, colonne=None, liberer=False):
+        futures = {symbole: self.soumettre(symbole, date_debut, date_fin) for symbole in dict.fromkeys(symboles)}
+        resultats = {}
+        for symbole in list(futures):
+            historique = futures.pop(symbole).result()
+            if colonne is not None and not historique.empty:
+                historique = historique[colonne].copy()
+            resultats[symbole] = historique
+            if liberer:
+                self.liberer(symbole, date_debut, date_fin)
+        return resultats
+
+    def fermer(self, annuler=False):
+        self._executeur.shutdown(wait=True, cancel_futures=annuler)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
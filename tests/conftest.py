@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Modules du projet importables depuis les tests (modules à la racine du dépôt)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Historique OHLCV synthétique sur les jours ouvrés d'une période (clôture en marche aléatoire)
+def historique_synthetique(date_debut, date_fin, graine=0, prix_initial=100.0):
+    dates = pd.bdate_range(date_debut, date_fin)
+    rng = np.random.default_rng(graine)
+    cloture = prix_initial * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+    return pd.DataFrame({'Open': cloture, 'High': cloture * 1.01, 'Low': cloture * 0.99, 'Close': cloture,
+                         'Volume': rng.integers(1_000, 10_000, len(dates)).astype(float)}, index=dates)
+
+
+# Panels synthétiques (prix, rendements) : indice en première colonne puis actions liées à l'indice,
+# avec des trous et des cotations tardives
+def panels_synthetiques(nb_actions=12, nb_jours=300, graine=0, taux_trous=0.02):
+    rng = np.random.default_rng(graine)
+    dates = pd.bdate_range('2020-01-01', periods=nb_jours)
+    indice = rng.normal(0.0003, 0.01, nb_jours)
+    betas = rng.uniform(0.3, 1.5, nb_actions)
+    rendements = indice[:, None] * betas + rng.normal(0.0002, 0.015, (nb_jours, nb_actions))
+    valeurs = np.column_stack([indice, rendements])
+    prix = 100 * np.exp(np.cumsum(valeurs, axis=0))
+    prix[rng.random(prix.shape) < taux_trous] = np.nan
+    prix[:, 0] = 100 * np.exp(np.cumsum(indice))
+    prix[:nb_jours // 3, 1] = np.nan  # action cotée en cours de période
+    colonnes = ['^INDICE'] + [f'ACT{i}' for i in range(nb_actions)]
+    prix = pd.DataFrame(prix, index=dates, columns=colonnes)
+    return prix, prix.pct_change(fill_method=None)
+
+
+@pytest.fixture
+def panels():
+    return panels_synthetiques()
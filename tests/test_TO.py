@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import TO
+
+pytest.importorskip('statsmodels')
+
+
+# Métriques de référence : boucle historique de TO (statsmodels OLS action par action)
+def reference_boucle(rendements, prix, indice_ref):
+    lignes = {}
+    for symbole in rendements.columns.drop(indice_ref):
+        metriques = TO.calculer_metriques_avancees(rendements[symbole], rendements[indice_ref],
+                                                   prix[symbole].dropna())
+        if metriques is not None:
+            lignes[symbole] = metriques
+    return pd.DataFrame.from_dict(lignes, orient='index')
+
+
+def test_metriques_panel_identiques_a_la_boucle_statsmodels(panels):
+    prix, rendements = panels
+    actions = rendements.drop(columns='^INDICE')
+    panel = TO.calculer_metriques_panel(actions, rendements['^INDICE'], prix[actions.columns])
+    reference = reference_boucle(rendements, prix, '^INDICE')
+
+    assert list(panel.index) == list(reference.index)
+    pd.testing.assert_frame_equal(panel[reference.columns], reference, rtol=1e-9, atol=1e-12, check_dtype=False)
+
+
+def test_metriques_panel_ignore_les_actions_sans_assez_d_observations(panels):
+    prix, rendements = panels
+    actions = rendements.drop(columns='^INDICE').copy()
+    actions.iloc[25:, 0] = np.nan
+    panel = TO.calculer_metriques_panel(actions, rendements['^INDICE'], prix[actions.columns])
+    assert actions.columns[0] not in panel.index
+    assert TO.calculer_metriques_avancees(actions.iloc[:, 0], rendements['^INDICE']) is None
+
+
+def test_metriques_par_blocs_independantes_de_la_taille_des_blocs(panels):
+    prix, rendements = panels
+    symboles = list(rendements.columns.drop('^INDICE'))
+    un_bloc = TO.calculer_metriques_par_blocs(rendements, rendements['^INDICE'], prix, symboles)
+    petits_blocs = TO.calculer_metriques_par_blocs(rendements, rendements['^INDICE'], prix, symboles, taille_bloc=5)
+    pd.testing.assert_frame_equal(un_bloc, petits_blocs)
+    assert list(un_bloc.columns) == TO.COLONNES_NUMERIQUES
+
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+import TO
+from accumulateurs import EtatAccumulateurs, actualiser_metriques
+
+
+def etat_sur(rendements, prix, decroissance=1.0):
+    etat = EtatAccumulateurs([], '^INDICE', decroissance)
+    etat.mettre_a_jour_panel(rendements, prix)
+    return etat
+
+
+def test_etat_identique_au_moteur_panel(panels):
+    prix, rendements = panels
+    actions = rendements.columns.drop('^INDICE')
+    attendu = TO.calculer_metriques_panel(rendements[actions], rendements['^INDICE'], prix[actions])
+    pd.testing.assert_frame_equal(etat_sur(rendements, prix).metriques(), attendu, rtol=1e-9, check_names=False)
+
+
+def test_mise_a_jour_quotidienne_identique_au_calcul_complet(panels):
+    prix, rendements = panels
+    etat = EtatAccumulateurs([], '^INDICE')
+    for fin in range(200, len(prix) + 1, 25):
+        etat.mettre_a_jour_panel(rendements.iloc[:fin], prix.iloc[:fin])
+    pd.testing.assert_frame_equal(etat.metriques(), etat_sur(rendements, prix).metriques(), rtol=1e-9)
+
+
+def test_symboles_ajoutes_apres_creation_de_l_etat(panels):
+    prix, rendements = panels
+    colonnes = list(prix.columns[:6])
+    etat = etat_sur(rendements[colonnes].iloc[:250], prix[colonnes].iloc[:250])
+    etat.mettre_a_jour_panel(rendements, prix)
+    pd.testing.assert_frame_equal(etat.metriques(), etat_sur(rendements, prix).metriques().loc[etat.metriques().index],
+                                  rtol=1e-9)
+    assert set(etat.metriques().index) == set(prix.columns.drop('^INDICE'))
+
+
+def test_fenetre_glissante_sans_retraitement(panels, capsys):
+    prix, rendements = panels
+    etat = etat_sur(rendements.iloc[:250], prix.iloc[:250])
+    # Fenêtre suivante de Port.py : le début du panel avance d'un jour, une nouvelle date à la fin
+    etat.mettre_a_jour_panel(rendements.iloc[1:251], prix.iloc[1:251])
+    assert "retraité" not in capsys.readouterr().out
+    # État cumulatif : identique à l'intégration des 251 dates
+    pd.testing.assert_frame_equal(etat.metriques(), etat_sur(rendements.iloc[:251], prix.iloc[:251]).metriques(),
+                                  rtol=1e-9)
+
+
+def test_historique_retraite_recalcule(panels):
+    prix, rendements = panels
+    etat = etat_sur(rendements.iloc[:250], prix.iloc[:250])
+
+    # Dividende détaché après la dernière date intégrée : tous les prix ajustés antérieurs changent
+    prix_ajustes = prix.copy()
+    prix_ajustes.iloc[:260, 2] *= 0.97
+    rendements_ajustes = rendements.copy()
+    rendements_ajustes.iloc[:, 2] = prix_ajustes.iloc[:, 2].pct_change(fill_method=None)
+    assert etat.symboles_retraites(prix_ajustes) == [prix.columns[2]]
+
+    etat.mettre_a_jour_panel(rendements_ajustes, prix_ajustes)
+    pd.testing.assert_frame_equal(etat.metriques(), etat_sur(rendements_ajustes, prix_ajustes).metriques(), rtol=1e-9)
+
+
+def test_reconstruction_complete(panels):
+    prix, rendements = panels
+    etat = etat_sur(rendements.iloc[:200], prix.iloc[:200])
+    assert etat.reconstruire(rendements, prix) == len(prix)
+    pd.testing.assert_frame_equal(etat.metriques(), etat_sur(rendements, prix).metriques())
+
+
+def test_decroissance_exponentielle(panels):
+    prix, rendements = panels
+    metriques = etat_sur(rendements, prix, decroissance=0.99).metriques()
+    symbole = metriques.index[0]
+    y = rendements[symbole]
+    x = rendements['^INDICE']
+    commun = y.notna() & x.notna()
+    poids = 0.99 ** np.arange(commun.sum())[::-1]
+    yc, xc = y[commun].to_numpy(), x[commun].to_numpy()
+    moyenne_x, moyenne_y = np.average(xc, weights=poids), np.average(yc, weights=poids)
+    beta = np.sum(poids * (xc - moyenne_x) * (yc - moyenne_y)) / np.sum(poids * (xc - moyenne_x) ** 2)
+    np.testing.assert_allclose(metriques.loc[symbole, 'Beta'], beta, rtol=1e-9)
+
+
+def test_actualiser_metriques_sauvegarde_l_etat(panels, tmp_path, capsys):
+    prix, rendements = panels
+    chemin = str(tmp_path / 'etat.npz')
+    premier = actualiser_metriques(rendements.iloc[:250], prix.iloc[:250], '^INDICE', chemin)
+    assert "250 nouvelle(s) date(s)" in capsys.readouterr().out
+    suivant = actualiser_metriques(rendements, prix, '^INDICE', chemin)
+    assert f"{len(prix) - 250} nouvelle(s) date(s)" in capsys.readouterr().out
+    assert premier.index.equals(suivant.index)
+    pd.testing.assert_frame_equal(suivant, etat_sur(rendements, prix).metriques())
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_portefeuille import backtester, positions_rebalancement, grille_variantes, neutraliser_beta
+
+
+# Backtest de référence jour par jour : nombre de parts par actif, liquidités, frais sur le montant échangé
+def backtest_reference(prix, poids, frequence, cout):
+    valeurs = prix[poids.index].ffill()
+    cotes = valeurs.notna().any(axis=1)
+    dates = prix.index[cotes.to_numpy().argmax():]
+    rebalancements = set(dates[positions_rebalancement(dates, frequence)])
+
+    parts = pd.Series(0.0, index=poids.index)
+    liquidites = 1.0
+    nav = []
+    for date in dates:
+        cours = valeurs.loc[date]
+        if date in rebalancements:
+            valeur = liquidites + (parts * cours.fillna(0.0)).sum()
+            actuels = parts * cours.fillna(0.0) / valeur
+            cible = poids.where(cours.notna(), 0.0)
+            cible = cible * poids.sum() / cible.sum()
+            valeur *= 1 - cout * (cible - actuels).abs().sum()
+            parts = (cible * valeur / cours).fillna(0.0)
+            liquidites = valeur * (1 - cible.sum())
+        nav.append(liquidites + (parts * cours.fillna(0.0)).sum())
+    return pd.Series(nav, index=dates)
+
+
+@pytest.fixture
+def prix(panels):
+    prix, _ = panels
+    return prix
+
+
+@pytest.mark.parametrize('frequence', ['M', 'Q', 20, None])
+def test_identique_au_backtest_jour_par_jour(prix, frequence):
+    actions = [s for s in prix.columns if s != '^INDICE']
+    poids = {'EW': pd.Series(1.0 / len(actions), index=actions),
+             'Partiel': pd.Series(np.linspace(0.02, 0.1, len(actions)), index=actions)}
+    variantes, couts = grille_variantes(poids, [0.0, 0.002])
+    nav, rotations, frais = backtester(prix, variantes, frequence, couts)
+
+    for nom, poids_variante in variantes.items():
+        attendu = backtest_reference(prix, poids_variante, frequence, couts[nom])
+        np.testing.assert_allclose(nav[nom].loc[attendu.index], attendu, rtol=1e-10)
+    np.testing.assert_allclose(frais.to_numpy(), rotations.to_numpy() * couts.to_numpy(), rtol=1e-12)
+
+
+def test_couverture_beta_neutre(prix):
+    actions = [s for s in prix.columns if s != '^INDICE']
+    poids = pd.Series(1.0 / len(actions), index=actions)
+    couvert = neutraliser_beta(poids, pd.Series(1.5, index=actions), '^INDICE')
+    assert couvert['^INDICE'] == pytest.approx(-1.5)
+    nav, _, _ = backtester(prix, {'Couvert': couvert}, 'M', 0.0)
+    assert np.isfinite(nav['Couvert']).all()
+
+
+def test_symbole_absent(prix):
+    with pytest.raises(ValueError):
+        backtester(prix, pd.Series({'INCONNU': 1.0}), 'M')
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bootstrap import (intervalles_bootstrap, indices_stationnaires, indices_blocs_mobiles, evaluer_tirages,
+                       exporter_intervalles, METRIQUES_BOOTSTRAP)
+from TO import calculer_metriques_panel
+
+
+@pytest.fixture
+def donnees(panels):
+    prix, rendements = panels
+    return rendements.drop(columns='^INDICE'), rendements['^INDICE'], prix.drop(columns='^INDICE')
+
+
+def test_estimations_identiques_a_TO(donnees):
+    rendements_actions, rendements_indice, prix_actions = donnees
+    intervalles = intervalles_bootstrap(rendements_actions, rendements_indice, prix_actions, nb_tirages=200,
+                                        nb_processus=1)
+    attendu = calculer_metriques_panel(rendements_actions, rendements_indice, prix_actions, 30)
+    for metrique in METRIQUES_BOOTSTRAP:
+        pd.testing.assert_series_equal(intervalles[metrique], attendu[metrique].reindex(intervalles.index),
+                                       check_names=False)
+        assert (intervalles[f'{metrique}_IC_Bas'] <= intervalles[f'{metrique}_IC_Haut']).all()
+    # La bêta estimée est dans son intervalle de confiance
+    assert intervalles['Beta'].between(intervalles['Beta_IC_Bas'], intervalles['Beta_IC_Haut']).all()
+
+
+# Avec des indices identité, les métriques d'un tirage sont celles de l'échantillon d'origine
+def test_tirage_identite_egal_aux_estimations(donnees):
+    rendements_actions, rendements_indice, _ = donnees
+    y = rendements_actions.to_numpy(dtype=float)
+    x = rendements_indice.to_numpy(dtype=float)
+    resultats = evaluer_tirages(y, x, np.arange(len(y))[None, :])[:, 0]
+    attendu = calculer_metriques_panel(rendements_actions, rendements_indice, None, 30).reindex(
+        rendements_actions.columns)
+    for i, metrique in enumerate(['Alpha', 'Beta', 'Volatilité_Totale']):
+        np.testing.assert_allclose(resultats[i], attendu[metrique], rtol=1e-4)
+
+
+def test_resultats_independants_du_nombre_de_processus(donnees):
+    rendements_actions, rendements_indice, prix_actions = donnees
+    un = intervalles_bootstrap(rendements_actions, rendements_indice, prix_actions, nb_tirages=120,
+                               tirages_par_lot=50, nb_processus=1, graine=7)
+    deux = intervalles_bootstrap(rendements_actions, rendements_indice, prix_actions, nb_tirages=120,
+                                 tirages_par_lot=50, nb_processus=2, graine=7)
+    pd.testing.assert_frame_equal(un, deux)
+
+
+def test_indices_de_blocs():
+    rng = np.random.default_rng(0)
+    indices = indices_blocs_mobiles(100, 50, 10, rng)
+    assert indices.shape == (50, 100)
+    assert (np.diff(indices.reshape(50, 10, 10), axis=2) == 1).all()
+
+    indices = indices_stationnaires(1000, 20, 20, rng)
+    assert indices.min() >= 0 and indices.max() < 1000
+    # Longueur moyenne des blocs proche de longueur_bloc (suite d'indices consécutifs modulo nb_dates)
+    ruptures = (np.diff(indices, axis=1) % 1000 != 1).sum()
+    assert 15 < indices.size / (ruptures + 20) < 25
+
+
+def test_export_csv(donnees, tmp_path, monkeypatch):
+    rendements_actions, rendements_indice, prix_actions = donnees
+    intervalles = intervalles_bootstrap(rendements_actions, rendements_indice, prix_actions, nb_tirages=50,
+                                        nb_processus=1)
+    monkeypatch.chdir(tmp_path)
+    exporter_intervalles(intervalles, format_export='csv')
+    relu = pd.read_csv(tmp_path / 'intervalles_confiance_5ans.csv', index_col='Symbole')
+    assert list(relu.index) == list(intervalles.index)
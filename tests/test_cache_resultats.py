@@ -0,0 +1,80 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cache_resultats import CacheResultats, empreintes
+from TO import calculer_metriques_avec_cache, calculer_metriques_par_blocs, COLONNES_NUMERIQUES, VERSION_METRIQUES
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = CacheResultats(str(tmp_path / 'cache.sqlite'), COLONNES_NUMERIQUES, VERSION_METRIQUES)
+    yield cache
+    cache.fermer()
+
+
+def test_resultats_en_cache_identiques_au_calcul(panels, cache):
+    prix, rendements = panels
+    actions = list(prix.columns[1:])
+    attendu = calculer_metriques_par_blocs(rendements, rendements['^INDICE'], prix, actions)[COLONNES_NUMERIQUES]
+
+    froid = calculer_metriques_avec_cache(rendements, rendements['^INDICE'], prix, actions, cache)
+    assert len(cache) == len(actions)
+    chaud = calculer_metriques_avec_cache(rendements, rendements['^INDICE'], prix, actions, cache)
+    pd.testing.assert_frame_equal(froid, attendu)
+    pd.testing.assert_frame_equal(chaud, attendu)
+
+
+def test_empreintes_suivent_le_contenu(panels):
+    prix, rendements = panels
+    actions = list(prix.columns[1:])
+    reference = empreintes(rendements, rendements['^INDICE'], prix, actions)
+
+    # Une date supplémentaire sans valeur ne change aucune empreinte
+    date = rendements.index[-1] + pd.offsets.BDay()
+    etendus = pd.concat([rendements, pd.DataFrame(np.nan, index=[date], columns=rendements.columns)])
+    prix_etendus = pd.concat([prix, pd.DataFrame(np.nan, index=[date], columns=prix.columns)])
+    assert empreintes(etendus, etendus['^INDICE'], prix_etendus, actions) == reference
+
+    # Un prix modifié ne change que l'empreinte de son symbole ; l'indice modifié dans la plage de tous les
+    # symboles les change toutes
+    modifies = prix.copy()
+    modifies.iloc[50, 3] *= 1.01
+    nouvelles = empreintes(rendements, rendements['^INDICE'], modifies, actions)
+    assert [s for s in actions if nouvelles[s] != reference[s]] == [prix.columns[3]]
+    indice = rendements['^INDICE'].copy()
+    indice.iloc[250] += 0.001
+    nouvelles = empreintes(rendements, indice, prix, actions)
+    assert all(nouvelles[s] != reference[s] for s in actions)
+
+    # Configuration différente (version des métriques) : empreintes différentes
+    autre = empreintes(rendements, rendements['^INDICE'], prix, actions, 'v2')
+    assert all(autre[s] != reference[s] for s in actions)
+
+
+def test_entrees_vides_et_eviction(tmp_path):
+    cache = CacheResultats(str(tmp_path / 'cache.sqlite'), ['a', 'b'], taille_max=800)
+    try:
+        cache.ecrire({'vide': None})
+        assert cache.lire(['vide', 'absente']) == {'vide': None}
+
+        # Chaque entrée pèse 7 octets de clé + 80 octets de valeurs : au-delà de 800 octets, les moins
+        # récemment utilisées sont supprimées jusqu'à 90 % de la limite
+        for i in range(8):
+            time.sleep(0.01)
+            cache.ecrire({f'cle{i:04d}': np.arange(10.0) + i})
+        time.sleep(0.01)
+        cache.lire(['cle0000'])
+        for i in (8, 9):
+            time.sleep(0.01)
+            cache.ecrire({f'cle{i:04d}': np.arange(10.0) + i})
+
+        assert cache.taille() <= 720
+        restantes = cache.lire(['vide'] + [f'cle{i:04d}' for i in range(10)])
+        assert sorted(restantes) == ['cle0000', 'cle0003', 'cle0004', 'cle0005', 'cle0006', 'cle0007', 'cle0008',
+                                     'cle0009']
+        np.testing.assert_array_equal(restantes['cle0000'], np.arange(10.0))
+    finally:
+        cache.fermer()
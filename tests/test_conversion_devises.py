@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conversion_devises import ConvertisseurDevises, aligner_taux, devise_de_base, FORMAT_SYMBOLE_CHANGE
+from telechargement import FournisseurLocal, TelechargeurConcurrent
+
+
+@pytest.fixture
+def prix():
+    dates = pd.bdate_range('2021-01-04', periods=60, name='Date')
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (60, 4)), axis=0)), index=dates,
+                        columns=['A.PA', 'B.L', 'C.SW', 'D.ST'])
+
+
+UNITES = {'A.PA': 'EUR', 'B.L': 'GBp', 'C.SW': 'CHF', 'D.ST': 'SEK'}
+
+
+# Taux avec des trous et un début postérieur à celui des prix
+def taux_historiques(dates):
+    rng = np.random.default_rng(1)
+    taux = pd.DataFrame({'GBP': 1.15 * np.exp(np.cumsum(rng.normal(0, 0.003, len(dates)))),
+                         'CHF': 0.95 * np.exp(np.cumsum(rng.normal(0, 0.003, len(dates))))}, index=dates)
+    taux.iloc[::7, 0] = np.nan
+    return taux.iloc[3:]
+
+
+# Conversion de référence, symbole par symbole : dernier taux connu à chaque date, premier taux avant le début
+def conversion_reference(prix, taux, taux_fixes):
+    resultat = prix.copy()
+    for symbole, unite in UNITES.items():
+        devise, facteur = devise_de_base(unite)
+        if devise == 'EUR':
+            resultat[symbole] *= facteur
+            continue
+        if devise in taux:
+            serie = taux[devise].dropna()
+            alignee = pd.Series([serie[serie.index <= date].iloc[-1] if (serie.index <= date).any()
+                                 else serie.iloc[0] for date in prix.index], index=prix.index)
+        else:
+            alignee = pd.Series(taux_fixes[devise], index=prix.index)
+        resultat[symbole] = prix[symbole] * alignee * facteur
+    return resultat
+
+
+def test_conversion_depuis_un_fichier_de_taux(prix, tmp_path):
+    taux = taux_historiques(prix.index)
+    taux.to_csv(tmp_path / 'taux.csv', date_format='%d/%m/%Y')
+    convertisseur = ConvertisseurDevises(fichier_taux=str(tmp_path / 'taux.csv'), taux_secours={'SEK': 0.09})
+    converti = convertisseur.convertir(prix, UNITES)
+    pd.testing.assert_frame_equal(converti, conversion_reference(prix, taux, {'SEK': 0.09}))
+    # L'original n'est pas modifié
+    assert prix['B.L'].iloc[0] != converti['B.L'].iloc[0]
+
+
+def test_conversion_depuis_le_telechargeur(prix):
+    taux = taux_historiques(prix.index)
+    donnees = {FORMAT_SYMBOLE_CHANGE.format(devise=d): pd.DataFrame({'Close': taux[d]}) for d in taux}
+    fournisseur = FournisseurLocal(donnees)
+    with TelechargeurConcurrent(fournisseur, limiteur=False, delai=0, tentatives_max=1) as telechargeur:
+        convertisseur = ConvertisseurDevises(telechargeur, '2021-01-01', '2021-04-01', fichier_taux=None,
+                                             taux_secours={'SEK': 0.09})
+        convertisseur.precharger(UNITES.values())
+        converti = convertisseur.convertir(prix, UNITES)
+        convertisseur.convertir(prix, UNITES)
+    pd.testing.assert_frame_equal(converti, conversion_reference(prix, taux, {'SEK': 0.09}))
+    # Chaque cours de change n'est demandé qu'une fois (préchargement partagé, séries en cache)
+    assert sorted(fournisseur.appels) == ['CHFEUR=X', 'GBPEUR=X', 'SEKEUR=X']
+
+
+def test_aligner_taux_doublons_et_dates_anterieures():
+    serie = pd.Series([1.0, 2.0, 3.0], index=pd.to_datetime(['2021-01-05', '2021-01-07', '2021-01-07']))
+    index = pd.to_datetime(['2021-01-04', '2021-01-06', '2021-01-08'])
+    pd.testing.assert_series_equal(aligner_taux(serie, index), pd.Series([1.0, 1.0, 3.0], index=index))
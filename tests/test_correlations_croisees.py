@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlations_croisees import correlations_croisees, distances_correlation, lien_moyen
+
+
+@pytest.fixture
+def donnees(panels):
+    _, rendements = panels
+    actions = rendements.drop(columns='^INDICE')
+    secteurs = ['S1' if i % 3 == 0 else 'S2' if i % 3 == 1 else 'S3' for i in range(actions.shape[1])]
+    return actions, secteurs
+
+
+@pytest.mark.parametrize('taille_bloc,nb_threads', [(5, 1), (5, 2), (512, 1)])
+def test_matrice_identique_a_pandas(donnees, taille_bloc, nb_threads):
+    actions, secteurs = donnees
+    matrice, _, _, _, ordre = correlations_croisees(actions, secteurs, taille_bloc=taille_bloc, nb_threads=nb_threads)
+    attendu = actions.corr(min_periods=30)
+    pd.testing.assert_frame_equal(matrice, attendu, rtol=1e-10, atol=1e-12)
+    assert sorted(ordre) == sorted(actions.columns)
+
+
+def test_minimum_observations_par_paire(donnees):
+    actions, secteurs = donnees
+    # ACT0 n'est cotée que sur les deux derniers tiers : avec un minimum plus élevé, ses paires sont inconnues
+    minimum = int(actions['ACT0'].notna().sum()) + 1
+    matrice, _, _, _, _ = correlations_croisees(actions, secteurs, taille_bloc=5, min_observations=minimum)
+    pd.testing.assert_frame_equal(matrice, actions.corr(min_periods=minimum), rtol=1e-10, atol=1e-12)
+    assert matrice['ACT0'].isna().all()
+
+
+def test_pairs_et_secteurs_identiques_au_calcul_direct(donnees):
+    actions, secteurs = donnees
+    _, pairs, moyennes, synthese, _ = correlations_croisees(actions, secteurs, k=3, taille_bloc=5,
+                                                            avec_matrice=False)
+    correlation = actions.corr(min_periods=30)
+    hors_diagonale = correlation.where(~np.eye(len(correlation), dtype=bool))
+
+    for symbole, groupe in pairs.groupby('Symbole'):
+        attendu = hors_diagonale[symbole].dropna().sort_values(ascending=False).head(3)
+        assert list(groupe.sort_values('Rang')['Pair']) == list(attendu.index)
+        np.testing.assert_allclose(groupe.sort_values('Rang')['Correlation'], attendu, rtol=1e-10)
+
+    etiquettes = pd.Series(secteurs, index=actions.columns)
+    for a in moyennes.index:
+        for b in moyennes.columns:
+            bloc = hors_diagonale.loc[etiquettes == a, etiquettes == b].to_numpy()
+            assert moyennes.loc[a, b] == pytest.approx(np.nanmean(bloc), rel=1e-10)
+        autres = hors_diagonale.loc[etiquettes == a, etiquettes != a].to_numpy()
+        assert synthese.loc[a, 'Corrélation_Inter'] == pytest.approx(np.nanmean(autres), rel=1e-10)
+
+
+def test_lien_moyen_identique_a_scipy(donnees):
+    hierarchy = pytest.importorskip('scipy.cluster.hierarchy')
+    distance = pytest.importorskip('scipy.spatial.distance')
+    actions, _ = donnees
+    distances = distances_correlation(actions.corr(min_periods=30))
+    fusions = lien_moyen(distances)
+    reference = hierarchy.linkage(distance.squareform(distances, checks=False), method='average')
+    np.testing.assert_allclose(sorted(d for _, _, d in fusions), np.sort(reference[:, 2]), rtol=1e-10)
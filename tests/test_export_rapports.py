@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+import export_rapports
+from export_rapports import exporter_feuilles
+from TO import charger_donnees
+
+
+@pytest.fixture
+def feuilles(panels):
+    prix, rendements = panels
+    return [('Prix Quotidiens', prix, True, 'prix_quotidiens_5ans'),
+            ('Rendements Journaliers', rendements, True, 'rendements_journaliers_5ans')]
+
+
+@pytest.mark.parametrize('format_export', ['excel', 'flux', 'csv'])
+def test_aller_retour_par_charger_donnees(feuilles, format_export, tmp_path, monkeypatch):
+    pytest.importorskip('openpyxl')
+    monkeypatch.chdir(tmp_path)
+    format_utilise = exporter_feuilles('resultats_actions_5ans.xlsx', feuilles, format_export)
+    assert format_utilise == ('csv' if format_export == 'csv' else 'excel')
+
+    prix_lus, rendements_lus = charger_donnees('resultats_actions_5ans.xlsx', dossier_binaire='absent')
+    for (_, tableau, _, _), relu in zip(feuilles, (prix_lus, rendements_lus)):
+        pd.testing.assert_frame_equal(relu, tableau, check_names=False, check_freq=False, rtol=1e-12)
+
+
+def test_sans_moteur_excel_toutes_les_feuilles_en_csv(feuilles, tmp_path, monkeypatch):
+    def indisponible(*args):
+        raise ImportError("openpyxl")
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(export_rapports, 'ecrire_classeur_standard', indisponible)
+    feuilles = feuilles + [('Sans Fichier Plat', feuilles[0][1], True, None)]
+    assert exporter_feuilles('classeur.xlsx', feuilles) == 'csv'
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['prix_quotidiens_5ans.csv',
+                                                          'rendements_journaliers_5ans.csv']
+
+
+def test_format_inconnu(feuilles):
+    with pytest.raises(ValueError):
+        exporter_feuilles('classeur.xlsx', feuilles, 'xml')
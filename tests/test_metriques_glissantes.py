@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from annualisation import JOURS_TRADING_ANNEE
+from metriques_glissantes import calculer_metriques_glissantes, calculer_toutes_fenetres, exporter_metriques_glissantes
+
+
+# Métriques glissantes de référence avec pandas rolling (observations communes action/indice)
+def reference_rolling(y, x, fenetre, min_observations):
+    masque = y.notna() & x.notna()
+    y, x = y.where(masque), x.where(masque)
+    fenetre_y = y.rolling(fenetre, min_periods=min_observations)
+    fenetre_x = x.rolling(fenetre, min_periods=min_observations)
+    beta = y.rolling(fenetre, min_periods=min_observations).cov(x) / fenetre_x.var()
+    return {
+        'Beta': beta,
+        'Alpha': (fenetre_y.mean() - beta * fenetre_x.mean()) * JOURS_TRADING_ANNEE,
+        'Correlation': y.rolling(fenetre, min_periods=min_observations).corr(x),
+        'Volatilité_Totale': fenetre_y.std() * np.sqrt(JOURS_TRADING_ANNEE),
+        'Volatilité_Systématique': beta * fenetre_x.std() * np.sqrt(JOURS_TRADING_ANNEE),
+    }
+
+
+@pytest.mark.parametrize('fenetre', [20, 60])
+def test_metriques_glissantes_identiques_a_pandas_rolling(panels, fenetre):
+    prix, rendements = panels
+    indice = rendements['^INDICE'].copy()
+    indice.iloc[[40, 41, 150]] = np.nan  # trous de l'indice
+    actions = rendements.drop(columns='^INDICE')
+    resultats = calculer_metriques_glissantes(actions, indice, fenetre, min_observations=15)
+
+    for symbole in actions.columns:
+        reference = reference_rolling(actions[symbole], indice, fenetre, 15)
+        for metrique, attendu in reference.items():
+            np.testing.assert_allclose(resultats[metrique][symbole].to_numpy(), attendu.to_numpy(),
+                                       rtol=1e-7, atol=1e-10, err_msg=f"{metrique} {symbole}")
+
+
+def test_volatilite_residuelle_complete_la_decomposition(panels):
+    _, rendements = panels
+    resultats = calculer_metriques_glissantes(rendements.drop(columns='^INDICE'), rendements['^INDICE'], 60)
+    totale = resultats['Volatilité_Totale'].to_numpy()
+    decomposee = np.hypot(resultats['Volatilité_Systématique'], resultats['Volatilité_Résiduelle']).to_numpy()
+    np.testing.assert_allclose(decomposee, totale, rtol=1e-9)
+
+
+def test_toutes_fenetres_et_export_csv(panels, tmp_path, monkeypatch):
+    _, rendements = panels
+    resultats = calculer_toutes_fenetres(rendements.drop(columns='^INDICE'), rendements['^INDICE'], fenetres=(20, 60))
+    assert list(resultats) == [20, 60]
+    assert resultats[60]['Beta'].iloc[:29].isna().all().all()
+
+    monkeypatch.chdir(tmp_path)
+    exporter_metriques_glissantes(resultats, format_export='csv')
+    relu = pd.read_csv(tmp_path / 'glissant_Beta_60j.csv', index_col=0)
+    assert relu.shape[1] == rendements.shape[1] - 1
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from annualisation import JOURS_TRADING_ANNEE
+from metriques_risque import calculer_metriques_risque, drawdowns, quantiles_colonnes, noms_metriques_risque
+
+
+# Drawdown maximal et durée du plus long drawdown par une boucle, sur les prix complétés entre la première et la
+# dernière cotation
+def drawdown_reference(serie):
+    serie = serie.loc[serie.first_valid_index():serie.last_valid_index()].ffill()
+    sommet, pire, duree, duree_max = -np.inf, 0.0, 0, 0
+    for valeur in serie:
+        sommet = max(sommet, valeur)
+        pire = min(pire, valeur / sommet - 1)
+        duree = duree + 1 if valeur < sommet else 0
+        duree_max = max(duree_max, duree)
+    return pire, duree_max
+
+
+@pytest.fixture
+def donnees(panels):
+    prix, rendements = panels
+    return rendements.drop(columns='^INDICE'), rendements['^INDICE'], prix.drop(columns='^INDICE')
+
+
+def test_drawdowns_identiques_a_la_boucle(donnees):
+    _, _, prix = donnees
+    # Trous supplémentaires, y compris en fin de période (titre radié)
+    prix = prix.copy()
+    prix.iloc[100:140, 3] = np.nan
+    prix.iloc[-30:, 5] = np.nan
+    drawdown_max, duree_max = drawdowns(prix.to_numpy(dtype=float))
+    for i, symbole in enumerate(prix.columns):
+        pire, duree = drawdown_reference(prix[symbole])
+        assert drawdown_max[i] == pytest.approx(pire, rel=1e-12)
+        assert duree_max[i] == duree
+
+
+def test_trou_ne_met_pas_fin_au_drawdown():
+    prix = np.array([[100.0], [90.0], [np.nan], [95.0], [np.nan], [101.0]])
+    drawdown_max, duree_max = drawdowns(prix)
+    assert drawdown_max[0] == pytest.approx(-0.1)
+    assert duree_max[0] == 4
+
+
+def test_metriques_identiques_a_pandas(donnees):
+    rendements_actions, rendements_indice, prix_actions = donnees
+    metriques = calculer_metriques_risque(rendements_actions, rendements_indice, prix_actions)
+    var, cvar = noms_metriques_risque()[:2]
+    for symbole in rendements_actions.columns:
+        r = rendements_actions[symbole].dropna()
+        quantile = r.quantile(0.05)
+        ligne = metriques.loc[symbole]
+        assert ligne[var] == pytest.approx(-quantile, rel=1e-12)
+        assert ligne[cvar] == pytest.approx(-r[r <= quantile].mean(), rel=1e-12)
+        assert ligne['Asymétrie'] == pytest.approx(r.skew(), rel=1e-9)
+        assert ligne['Kurtosis'] == pytest.approx(r.kurt(), rel=1e-9)
+
+        indice = rendements_indice.reindex(r.index)
+        baisse = indice < 0
+        assert ligne['Beta_Baissier'] == pytest.approx(
+            r[baisse].cov(indice[baisse]) / indice[baisse].var(), rel=1e-9)
+        sortino = r.mean() * JOURS_TRADING_ANNEE / np.sqrt((r.clip(upper=0) ** 2).mean() * JOURS_TRADING_ANNEE)
+        assert ligne['Ratio_Sortino'] == pytest.approx(sortino, rel=1e-9)
+
+        p = prix_actions[symbole].dropna()
+        rendement_geo = (p.iloc[-1] / p.iloc[0]) ** (JOURS_TRADING_ANNEE / len(p)) - 1
+        assert ligne['Ratio_Calmar'] == pytest.approx(rendement_geo / -ligne['Drawdown_Max'], rel=1e-9)
+
+
+def test_quantiles_tri_et_partition(donnees, monkeypatch):
+    rendements_actions, _, _ = donnees
+    y = rendements_actions.to_numpy(dtype=float)
+    masque = ~np.isnan(y)
+    attendu = rendements_actions.quantile(0.05).to_numpy()
+    np.testing.assert_allclose(quantiles_colonnes(y, masque, 0.05), attendu, rtol=1e-12)
+    monkeypatch.setattr('metriques_risque.RANGS_PARTITION_MAX', 0)
+    np.testing.assert_allclose(quantiles_colonnes(y, masque, 0.05), attendu, rtol=1e-12)
+
+
+def test_minimum_observations(donnees):
+    rendements_actions, rendements_indice, prix_actions = donnees
+    metriques = calculer_metriques_risque(rendements_actions, rendements_indice, prix_actions,
+                                          min_observations=len(rendements_actions))
+    assert metriques.isna().all().all()
+    assert isinstance(metriques, pd.DataFrame)
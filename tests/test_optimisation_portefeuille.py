@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from annualisation import JOURS_TRADING_ANNEE
+from optimisation_portefeuille import (covariance_ledoit_wolf, SolveurPortefeuille, optimiser_portefeuilles,
+                                       exporter_portefeuilles)
+
+
+@pytest.fixture
+def rendements(panels):
+    _, rendements = panels
+    return rendements.drop(columns='^INDICE').iloc[1:].fillna(0.0)
+
+
+# Ledoit-Wolf (2004) avec la somme explicite des matrices x_t x_t'
+def ledoit_wolf_reference(valeurs):
+    X = valeurs - valeurs.mean(axis=0)
+    t, n = X.shape
+    S = X.T @ X / t
+    mu = np.trace(S) / n
+    d2 = np.linalg.norm(S - mu * np.eye(n), 'fro') ** 2 / n
+    b2_barre = sum(np.linalg.norm(np.outer(x, x) - S, 'fro') ** 2 for x in X) / t ** 2 / n
+    intensite = min(b2_barre, d2) / d2
+    return intensite * mu * np.eye(n) + (1 - intensite) * S, intensite
+
+
+def test_covariance_ledoit_wolf_identique_a_la_definition(rendements):
+    covariance, intensite = covariance_ledoit_wolf(rendements)
+    attendu, intensite_attendue = ledoit_wolf_reference(rendements.to_numpy())
+    assert 0 <= intensite <= 1
+    np.testing.assert_allclose(intensite, intensite_attendue, rtol=1e-9)
+    np.testing.assert_allclose(covariance.to_numpy(), attendu * JOURS_TRADING_ANNEE, rtol=1e-9)
+
+
+def test_variance_minimale_sans_contrainte_active(rendements):
+    covariance, _ = covariance_ledoit_wolf(rendements)
+    sigma = covariance.to_numpy()
+    solveur = SolveurPortefeuille(covariance, rendements.mean(), poids_min=-1.0, poids_max=1.0, tolerance=1e-10)
+    poids = solveur.resoudre(0.0)
+    attendu = np.linalg.solve(sigma, np.ones(len(sigma)))
+    np.testing.assert_allclose(poids.to_numpy(), attendu / attendu.sum(), atol=1e-6)
+
+
+def test_contraintes_identiques_a_scipy(rendements):
+    optimize = pytest.importorskip('scipy.optimize')
+    covariance, _ = covariance_ledoit_wolf(rendements)
+    mu = rendements.mean() * JOURS_TRADING_ANNEE
+    secteurs = {s: 'A' if i < 5 else 'B' for i, s in enumerate(covariance.index)}
+    solveur = SolveurPortefeuille(covariance, mu, poids_max=0.2, secteurs=secteurs, max_secteur=0.6,
+                                  tolerance=1e-10, iterations_max=50000)
+    sigma, m = covariance.to_numpy(), mu.to_numpy()
+    dans_a = np.array([secteurs[s] == 'A' for s in covariance.index], dtype=float)
+
+    for tolerance_risque in (0.0, 0.05):
+        poids = solveur.resoudre(tolerance_risque).to_numpy()
+        assert abs(poids.sum() - 1) < 1e-6
+        assert poids.min() >= -1e-8 and poids.max() <= 0.2 + 1e-8
+        assert dans_a @ poids <= 0.6 + 1e-6 and (1 - dans_a) @ poids <= 0.6 + 1e-6
+
+        objectif = lambda w: 0.5 * w @ sigma @ w - tolerance_risque * m @ w  # noqa: E731
+        reference = optimize.minimize(
+            objectif, np.full(len(m), 1 / len(m)), method='SLSQP', bounds=[(0, 0.2)] * len(m),
+            constraints=[{'type': 'eq', 'fun': lambda w: w.sum() - 1},
+                         {'type': 'ineq', 'fun': lambda w: 0.6 - dans_a @ w},
+                         {'type': 'ineq', 'fun': lambda w: 0.6 - (1 - dans_a) @ w}],
+            options={'ftol': 1e-14, 'maxiter': 1000})
+        assert objectif(poids) <= reference.fun + 1e-7
+
+
+def test_bornes_incompatibles(rendements):
+    covariance, _ = covariance_ledoit_wolf(rendements)
+    with pytest.raises(ValueError):
+        SolveurPortefeuille(covariance, rendements.mean(), poids_max=0.01)
+
+
+def test_optimisation_et_export_de_toutes_les_feuilles(rendements, tmp_path, monkeypatch):
+    portefeuilles, synthese, frontiere, poids_frontiere = optimiser_portefeuilles(
+        rendements, lambda s: f'S{int(s[3:]) % 4}', nb_points=6)
+    assert synthese.loc['Sharpe_Maximal', 'Sharpe'] >= frontiere['Sharpe'].max() - 1e-6
+    assert synthese.loc['Variance_Minimale', 'Volatilité'] <= frontiere['Volatilité'].min() + 1e-6
+    np.testing.assert_allclose(poids_frontiere.sum(), 1, atol=1e-6)
+
+    monkeypatch.chdir(tmp_path)
+    exporter_portefeuilles(portefeuilles, synthese, frontiere, poids_frontiere, format_export='csv')
+    for fichier in ['portefeuilles_5ans', 'portefeuilles_synthese_5ans', 'frontiere_efficiente_5ans',
+                    'frontiere_poids_5ans']:
+        assert (tmp_path / f'{fichier}.csv').exists()
+    relu = pd.read_csv(tmp_path / 'portefeuilles_5ans.csv', index_col='Symbole')
+    assert list(relu.index) == list(portefeuilles.index)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+from panel_binaire import (sauvegarder_jeu_donnees, charger_jeu_donnees, jeu_donnees_disponible, charger_panel,
+                           sauvegarder_panel, PanelCompact)
+
+
+def test_jeu_donnees_aller_retour(panels, tmp_path):
+    prix, rendements = panels
+    dossier = str(tmp_path / 'donnees')
+    assert not jeu_donnees_disponible(dossier)
+    sauvegarder_jeu_donnees(prix, rendements, dossier)
+    assert jeu_donnees_disponible(dossier)
+
+    prix_lus, rendements_lus = charger_jeu_donnees(dossier)
+    pd.testing.assert_frame_equal(prix_lus, prix, check_freq=False, check_names=False)
+    pd.testing.assert_frame_equal(rendements_lus, rendements, check_freq=False, check_names=False)
+    assert prix_lus.index.name == 'Date'
+
+
+def test_lecture_partielle_colonnes_et_dates(panels, tmp_path):
+    prix, _ = panels
+    sauvegarder_panel(prix, str(tmp_path), 'prix')
+    partiel = charger_panel(str(tmp_path), 'prix', colonnes=['ACT3', 'INCONNU', 'ACT1'],
+                            date_debut='2020-03-02', date_fin='2020-03-31')
+    attendu = prix.loc['2020-03-02':'2020-03-31', ['ACT3', 'ACT1']]
+    pd.testing.assert_frame_equal(partiel, attendu, check_freq=False, check_names=False)
+
+
+def test_panel_mappe_en_lecture_seule(panels, tmp_path):
+    prix, _ = panels
+    sauvegarder_panel(prix, str(tmp_path), 'prix')
+    panel = charger_panel(str(tmp_path), 'prix')
+    # Vue du fichier mappé en mémoire, sans copie
+    assert not panel.to_numpy().flags.writeable
+
+
+def test_panel_compact_identique_a_pandas(panels):
+    prix, _ = panels
+    # Séries de calendriers différents, avec une date sans aucune valeur
+    prix = prix.copy()
+    prix.iloc[5] = np.nan
+    series = {s: prix[s].dropna() for s in prix.columns}
+    series['^INDICE'] = prix['^INDICE']
+    attendu = pd.concat(series, axis=1).sort_index()
+
+    panel = PanelCompact.depuis_series(series)
+    pd.testing.assert_frame_equal(panel.vers_dataframe(), attendu, check_names=False, check_freq=False)
+
+    panel.remplir_vers_l_avant(taille=5)
+    pd.testing.assert_frame_equal(panel.vers_dataframe(), attendu.ffill(), check_names=False, check_freq=False)
+
+    rendements = panel.rendements(taille=5)
+    pd.testing.assert_frame_equal(rendements.vers_dataframe(), attendu.ffill().pct_change(fill_method=None),
+                                  check_names=False, check_freq=False)
+
+    non_vides = PanelCompact.depuis_series(series).lignes_non_vides(taille=5)
+    pd.testing.assert_frame_equal(non_vides.vers_dataframe(), attendu.dropna(how='all'), check_names=False,
+                                  check_freq=False)
+
+
+def test_panel_compact_selections_sans_copie(panels):
+    prix, _ = panels
+    panel = PanelCompact.depuis_dataframe(prix)
+    plage = panel.plage('2020-03-01', '2020-06-30')
+    pd.testing.assert_frame_equal(plage.vers_dataframe(), prix.loc['2020-03-01':'2020-06-30'], check_names=False,
+                                  check_freq=False)
+    assert np.shares_memory(plage.valeurs, panel.valeurs)
+
+    contigue = panel.selection(['ACT1', 'ACT2', 'INCONNU'])
+    assert contigue.symboles == ['ACT1', 'ACT2'] and np.shares_memory(contigue.valeurs, panel.valeurs)
+    dispersee = panel.selection(['ACT3', 'ACT1'])
+    pd.testing.assert_frame_equal(dispersee.vers_dataframe(), prix[['ACT3', 'ACT1']], check_names=False,
+                                  check_freq=False)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from annualisation import JOURS_TRADING_ANNEE
+from regression_multifacteurs import regression_multifacteurs, construire_indices_sectoriels
+
+sm = pytest.importorskip('statsmodels.api')
+
+
+@pytest.fixture
+def facteurs(panels):
+    _, rendements = panels
+    rng = np.random.default_rng(1)
+    facteurs = pd.DataFrame({'^INDICE': rendements['^INDICE'],
+                             'Taux': rng.normal(0, 0.005, len(rendements))}, index=rendements.index)
+    facteurs.iloc[[10, 11, 120], 1] = np.nan
+    return facteurs
+
+
+def test_regression_identique_a_statsmodels(panels, facteurs):
+    _, rendements = panels
+    actions = rendements.drop(columns='^INDICE')
+    resultats = regression_multifacteurs(actions, facteurs)
+
+    for symbole in actions.columns:
+        donnees = facteurs.join(actions[symbole]).dropna()
+        modele = sm.OLS(donnees[symbole], sm.add_constant(donnees[facteurs.columns])).fit()
+        coefficients = modele.params.to_numpy() * np.r_[JOURS_TRADING_ANNEE, np.ones(len(facteurs.columns))]
+        np.testing.assert_allclose(resultats['Loadings'].loc[symbole], coefficients, rtol=1e-8)
+        np.testing.assert_allclose(resultats['t-stats'].loc[symbole], modele.tvalues, rtol=1e-8)
+        synthese = resultats['Synthèse'].loc[symbole]
+        np.testing.assert_allclose(synthese['R-squared'], modele.rsquared, rtol=1e-8)
+        np.testing.assert_allclose(synthese['Volatilité_Résiduelle'], np.sqrt(modele.scale * JOURS_TRADING_ANNEE),
+                                   rtol=1e-8)
+        assert synthese['Observations'] == modele.nobs
+
+
+def test_trop_peu_d_observations_ou_facteurs_colineaires(panels, facteurs):
+    _, rendements = panels
+    actions = rendements[['ACT0', 'ACT2']].copy()
+    actions.iloc[20:, 0] = np.nan
+    colineaires = facteurs.assign(Double=2 * facteurs['^INDICE'])
+    resultats = regression_multifacteurs(actions, facteurs)
+    assert resultats['Loadings'].loc['ACT0'].isna().all()
+    assert resultats['Loadings'].loc['ACT2'].notna().all()
+    assert regression_multifacteurs(actions, colineaires)['Loadings'].isna().all().all()
+
+
+def test_indices_sectoriels_equiponderes(panels):
+    _, rendements = panels
+    actions = rendements[['ACT2', 'ACT3', 'ACT4']]
+    indices = construire_indices_sectoriels(actions, {'ACT2': 'A', 'ACT3': 'A', 'ACT4': 'B'}.get)
+    assert list(indices.columns) == ['Secteur A', 'Secteur B']
+    pd.testing.assert_series_equal(indices['Secteur A'], actions[['ACT2', 'ACT3']].mean(axis=1), check_names=False)
@@ -0,0 +1,154 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from conftest import historique_synthetique
+from stockage_prix import StockagePrix, FournisseurIncremental
+from telechargement import FournisseurLocal
+
+
+# Fournisseur local qui mémorise les périodes demandées et peut être mis en panne
+class FournisseurTrace(FournisseurLocal):
+    def __init__(self, donnees):
+        super().__init__(donnees)
+        self.periodes = []
+        self.en_panne = False
+
+    def historique(self, symbole, date_debut, date_fin):
+        self.periodes.append((symbole, pd.Timestamp(date_debut), pd.Timestamp(date_fin)))
+        if self.en_panne:
+            raise ConnectionError("service indisponible")
+        return super().historique(symbole, date_debut, date_fin)
+
+
+@pytest.fixture
+def stockage(tmp_path):
+    stockage = StockagePrix(str(tmp_path / 'prix.sqlite'))
+    yield stockage
+    stockage.fermer()
+
+
+@pytest.fixture
+def fournisseur():
+    return FournisseurTrace({'A': historique_synthetique('2020-01-01', '2021-12-31'),
+                             'TARDIF': historique_synthetique('2021-06-01', '2021-12-31', graine=1)})
+
+
+def test_stockage_ajouter_lire_et_bornes(stockage, fournisseur):
+    historique = fournisseur.donnees['A'].loc['2020-03-02':'2020-03-31']
+    stockage.ajouter('A', historique)
+    assert stockage.bornes('A') == (pd.Timestamp('2020-03-02'), pd.Timestamp('2020-03-31'))
+    assert stockage.bornes('INCONNU') is None
+    assert stockage.symboles() == ['A']
+    lu = stockage.lire('A', '2020-03-02', '2020-03-31')
+    assert lu.index[-1] == pd.Timestamp('2020-03-30')  # date de fin exclue
+    pd.testing.assert_frame_equal(lu, historique.iloc[:-1], check_freq=False, check_names=False)
+
+
+def test_premier_appel_puis_aucune_requete(stockage, fournisseur):
+    incremental = FournisseurIncremental(fournisseur, stockage)
+    premier = incremental.historique('A', '2020-01-01', '2021-01-01')
+    assert len(fournisseur.periodes) == 1
+    second = incremental.historique('A', '2020-01-01', '2021-01-01')
+    assert len(fournisseur.periodes) == 1
+    pd.testing.assert_frame_equal(premier, second)
+
+
+def test_complement_de_fin_seulement(stockage, fournisseur):
+    incremental = FournisseurIncremental(fournisseur, stockage)
+    incremental.historique('A', '2020-01-01', '2021-01-01')
+    derniere = stockage.bornes('A')[1]
+    historique = incremental.historique('A', '2020-01-01', '2021-06-01')
+    # Seule la fin est demandée, en redemandant la dernière barre stockée
+    assert fournisseur.periodes[1:] == [('A', derniere, pd.Timestamp('2021-06-01'))]
+    attendu = fournisseur.donnees['A'].loc['2020-01-01':'2021-05-31']
+    pd.testing.assert_series_equal(historique['Close'], attendu['Close'], check_freq=False, check_names=False)
+
+
+def test_complement_de_debut(stockage, fournisseur):
+    incremental = FournisseurIncremental(fournisseur, stockage)
+    incremental.historique('A', '2020-06-01', '2021-01-01')
+    premiere = stockage.bornes('A')[0]
+    historique = incremental.historique('A', '2020-01-01', '2021-01-01')
+    assert fournisseur.periodes[1:] == [('A', pd.Timestamp('2020-01-01'), premiere)]
+    assert historique.index[0] == pd.Timestamp('2020-01-01')
+
+
+def test_debut_avant_cotation_demande_une_seule_fois(stockage, fournisseur):
+    incremental = FournisseurIncremental(fournisseur, stockage)
+    incremental.historique('TARDIF', '2020-01-01', '2021-10-01')
+    incremental.historique('TARDIF', '2020-01-01', '2021-10-01')
+    incremental.historique('TARDIF', '2021-01-01', '2021-10-01')
+    assert len(fournisseur.periodes) == 1
+    # Une période commençant plus tôt que celle déjà demandée est complétée
+    incremental.historique('TARDIF', '2019-01-01', '2021-10-01')
+    assert fournisseur.periodes[1:] == [('TARDIF', pd.Timestamp('2019-01-01'), pd.Timestamp('2020-01-01'))]
+
+
+def test_retraitement_detecte_et_rechargement_complet(stockage, fournisseur):
+    incremental = FournisseurIncremental(fournisseur, stockage)
+    incremental.historique('A', '2020-01-01', '2021-01-01')
+
+    # Division par deux de tout l'historique (split) chez le fournisseur
+    fournisseur.donnees['A'] = fournisseur.donnees['A'].assign(Close=fournisseur.donnees['A']['Close'] / 2)
+    historique = incremental.historique('A', '2020-01-01', '2021-06-01')
+    assert fournisseur.periodes[-1] == ('A', pd.Timestamp('2020-01-01'), pd.Timestamp('2021-06-01'))
+    attendu = fournisseur.donnees['A'].loc['2020-01-01':'2021-05-31', 'Close']
+    pd.testing.assert_series_equal(historique['Close'], attendu, check_freq=False, check_names=False)
+
+
+def test_sans_verification_du_retraitement(stockage, fournisseur):
+    incremental = FournisseurIncremental(fournisseur, stockage, verifier_retraitement=False)
+    incremental.historique('A', '2020-01-01', '2021-01-01')
+    fournisseur.donnees['A'] = fournisseur.donnees['A'].assign(Close=fournisseur.donnees['A']['Close'] / 2)
+    incremental.historique('A', '2020-01-01', '2021-06-01')
+    assert len(fournisseur.periodes) == 2
+
+
+def test_invalider_tout_l_historique(stockage, fournisseur):
+    incremental = FournisseurIncremental(fournisseur, stockage)
+    incremental.historique('A', '2020-01-01', '2021-01-01')
+    stockage.invalider('A')
+    assert stockage.bornes('A') is None
+    assert stockage.lire('A').empty
+    incremental.historique('A', '2020-01-01', '2021-01-01')
+    assert fournisseur.periodes[-1] == ('A', pd.Timestamp('2020-01-01'), pd.Timestamp('2021-01-01'))
+
+
+def test_invalider_depuis_une_date(stockage, fournisseur):
+    incremental = FournisseurIncremental(fournisseur, stockage)
+    incremental.historique('A', '2020-01-01', '2021-01-01')
+    stockage.invalider('A', depuis='2020-10-01')
+    assert stockage.bornes('A')[1] == pd.Timestamp('2020-09-30')
+    historique = incremental.historique('A', '2020-01-01', '2021-01-01')
+    assert fournisseur.periodes[-1] == ('A', pd.Timestamp('2020-09-30'), pd.Timestamp('2021-01-01'))
+    assert historique.index[-1] == pd.Timestamp('2020-12-31')
+
+
+def test_fournisseur_en_panne_retourne_les_donnees_stockees(stockage, fournisseur):
+    incremental = FournisseurIncremental(fournisseur, stockage)
+    stocke = incremental.historique('A', '2020-01-01', '2021-01-01')
+    fournisseur.en_panne = True
+    historique = incremental.historique('A', '2020-01-01', '2021-06-01')
+    pd.testing.assert_frame_equal(historique, stocke)
+
+    # Symbole inconnu : l'erreur remonte au téléchargeur (reprises)
+    with pytest.raises(ConnectionError):
+        incremental.historique('TARDIF', '2020-01-01', '2021-06-01')
+
+
+def test_migration_stockage_sans_debut_couvert(tmp_path):
+    chemin = str(tmp_path / 'ancien.sqlite')
+    connexion = sqlite3.connect(chemin)
+    connexion.execute("CREATE TABLE symboles (symbole TEXT PRIMARY KEY, premiere_date TEXT NOT NULL, "
+                      "derniere_date TEXT NOT NULL)")
+    connexion.execute("INSERT INTO symboles VALUES ('A', '2020-01-02', '2020-12-31')")
+    connexion.commit()
+    connexion.close()
+
+    stockage = StockagePrix(chemin)
+    assert stockage.bornes('A') == (pd.Timestamp('2020-01-02'), pd.Timestamp('2020-12-31'))
+    stockage.marquer_debut_couvert('A', '2019-01-01')
+    assert stockage.bornes('A')[0] == pd.Timestamp('2019-01-01')
+    stockage.fermer()
@@ -0,0 +1,195 @@
+import threading
+import time
+
+import pandas as pd
+
+from conftest import historique_synthetique
+from telechargement import FournisseurLocal, FournisseurLimite, LimiteurDebit, TelechargeurConcurrent
+
+
+# Limiteur qui compte les jetons demandés sans attendre
+class LimiteurCompteur:
+    def __init__(self):
+        self.jetons = 0
+        self._verrou = threading.Lock()
+
+    def acquerir(self):
+        with self._verrou:
+            self.jetons += 1
+
+
+# Fournisseur local qui échoue les `nb_echecs` premiers appels de chaque symbole
+class FournisseurInstable(FournisseurLocal):
+    def __init__(self, donnees, nb_echecs):
+        super().__init__(donnees)
+        self.nb_echecs = nb_echecs
+
+    def historique(self, symbole, date_debut, date_fin):
+        if self.appels.count(symbole) < self.nb_echecs:
+            self.appels.append(symbole)
+            raise ConnectionError("service indisponible")
+        return super().historique(symbole, date_debut, date_fin)
+
+
+def donnees_locales(symboles):
+    return {s: historique_synthetique('2021-01-01', '2021-12-31', graine=i) for i, s in enumerate(symboles)}
+
+
+def test_fournisseur_local_exclut_la_date_de_fin():
+    fournisseur = FournisseurLocal(donnees_locales(['A']))
+    historique = fournisseur.historique('A', '2021-03-01', '2021-03-05')
+    assert list(historique.index) == list(pd.bdate_range('2021-03-01', '2021-03-04'))
+    assert fournisseur.historique('INCONNU', '2021-03-01', '2021-03-05').empty
+
+
+def test_deduplication_des_requetes():
+    fournisseur = FournisseurLocal(donnees_locales(['A', 'B']))
+    with TelechargeurConcurrent(fournisseur, limiteur=LimiteurCompteur(), nb_threads=4, delai=0) as telechargeur:
+        telechargeur.soumettre('A', '2021-01-01', '2022-01-01')
+        resultats = telechargeur.telecharger(['A', 'B', 'A', 'B'], '2021-01-01', '2022-01-01')
+        telechargeur.obtenir('B', '2021-01-01', '2022-01-01')
+    assert sorted(fournisseur.appels) == ['A', 'B']
+    assert list(resultats) == ['A', 'B']
+    pd.testing.assert_frame_equal(resultats['A'], fournisseur.donnees['A'])
+
+
+def test_une_periode_differente_est_une_autre_requete():
+    fournisseur = FournisseurLocal(donnees_locales(['A']))
+    with TelechargeurConcurrent(fournisseur, limiteur=LimiteurCompteur(), delai=0) as telechargeur:
+        telechargeur.obtenir('A', '2021-01-01', '2022-01-01')
+        telechargeur.obtenir('A', '2021-06-01', '2022-01-01')
+    assert fournisseur.appels == ['A', 'A']
+
+
+def test_reprises_apres_erreurs():
+    fournisseur = FournisseurInstable(donnees_locales(['A']), nb_echecs=2)
+    limiteur = LimiteurCompteur()
+    with TelechargeurConcurrent(fournisseur, limiteur=limiteur, tentatives_max=3, delai=0) as telechargeur:
+        historique = telechargeur.obtenir('A', '2021-01-01', '2022-01-01')
+    assert not historique.empty
+    assert fournisseur.appels == ['A'] * 3
+    assert limiteur.jetons == 3  # un jeton par tentative
+
+
+def test_echec_definitif_retourne_un_historique_vide():
+    fournisseur = FournisseurInstable(donnees_locales(['A']), nb_echecs=10)
+    with TelechargeurConcurrent(fournisseur, limiteur=LimiteurCompteur(), tentatives_max=3, delai=0) as telechargeur:
+        assert telechargeur.obtenir('A', '2021-01-01', '2022-01-01').empty
+    assert len(fournisseur.appels) == 3
+
+
+def test_symbole_sans_donnees_est_retente():
+    fournisseur = FournisseurLocal({})
+    with TelechargeurConcurrent(fournisseur, limiteur=LimiteurCompteur(), tentatives_max=2, delai=0) as telechargeur:
+        assert telechargeur.obtenir('A', '2021-01-01', '2022-01-01').empty
+    assert fournisseur.appels == ['A', 'A']
+
+
+def test_limiteur_debit_respecte_le_debit():
+    limiteur = LimiteurDebit(requetes_par_seconde=50, capacite=1)
+    debut = time.perf_counter()
+    for _ in range(11):
+        limiteur.acquerir()
+    # Le premier jeton est disponible immédiatement, les 10 suivants à 50 par seconde
+    assert time.perf_counter() - debut >= 10 / 50 * 0.9
+
+
+def test_limiteur_debit_partage_entre_threads():
+    fournisseur = FournisseurLocal(donnees_locales([f'S{i}' for i in range(10)]))
+    limiteur = LimiteurDebit(requetes_par_seconde=40, capacite=1)
+    debut = time.perf_counter()
+    with TelechargeurConcurrent(fournisseur, limiteur=limiteur, nb_threads=8, delai=0) as telechargeur:
+        resultats = telechargeur.telecharger(list(fournisseur.donnees), '2021-01-01', '2022-01-01')
+    assert all(not historique.empty for historique in resultats.values())
+    assert time.perf_counter() - debut >= 9 / 40 * 0.9
+
+
+def test_fournisseur_limite_consomme_un_jeton_par_requete():
+    limiteur = LimiteurCompteur()
+    fournisseur = FournisseurLimite(FournisseurLocal(donnees_locales(['A'])), limiteur)
+    fournisseur.historique('A', '2021-01-01', '2021-06-01')
+    fournisseur.historique('A', '2021-06-01', '2022-01-01')
+    assert limiteur.jetons == 2
+
+
+# Télémétrie active sur une instance dédiée (sans threads d'échantillonnage)
+def instrumentation_active(monkeypatch):
+    import telechargement
+    from instrumentation import Instrumentation
+
+    mesures = Instrumentation()
+    mesures.actif = True
+    monkeypatch.setattr(telechargement, 'instrumentation', mesures)
+    return mesures
+
+
+def test_telemetrie_par_requete_en_amont(tmp_path, monkeypatch):
+    from stockage_prix import StockagePrix, FournisseurIncremental
+
+    mesures = instrumentation_active(monkeypatch)
+    donnees = donnees_locales(['A'])
+    fournisseur = FournisseurInstable(donnees, 0)
+    stockage = StockagePrix(str(tmp_path / 'prix.sqlite'))
+    incremental = FournisseurIncremental(FournisseurLimite(fournisseur, LimiteurCompteur()), stockage)
+    try:
+        with TelechargeurConcurrent(incremental, limiteur=False, delai=0) as telechargeur:
+            telechargeur.obtenir('A', '2021-01-01', '2021-06-01')
+        with TelechargeurConcurrent(incremental, limiteur=False, delai=0) as telechargeur:
+            historique = telechargeur.obtenir('A', '2021-01-01', '2021-07-01')
+
+        # Panne du fournisseur : l'historique stocké est retourné mais la requête en échec reste visible
+        fournisseur.nb_echecs = len(fournisseur.appels) + 1
+        with TelechargeurConcurrent(incremental, limiteur=False, delai=0) as telechargeur:
+            telechargeur.obtenir('A', '2021-01-01', '2021-08-01')
+    finally:
+        stockage.fermer()
+
+    rapport = mesures.rapport()
+    requetes = rapport['requetes_amont']['detail']
+    assert [r['succes'] for r in requetes] == [True, True, False]
+    assert 'service indisponible' in requetes[2]['erreur']
+    assert rapport['requetes_amont']['echecs'] == 1
+
+    # La mise à jour ne télécharge que la fin de période (dernière barre stockée comprise)
+    recu = donnees['A'].loc['2021-01-01':'2021-05-31']
+    assert requetes[0]['lignes'] == len(recu)
+    assert requetes[1]['lignes'] == len(donnees['A'].loc[recu.index[-1]:'2021-06-30'])
+    assert requetes[1]['octets'] < requetes[0]['octets']
+
+    # Le niveau logique reste séparé : trois appels réussis, taille en mémoire des historiques complets
+    logiques = rapport['telechargements']
+    assert logiques['nombre'] == 3 and logiques['echecs'] == 0
+    assert logiques['detail'][1]['taille_memoire_octets'] == historique.memory_usage(index=True).sum()
+
+
+def test_telecharger_une_colonne_libere_les_historiques():
+    import gc
+    import weakref
+
+    # Fournisseur qui garde une référence faible sur chaque historique retourné
+    class FournisseurSuivi(FournisseurLocal):
+        def __init__(self, donnees):
+            super().__init__(donnees)
+            self.retournes = []
+
+        def historique(self, symbole, date_debut, date_fin):
+            historique = super().historique(symbole, date_debut, date_fin)
+            self.retournes.append(weakref.ref(historique))
+            return historique
+
+    fournisseur = FournisseurSuivi(donnees_locales(['A', 'B', 'C']))
+    with TelechargeurConcurrent(fournisseur, limiteur=False, delai=0) as telechargeur:
+        telechargeur.soumettre('A', '2021-01-01', '2021-07-01')
+        clotures = telechargeur.telecharger(['A', 'B', 'C', 'D'], '2021-01-01', '2021-07-01', colonne='Close',
+                                            liberer=True)
+        gc.collect()
+
+        assert all(isinstance(c, pd.Series) for s, c in clotures.items() if s != 'D') and clotures['D'].empty
+        pd.testing.assert_series_equal(clotures['B'], fournisseur.donnees['B'].loc[:'2021-06-30', 'Close'])
+        assert telechargeur._requetes == {}
+        assert all(reference() is None for reference in fournisseur.retournes)
+
+        # Sans liberer, la requête reste partagée (déduplication)
+        telechargeur.telecharger(['A'], '2021-01-01', '2021-07-01')
+        telechargeur.obtenir('A', '2021-01-01', '2021-07-01')
+        assert fournisseur.appels.count('A') == 2